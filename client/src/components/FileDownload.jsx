@@ -2,10 +2,38 @@ import React from 'react';
 import { IconButton, Tooltip } from '@mui/material';
 import { Download } from '@mui/icons-material';
 import axiosClient from '../utils/axios';
+import { decryptSealedFile, getTransportKey } from '../utils/encryption';
+
+const saveBlob = (blob, filename) => {
+  const link = document.createElement("a");
+  link.href = URL.createObjectURL(blob);
+  link.download = filename;
+  document.body.appendChild(link);
+  link.click();
+  document.body.removeChild(link);
+};
+
+const filenameFrom = (disposition = '') => {
+  const encoded = /filename\*=utf-8''([^;]+)/i.exec(disposition);
+  if (encoded) return decodeURIComponent(encoded[1]);
+  const plain = /filename="([^"]+)"/i.exec(disposition);
+  return plain ? plain[1] : 'download';
+};
 
 const FileDownload = ({ fileId }) => {
   const downloadFile = async () => {
     try {
+      // Sealed downloads send the stored ciphertext unchanged; only the file key is re-encrypted
+      const transportKey = getTransportKey();
+      if (transportKey) {
+        const response = await axiosClient.get(`/user/download/${fileId}?format=sealed`, { responseType: 'arraybuffer' });
+        if (response.headers['x-encryption-mode'] === 'sealed') {
+          const blob = await decryptSealedFile(response.data, response.headers['x-wrapped-key'], transportKey, fileId);
+          saveBlob(blob, filenameFrom(response.headers['content-disposition']));
+          return;
+        }
+      }
+
       // Get the encrypted file data from the server
       const {data} = await axiosClient.get(`/user/download/${fileId}`);
       // Decode Base64 values
@@ -32,13 +60,7 @@ const FileDownload = ({ fileId }) => {
     );
       // Convert decrypted data to Blob and trigger download
       const blob = new Blob([decryptedBuffer], { type: "application/octet-stream" });
-      console.log("blob",blob)
-      const link = document.createElement("a");
-      link.href = URL.createObjectURL(blob);
-      link.download = data.filename;
-      document.body.appendChild(link);
-      link.click();
-      document.body.removeChild(link);
+      saveBlob(blob, data.filename);
       console.log("File decrypted and downloaded successfully");
     } catch (error) {
       console.error('Error downloading files123', error);
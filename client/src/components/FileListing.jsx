@@ -30,7 +30,7 @@ import FileShare from './FileShare';
 
 const FileListing = () => {
   const dispatch = useDispatch();
-  const { files, loading, error } = useSelector(state => state.user);
+  const { files, filesCursor, loading, loadingMore, error } = useSelector(state => state.user);
   const {user}=useSelector(state=>state.auth)
   const [deleteDialog, setDeleteDialog] = useState(false);
   const [selectedFile, setSelectedFile] = useState(null);
@@ -135,6 +135,16 @@ const FileListing = () => {
           </TableBody>
         </Table>
       </TableContainer>
+      {filesCursor && (
+        <Box display="flex" justifyContent="center" mt={2}>
+          <Button
+            onClick={() => dispatch(fetchFiles({ cursor: filesCursor }))}
+            disabled={loadingMore}
+          >
+            {loadingMore ? <CircularProgress size={20} /> : 'Load more'}
+          </Button>
+        </Box>
+      )}
 
      { isShareDialogOpen && <FileShare isOpen={isShareDialogOpen} onClose={() => setIsShareDialogOpen(false)} fileId={selectedFile} />}
       
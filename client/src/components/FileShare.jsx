@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 
 import axiosClient from '../utils/axios';
 import {
@@ -13,27 +13,56 @@ import {
     DialogContent,
     DialogActions,
     Snackbar,
-    Alert
+    Alert,
+    Autocomplete,
+    TextField,
+    CircularProgress
 } from '@mui/material';
 
+// Wait for typing to pause before searching
+const SEARCH_DELAY_MS = 300;
+
 const FileShare = ({ isOpen, onClose, fileId }) => {
     const [users, setUsers] = useState([]);
+    const [usersCursor, setUsersCursor] = useState(null);
+    const [usersLoading, setUsersLoading] = useState(false);
+    const [search, setSearch] = useState('');
     const [selectedUser, setSelectedUser] = useState(null);
     const [permission, setPermission] = useState('view');
     const [loading, setLoading] = useState(false);
     const [expiration, setExpiration] = useState(900);
     const [open, setOpen] = useState(false);
     const [message, setMessage] = useState('');
-    useEffect(() => {
-        fetchUsers();
-    }, []);
+    const searchSeq = useRef(0);
 
-    const fetchUsers = async () => {
+    // One page of users whose name or email starts with the search text
+    const fetchUsers = async (cursor = null) => {
+        const seq = ++searchSeq.current;
+        setUsersLoading(true);
         try {
-            const response = await axiosClient('/user/users');
-            setUsers(response.data);
+            const params = {};
+            if (search) params.q = search;
+            if (cursor) params.cursor = cursor;
+            const response = await axiosClient.get('/user/users', { params });
+            if (seq !== searchSeq.current) return;  // A newer search has started
+            setUsers(cursor ? (previous) => [...previous, ...response.data] : response.data);
+            setUsersCursor(response.headers['x-next-cursor'] || null);
         } catch (error) {
             console.log(error);
+        } finally {
+            if (seq === searchSeq.current) setUsersLoading(false);
+        }
+    };
+
+    useEffect(() => {
+        const timer = setTimeout(() => fetchUsers(), SEARCH_DELAY_MS);
+        return () => clearTimeout(timer);
+    }, [search]);
+
+    const handleListScroll = (event) => {
+        const list = event.currentTarget;
+        if (usersCursor && !usersLoading && list.scrollTop + list.clientHeight >= list.scrollHeight - 20) {
+            fetchUsers(usersCursor);
         }
     };
 
@@ -84,19 +113,35 @@ const FileShare = ({ isOpen, onClose, fileId }) => {
                 <DialogContent>
                     <Box sx={{ mt: 2 }}>
                         <FormControl fullWidth sx={{ mb: 3 }}>
-                            <InputLabel id="user-select-label">Select User</InputLabel>
-                            <Select
-                                labelId="user-select-label"
-                                value={selectedUser || ''}
-                                label="Select User"
-                                onChange={(e) => setSelectedUser(e.target.value)}
-                            >
-                                {users.map(user => (
-                                    <MenuItem key={user.id} value={user.id}>
-                                        {user.name}
-                                    </MenuItem>
-                                ))}
-                            </Select>
+                            <Autocomplete
+                                options={users}
+                                getOptionLabel={(user) => user.name}
+                                isOptionEqualToValue={(option, value) => option.id === value.id}
+                                // Matching happens on the server (name or email prefix)
+                                filterOptions={(options) => options}
+                                loading={usersLoading}
+                                onChange={(e, user) => setSelectedUser(user ? user.id : null)}
+                                onInputChange={(e, value, reason) => {
+                                    if (reason === 'input') setSearch(value);
+                                }}
+                                ListboxProps={{ onScroll: handleListScroll }}
+                                renderInput={(params) => (
+                                    <TextField
+                                        {...params}
+                                        label="Select User"
+                                        placeholder="Type a name or email"
+                                        InputProps={{
+                                            ...params.InputProps,
+                                            endAdornment: (
+                                                <>
+                                                    {usersLoading && <CircularProgress size={20} />}
+                                                    {params.InputProps.endAdornment}
+                                                </>
+                                            ),
+                                        }}
+                                    />
+                                )}
+                            />
                         </FormControl>
 
                         <FormControl fullWidth>
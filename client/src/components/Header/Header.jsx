@@ -18,6 +18,7 @@ import {
 } from "@mui/icons-material";
 import { sessionExpired } from "../../store/slices/authSlice";
 import axiosClient from "../../utils/axios";
+import { setTransportKey } from "../../utils/encryption";
 
 const Header = () => {
   const navigate = useNavigate();
@@ -34,6 +35,8 @@ const Header = () => {
   };
 
   const logoutUser = async () => {
+    // The session's key material must not outlive it, whatever the server says
+    setTransportKey(null);
     try {
       await axiosClient.post("/logout");
       dispatch(sessionExpired());
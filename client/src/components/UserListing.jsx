@@ -30,7 +30,7 @@ import { ROLE_PERMISSIONS } from '../utils/rbac';
 
 const UserListing = () => {
   const dispatch = useDispatch();
-  const { users, loading, error } = useSelector(state => state.user);
+  const { users, usersCursor, loading, loadingMore, error } = useSelector(state => state.user);
   const [deleteDialog, setDeleteDialog] = useState(false);
   const [selectedUser, setSelectedUser] = useState(null);
   const [success, setSuccess] = useState(false);
@@ -133,6 +133,16 @@ const UserListing = () => {
           </TableBody>
         </Table>
       </TableContainer>
+      {usersCursor && (
+        <Box display="flex" justifyContent="center" mt={2}>
+          <Button
+            onClick={() => dispatch(fetchUsers({ cursor: usersCursor }))}
+            disabled={loadingMore}
+          >
+            {loadingMore ? <CircularProgress size={20} /> : 'Load more'}
+          </Button>
+        </Box>
+      )}
 
       {/* Delete Confirmation Dialog */}
       <Dialog open={deleteDialog} onClose={() => setDeleteDialog(false)}>
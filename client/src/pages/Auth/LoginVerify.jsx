@@ -18,6 +18,7 @@ import {
   setPermissions
 } from "../../store/slices/authSlice";
 import axiosClient from "../../utils/axios";
+import { setTransportKey } from "../../utils/encryption";
 import { ROLE_PERMISSIONS, ROLES } from "../../utils/rbac";
 
 const LoginVerify = () => {
@@ -73,6 +74,7 @@ const LoginVerify = () => {
 
       // Only store the token in localStorage
       dispatch(setUser(response.data.user));
+      setTransportKey(response.data.transport_key);
       // Store user info in Redux
       if (response.data.user.role === "admin") {
         dispatch(setRoles(ROLES.ADMIN));
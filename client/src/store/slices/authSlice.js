@@ -1,10 +1,13 @@
 import { createSlice, createAsyncThunk } from '@reduxjs/toolkit';
 import axiosClient from '../../utils/axios';
+import { setTransportKey } from '../../utils/encryption';
 
 
 export const logout = createAsyncThunk(
   'auth/logout',
   async (_, { rejectWithValue }) => {
+    // The session's key material must not outlive it, whatever the server says
+    setTransportKey(null);
     try {
       await axiosClient.post('/logout');
       location.href = '/login';
@@ -23,6 +26,7 @@ export const fetchUserData = createAsyncThunk(
       console.log("fetching user data")
       const response = await axiosClient.get('/profile');
       if (!response.data) {
+        setTransportKey(null);
         dispatch(sessionExpired());
       }
     } catch (error) {
@@ -4,10 +4,16 @@ import axiosClient from '../../utils/axios';
 
 export const fetchFiles = createAsyncThunk(
   'user/fetchFiles',
-  async (_, { rejectWithValue }) => {
+  async ({ cursor } = {}, { rejectWithValue }) => {
     try {
-      const response = await axiosClient.get('/user/files');
-      return response.data;
+      // One page per call; pass the returned cursor to load the next one
+      const response = await axiosClient.get('/user/files', {
+        params: cursor ? { cursor } : {},
+      });
+      return {
+        files: response.data,
+        nextCursor: response.headers['x-next-cursor'] || null,
+      };
     } catch (error) {
       return rejectWithValue(error.response?.data);
     }
@@ -29,10 +35,16 @@ export const deleteFile = createAsyncThunk(
 
 export const fetchUsers = createAsyncThunk(
   'user/fetchUsers',
-  async (_, { rejectWithValue }) => {
+  async ({ cursor } = {}, { rejectWithValue }) => {
     try {
-      const response = await axiosClient.get('/admin/users');
-      return response.data;
+      // One page per call; pass the returned cursor to load the next one
+      const response = await axiosClient.get('/admin/users', {
+        params: cursor ? { cursor } : {},
+      });
+      return {
+        users: response.data,
+        nextCursor: response.headers['x-next-cursor'] || null,
+      };
     } catch (error) {
       return rejectWithValue(error.response?.data);
     }
@@ -98,8 +110,11 @@ const userSlice = createSlice({
   name: 'user',
   initialState: {
     files: [],
+    filesCursor: null,
     users: [],
+    usersCursor: null,
     loading: false,
+    loadingMore: false,
     error: null,
     currentFile: null,
     uploadProgress: {},
@@ -125,28 +140,45 @@ const userSlice = createSlice({
   extraReducers: (builder) => {
     builder
       // Fetch Files
-      .addCase(fetchFiles.pending, (state) => {
-        state.loading = true;
+      .addCase(fetchFiles.pending, (state, action) => {
+        if (action.meta.arg?.cursor) {
+          state.loadingMore = true;
+        } else {
+          state.loading = true;
+        }
       })
       .addCase(fetchFiles.fulfilled, (state, action) => {
+        const { files, nextCursor } = action.payload;
         state.loading = false;
-        state.files = action.payload;
+        state.loadingMore = false;
+        // A cursor means the next page: append it to what is already shown
+        state.files = action.meta.arg?.cursor ? [...state.files, ...files] : files;
+        state.filesCursor = nextCursor;
       })
       .addCase(fetchFiles.rejected, (state, action) => {
         state.loading = false;
+        state.loadingMore = false;
         state.error = action.payload;
       })
 
       // Fetch Users
-      .addCase(fetchUsers.pending, (state) => {
-        state.loading = true;
+      .addCase(fetchUsers.pending, (state, action) => {
+        if (action.meta.arg?.cursor) {
+          state.loadingMore = true;
+        } else {
+          state.loading = true;
+        }
       })
       .addCase(fetchUsers.fulfilled, (state, action) => {
+        const { users, nextCursor } = action.payload;
         state.loading = false;
-        state.users = action.payload;
+        state.loadingMore = false;
+        state.users = action.meta.arg?.cursor ? [...state.users, ...users] : users;
+        state.usersCursor = nextCursor;
       })
       .addCase(fetchUsers.rejected, (state, action) => {
         state.loading = false;
+        state.loadingMore = false;
         state.error = action.payload;
       })
 
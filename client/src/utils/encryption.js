@@ -58,4 +58,63 @@ export const decryptFile = async (encryptedBlob, keyArray, ivArray) => {
     console.error('Decryption failed:', error);
     throw new Error('Failed to decrypt file');
   }
-}; 
\ No newline at end of file
+}; 
+const TRANSPORT_KEY_STORAGE = 'transportKey';
+const SEALED_MAGIC = 'SFSE';
+const SEALED_HEADER_SIZE = 17;
+const GCM_TAG_SIZE = 16;
+
+const fromBase64 = (value) => Uint8Array.from(atob(value), c => c.charCodeAt(0));
+
+// Session transport key from verify-login, used for ?format=sealed downloads.
+// Kept in sessionStorage so it dies with the tab; logout clears it as well.
+export const setTransportKey = (key) => {
+  if (key) {
+    sessionStorage.setItem(TRANSPORT_KEY_STORAGE, key);
+  } else {
+    sessionStorage.removeItem(TRANSPORT_KEY_STORAGE);
+  }
+};
+
+export const getTransportKey = () => sessionStorage.getItem(TRANSPORT_KEY_STORAGE);
+
+// Decrypt a sealed download: the stored segmented ciphertext plus the
+// file's data key, wrapped with the session transport key.
+export const decryptSealedFile = async (buffer, wrappedKey, transportKey, fileId) => {
+  const subtle = window.crypto.subtle;
+  const wrapped = fromBase64(wrappedKey);
+  const unwrapKey = await subtle.importKey('raw', fromBase64(transportKey), 'AES-GCM', false, ['decrypt']);
+  const dataKeyBytes = await subtle.decrypt(
+    {
+      name: 'AES-GCM',
+      iv: wrapped.slice(0, 12),
+      additionalData: new TextEncoder().encode(`file:${fileId}`)
+    },
+    unwrapKey,
+    wrapped.slice(12)
+  );
+  const dataKey = await subtle.importKey('raw', dataKeyBytes, 'AES-GCM', false, ['decrypt']);
+
+  // header = MAGIC(4) | version(1) | flags(1) | segment_size(4) | nonce_prefix(7)
+  const bytes = new Uint8Array(buffer);
+  const header = bytes.slice(0, SEALED_HEADER_SIZE);
+  if (new TextDecoder().decode(header.slice(0, 4)) !== SEALED_MAGIC) {
+    throw new Error('Unsupported file format');
+  }
+  const segmentSize = new DataView(header.buffer).getUint32(6);
+  const sealedSize = segmentSize + GCM_TAG_SIZE;
+  const body = bytes.subarray(SEALED_HEADER_SIZE);
+  const count = Math.ceil(body.length / sealedSize);
+
+  const segments = [];
+  for (let index = 0; index < count; index++) {
+    // nonce = nonce_prefix(7) | index (4 bytes, big endian) | last(1)
+    const nonce = new Uint8Array(12);
+    nonce.set(header.slice(10, 17));
+    new DataView(nonce.buffer).setUint32(7, index);
+    nonce[11] = index === count - 1 ? 1 : 0;
+    const sealed = body.subarray(index * sealedSize, Math.min((index + 1) * sealedSize, body.length));
+    segments.push(await subtle.decrypt({ name: 'AES-GCM', iv: nonce, additionalData: header }, dataKey, sealed));
+  }
+  return new Blob(segments);
+};
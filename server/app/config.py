@@ -9,15 +9,78 @@ class Settings(BaseSettings):
 
     # Database settings
     DATABASE_URL: str = "sqlite:///./sql_app.db"
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30  # Seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800  # Seconds before a connection is replaced
+    DB_POOL_PRE_PING: bool = True
+    PAGE_SIZE_DEFAULT: int = 100  # Rows per page of list endpoints
+    PAGE_SIZE_MAX: int = 1000
+
+    # Response compression (zstd and br need the zstandard / brotli packages)
+    COMPRESSION_MIN_SIZE: int = 1024  # Smaller JSON/text bodies are sent uncompressed
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_ZSTD_LEVEL: int = 3
+    COMPRESSION_BROTLI_QUALITY: int = 4
+
+    # /metrics accepts "Authorization: Bearer <METRICS_TOKEN>"; when empty, an admin session is required
+    METRICS_TOKEN: str = ""
     
     # JWT settings
     SECRET_KEY: str = "your-secret-key-here"
     JWT_SECRET_KEY: str = "your-very-long-and-very-random-secret-key-here"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    USER_CACHE_SIZE: int = 10000  # Authenticated-user snapshots kept per worker; 0 disables
+    USER_CACHE_TTL_SECONDS: int = 30
+    # Token revocation (jti Bloom filter, refreshed from the revoked_tokens table)
+    REVOCATION_BLOOM_CAPACITY: int = 100000
+    REVOCATION_BLOOM_ERROR_RATE: float = 0.001
+    REVOCATION_REFRESH_SECONDS: int = 5  # Max delay before other workers see a revocation
+    REVOCATION_PRUNE_INTERVAL_SECONDS: int = 3600
+
+    # Rate limiting: "memory" (per worker), "sqlite" (shared file per node) or "redis"
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_MAX_KEYS: int = 100000  # LRU bound for the memory backend
+    RATE_LIMIT_SQLITE_PATH: str = "./rate_limits.db"
+    RATE_LIMIT_REDIS_URL: str = "redis://127.0.0.1:6379/0"
+    LOGIN_MAX_ATTEMPTS: int = 100
+    LOGIN_WINDOW_SECONDS: int = 15 * 60
     
     # File storage settings
-    UPLOAD_DIR: str = "uploads"
+    UPLOAD_DIR: str = "uploads"  # Relative paths are resolved from the app package
+    STORAGE_BACKEND: str = "local"  # "local" or "s3"
+    S3_BUCKET: str = ""
+    S3_PREFIX: str = ""
+    S3_ENDPOINT_URL: str = ""
+    S3_REGION: str = ""
+    S3_ACCESS_KEY_ID: str = ""
+    S3_SECRET_ACCESS_KEY: str = ""
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024  # Bytes read per step of the upload pipeline
+    ENCRYPTION_SEGMENT_SIZE: int = 64 * 1024  # Plaintext bytes per sealed segment on disk
+    FILE_SEND_CHUNK_SIZE: int = 256 * 1024  # Bytes per body message when a stored file can't be sendfile'd
+    FILE_COMPRESSION_ENABLED: bool = False  # zstd before server encryption (needs the zstandard package)
+    FILE_COMPRESSION_LEVEL: int = 3
+    FILE_COMPRESSION_SAMPLE_SIZE: int = 64 * 1024  # Leading bytes trial-compressed to decide per file
+    FILE_COMPRESSION_MAX_RATIO: float = 0.9  # Store uncompressed unless the sample shrinks to this
+
+    # Resumable multipart uploads
+    UPLOAD_SESSION_TTL_HOURS: int = 24  # Unfinished sessions are garbage-collected after this
+    UPLOAD_PART_MAX_SIZE: int = 64 * 1024 * 1024  # Plaintext bytes per part
+    UPLOAD_MAX_PARTS: int = 10000
+    UPLOAD_MAX_SIZE: int = 10 * 1024 * 1024 * 1024  # Plaintext bytes per session; bounds the assembly in /complete
+    UPLOAD_SESSION_GC_INTERVAL_SECONDS: int = 3600
+
+    # Maintenance scheduler (expired shares, login verifications, sent email)
+    MAINTENANCE_INTERVAL_SECONDS: int = 300
+    MAINTENANCE_BATCH_SIZE: int = 1000  # Rows deleted per transaction
+
+    # Crypto executor settings
+    CRYPTO_EXECUTOR: str = "thread"  # "thread" or "process" (process pool is used for bcrypt only)
+    CRYPTO_MAX_WORKERS: int = 4
+    CRYPTO_MAX_CONCURRENCY: int = 16  # Jobs queued or running at once per worker
+    CRYPTO_BACKEND: str = "auto"  # "auto" (fastest by startup benchmark), "cryptography" or "pycryptodome"
+    CRYPTO_KEY_CACHE_SIZE: int = 256  # Keys whose expanded AES schedule is kept for reuse
 
     # Email settings
     SMTP_HOST: str = "smtp.gmail.com"
@@ -26,6 +89,15 @@ class Settings(BaseSettings):
     SMTP_PASSWORD: str = "qglq yjjn cppr snem"
     MAIL_TLS: bool = False
     MAIL_SSL: bool = True
+    SMTP_TIMEOUT_SECONDS: int = 30
+    SMTP_POOL_SIZE: int = 2  # Long-lived connections used by the outbox dispatcher
+    SMTP_IDLE_TIMEOUT_SECONDS: int = 60
+    MAIL_BATCH_SIZE: int = 50
+    MAIL_MAX_ATTEMPTS: int = 5
+    MAIL_RETRY_BASE_SECONDS: int = 30  # Doubles with every failed attempt
+    MAIL_POLL_INTERVAL_SECONDS: int = 5
+    MAIL_RETENTION_DAYS: int = 7  # Sent and expired messages are kept this long; failed ones until removed by hand
+    MAIL_MFA_TTL_SECONDS: int = 300  # Login code emails not sent by then are dropped; keep below the 10 minute code validity
 
     # Frontend settings
     FRONTEND_URL: str = "http://127.0.0.1:3000"
@@ -35,12 +107,21 @@ class Settings(BaseSettings):
     ADMIN_PASSWORD: str = "Admin@123!"
 
     SERVER_AES_KEY: str
-    SERVER_AES_IV: str
+
+    # Envelope encryption: "id:base64key,id:base64key". Defaults to SERVER_AES_KEY as KEK 1
+    KEY_ENCRYPTION_KEYS: str = ""
+    ACTIVE_KEK_ID: int = 1
+    # Key for the content hash used to deduplicate blobs. Derived from SERVER_AES_KEY if empty
+    DEDUP_HMAC_KEY: str = ""
+    # Secret the per-session download transport keys are derived from. Sealed downloads are off if empty
+    TRANSPORT_KEY_SECRET: str = ""
 
     BASE_URL: str = "http://127.0.0.1:8000"
 
     class Config:
         env_file = ".env"
         case_sensitive = True
+        # Older .env files still carry retired settings such as SERVER_AES_IV
+        extra = "ignore"
 
 settings = Settings() 
\ No newline at end of file
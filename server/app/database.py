@@ -1,9 +1,13 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
 from dotenv import load_dotenv
 
+from .config import settings
+
 # Load environment variables
 load_dotenv()
 
@@ -13,18 +17,77 @@ SQLALCHEMY_DATABASE_URL = os.getenv(
     "sqlite:///./sql_app.db"
 )
 
-# Create SQLAlchemy engine
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False}  # Only needed for SQLite
-)
+# Async drivers for the sync URLs we accept
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+
+def async_database_url(url: str) -> str:
+    """The async-driver equivalent of a database URL"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if parsed.drivername != backend or backend not in ASYNC_DRIVERS:
+        # Already names a driver; trust it
+        return url
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+def engine_options(url: str) -> dict:
+    """Pool settings from Settings; SQLite only gets the thread check disabled"""
+    options = {
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+        if parsed.database in (None, "", ":memory:"):
+            # In-memory databases use a single static connection
+            return options
+    options.update(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+    )
+    return options
+
+# Create SQLAlchemy engine (schema management, scripts and startup tasks)
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **engine_options(SQLALCHEMY_DATABASE_URL))
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine used by the request handlers, so queries don't block the event loop
+ASYNC_DATABASE_URL = async_database_url(SQLALCHEMY_DATABASE_URL)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL))
+
+# Objects stay usable after commit; handlers often return them right away
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 # Create Base class
 Base = declarative_base()
 
+def sync_schema(bind=engine):
+    """
+    Add columns and indexes that create_all() skips on existing tables.
+
+    New columns must be nullable (or have a server default) for this to work
+    on SQLite.
+    """
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=bind.dialect)
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
 # Dependency to get DB session
 def get_db():
     db = SessionLocal()
@@ -32,3 +95,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Dependency to get an async DB session
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,15 +1,24 @@
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, Depends
-from fastapi.responses import JSONResponse, RedirectResponse
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.docs import get_swagger_ui_html
 from fastapi.openapi.utils import get_openapi
 import os
 import ssl
-from .routes import auth, admin, user
-from .database import engine, Base, get_db
+from .routes import auth, admin, user, uploads, metrics
+from .database import engine, async_engine, Base, get_db, AsyncSessionLocal, sync_schema
 from .config import settings
+from .middleware import SecurityMiddleware, CompressionMiddleware, MetricsMiddleware
 from .utils.init_admin import init_admin
+from .utils.executor import crypto_executor
+from .utils.crypto_engine import crypto_engine
+from .utils.responses import OrjsonResponse
+from .services.maintenance import maintenance
+from .utils.revocation import revocation_list
+from .services.mail_dispatcher import mail_dispatcher
 from fastapi.security import OAuth2PasswordBearer
 from .dependencies.auth import check_role
 from .models.user import UserRole
@@ -80,7 +89,41 @@ def custom_openapi():
     app.openapi_schema = openapi_schema
     return app.openapi_schema
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    logger.info("Application startup")
+    # Benchmark the AES backends now rather than on the first request
+    crypto_engine.select_backend()
+    try:
+        # Initialize admin user only if it doesn't exist
+        db_session = next(get_db())  # Create a new session
+        try:
+            init_admin(db_session)
+            logger.info("Admin initialization completed")
+        finally:
+            db_session.close()  # Make sure to close the session
+    except Exception as e:
+        logger.error(f"Admin initialization failed: {str(e)}")
+    try:
+        async with AsyncSessionLocal() as db_session:
+            await revocation_list.rebuild(db_session)
+    except Exception as e:
+        logger.error(f"Loading token revocations failed: {str(e)}")
+    maintenance.start()
+    mail_task = asyncio.create_task(mail_dispatcher.run())
+
+    yield
+
+    logger.info("Application shutdown")
+    mail_task.cancel()
+    await maintenance.stop()
+    await mail_dispatcher.close()
+    crypto_executor.shutdown()
+    await async_engine.dispose()
+
 app = FastAPI(
+    lifespan=lifespan,
+    default_response_class=OrjsonResponse,
     title="Secure File Storage API",
     description=description,
     version="1.0.0",
@@ -117,18 +160,28 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        "Content-Disposition",
+        "Content-Range",
+        "Accept-Ranges",
+        "ETag",
+        "X-Encryption-Key",
+        "X-Encryption-IV",
+        "X-Encryption-Mode",
+        "X-Wrapped-Key",
+        "X-Share-Permission",
+        "X-File-Id",
+        "X-Next-Cursor",
+        "X-Total-Count",
+    ],
 )
 
 # Override the default openapi schema
 app.openapi = custom_openapi
 
-# Create upload directory if it doesn't exist
-UPLOAD_DIR = "uploads"
-if not os.path.exists(UPLOAD_DIR):
-    os.makedirs(UPLOAD_DIR)
-
 # Create database tables if they don't exist
 Base.metadata.create_all(bind=engine)  # Only creates tables that don't exist
+sync_schema(engine)  # Add columns/indexes introduced since the tables were created
 
 # Create dependencies here
 get_admin_user = check_role([UserRole.ADMIN])
@@ -145,27 +198,6 @@ async def global_exception_handler(request: Request, exc: Exception):
         }
     )
 
-# Startup event
-@app.on_event("startup")
-async def startup_event():
-    logger.info("Application startup")
-    try:
-        # Initialize admin user only if it doesn't exist
-        db_session = next(get_db())  # Create a new session
-        try:
-            init_admin(db_session)
-            logger.info("Admin initialization completed")
-        finally:
-            db_session.close()  # Make sure to close the session
-    except Exception as e:
-        logger.error(f"Admin initialization failed: {str(e)}")
-
-# Shutdown event
-@app.on_event("shutdown")
-async def shutdown_event():
-    logger.info("Application shutdown")
-    # Add any cleanup code here
-
 @app.get("/")
 async def root():
     return JSONResponse(
@@ -178,7 +210,9 @@ async def root():
 # Include routers
 app.include_router(auth.router, prefix="/api")
 app.include_router(user.router, prefix="/api/user")
+app.include_router(uploads.router, prefix="/api/user")
 app.include_router(admin.router, prefix="/api/admin")
+app.include_router(metrics.router)
 
 # SSL Context
 ssl_context = None
@@ -197,22 +231,20 @@ else:
     logger.error("SSL certificates not found. HTTPS is required")
     raise RuntimeError(f"SSL certificates not found at {cert_path}. Please generate them using generate_ssl.py")
 
-# Add this new middleware before the security headers middleware
-@app.middleware("http")
-async def https_redirect(request: Request, call_next):
-    if request.url.scheme == "http":
-        url = request.url.replace(scheme="https")
-        return RedirectResponse(url=str(url), status_code=301)
-    return await call_next(request)
-
-@app.middleware("http")
-async def add_security_headers(request: Request, call_next):
-    response = await call_next(request)
-    response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains; preload"  # Enhanced HSTS
-    response.headers["X-Content-Type-Options"] = "nosniff"
-    response.headers["X-Frame-Options"] = "DENY"
-    response.headers["X-XSS-Protection"] = "1; mode=block"
-    return response
+# Compress JSON/text responses; encrypted binary bodies are left alone
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MIN_SIZE,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    zstd_level=settings.COMPRESSION_ZSTD_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY
+)
+
+# HTTPS redirect and security headers, outside CORS as before
+app.add_middleware(SecurityMiddleware)
+
+# Request latency per route, for /metrics
+app.add_middleware(MetricsMiddleware)
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,199 @@
+"""
+Pure-ASGI middleware.
+
+Unlike ``@app.middleware("http")`` (Starlette's ``BaseHTTPMiddleware``), these
+never run the endpoint in a separate task or pass the body through a queue,
+so streamed responses keep flowing chunk by chunk.
+"""
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+from starlette.datastructures import URL, Headers, MutableHeaders
+from starlette.responses import RedirectResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .utils.compression import StreamCompressor, available_encodings, create_compressor, negotiate_encoding
+from .utils.metrics import Histogram, REQUEST_SECONDS
+
+SECURITY_HEADERS: Dict[str, str] = {
+    "Strict-Transport-Security": "max-age=31536000; includeSubDomains; preload",  # Enhanced HSTS
+    "X-Content-Type-Options": "nosniff",
+    "X-Frame-Options": "DENY",
+    "X-XSS-Protection": "1; mode=block",
+}
+
+
+class SecurityMiddleware:
+    """
+    Redirect plain-HTTP requests to HTTPS and add security headers to every response.
+
+    Headers already set by the endpoint are replaced, matching the behaviour
+    of assigning them on the response object.
+    """
+
+    def __init__(self, app: ASGIApp, headers: Dict[str, str] = SECURITY_HEADERS, https_redirect: bool = True):
+        self.app = app
+        self.https_redirect = https_redirect
+        self.raw_headers: List[Tuple[bytes, bytes]] = [
+            (name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers.items()
+        ]
+        self.header_names = {name for name, _ in self.raw_headers}
+
+    def _merge(self, headers: Iterable[Tuple[bytes, bytes]]) -> List[Tuple[bytes, bytes]]:
+        kept = [(name, value) for name, value in headers if name.lower() not in self.header_names]
+        return kept + self.raw_headers
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = self._merge(message.get("headers", []))
+            await send(message)
+
+        if self.https_redirect and scope.get("scheme") == "http":
+            url = URL(scope=scope).replace(scheme="https")
+            response = RedirectResponse(url=str(url), status_code=301)
+            await response(scope, receive, send_with_headers)
+            return
+
+        await self.app(scope, receive, send_with_headers)
+
+
+class CompressionMiddleware:
+    """
+    Compress textual responses with the best coding the client accepts.
+
+    Only ``compressible_types`` are touched, so encrypted downloads
+    (``application/octet-stream``) pass through untouched, as do responses
+    that already have a ``Content-Encoding`` or carry ``Cache-Control:
+    no-transform``, and partial content: a ``Content-Range`` addresses the
+    identity bytes, so a coded range would be useless to clients. Single-message bodies below ``minimum_size`` are sent
+    as is; streamed bodies are compressed chunk by chunk.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        compressible_types: Tuple[str, ...] = ("application/json", "text/"),
+        gzip_level: int = 6,
+        zstd_level: int = 3,
+        brotli_quality: int = 4
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.compressible_types = compressible_types
+        self.levels = {"gzip_level": gzip_level, "zstd_level": zstd_level, "brotli_quality": brotli_quality}
+        self.encodings = available_encodings()
+
+    def _compressible(self, headers: Headers) -> bool:
+        content_type = headers.get("content-type", "").lower()
+        return (
+            content_type.startswith(self.compressible_types)
+            and "content-encoding" not in headers
+            and "content-range" not in headers
+            and not content_type.startswith("multipart/byteranges")
+            and "no-transform" not in headers.get("cache-control", "").lower()
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        compressor: Optional[StreamCompressor] = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start, compressor, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message.get("headers", []))
+                if message["status"] < 200 or message["status"] in (204, 206, 304) or not self._compressible(headers):
+                    passthrough = True
+                    await send(message)
+                else:
+                    # Hold the start until the first body chunk shows whether compression pays off
+                    start = message
+                return
+            if message["type"] != "http.response.body" or start is None:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                headers = MutableHeaders(raw=list(start.get("headers", [])))
+                headers.add_vary_header("Accept-Encoding")
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send({**start, "headers": headers.raw})
+                    await send(message)
+                    return
+                compressor = create_compressor(encoding, **self.levels)
+                headers["Content-Encoding"] = encoding
+                if "content-length" in headers:
+                    del headers["content-length"]
+                if not more_body:
+                    body = compressor.compress(body) + compressor.flush()
+                    headers["Content-Length"] = str(len(body))
+                    await send({**start, "headers": headers.raw})
+                    await send({"type": "http.response.body", "body": body, "more_body": False})
+                    return
+                await send({**start, "headers": headers.raw})
+
+            data = compressor.compress(body)
+            if not more_body:
+                data += compressor.flush()
+            if data or not more_body:
+                await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+
+class MetricsMiddleware:
+    """
+    Observe request latency per route template into ``histogram``.
+
+    The time runs until the app returns, i.e. until the last body chunk has
+    been handed to the server, so streamed downloads are measured in full.
+    Requests that match no route share the ``unmatched`` label.
+    """
+
+    def __init__(self, app: ASGIApp, histogram: Histogram = REQUEST_SECONDS):
+        self.app = app
+        self.histogram = histogram
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            self.histogram.observe(
+                time.perf_counter() - started,
+                method=scope["method"],
+                route=route,
+                status=status_code
+            )
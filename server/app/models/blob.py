@@ -0,0 +1,28 @@
+from sqlalchemy import Boolean, Column, Integer, String, DateTime
+from sqlalchemy.orm import relationship
+from datetime import datetime
+from ..database import Base
+
+class Blob(Base):
+    """Encrypted content shared by every File row with the same plaintext"""
+    __tablename__ = "blobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # Keyed hash (HMAC-SHA256) of the plaintext; never a plain hash, so it leaks nothing
+    digest = Column(String(64), unique=True, index=True, nullable=False)
+    # Location for operators; reads go through the storage backend using storage_key
+    file_path = Column(String, nullable=False)
+    storage_key = Column(String, nullable=True)
+    # Original (plaintext) size; the stored bytes may be compressed
+    size = Column(Integer)
+    # Compression applied before encryption ("zstd"), NULL when stored as-is
+    codec = Column(String, nullable=True)
+    ref_count = Column(Integer, default=0, nullable=False)
+    wrapped_key = Column(String, nullable=True)
+    kek_id = Column(Integer, nullable=True, index=True)
+    # Set only when an upload stores segmented content under a fresh random
+    # data key; such keys (and nothing else) may be sent sealed to clients
+    own_data_key = Column(Boolean, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    files = relationship("File", back_populates="blob")
@@ -1,8 +1,9 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Enum
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Enum, Index
 from sqlalchemy.orm import relationship
 from enum import Enum as PyEnum
 from datetime import datetime
 from ..database import Base
+from .blob import Blob
 
 class SharePermission(str, PyEnum):
     VIEW = "view"
@@ -10,6 +11,11 @@ class SharePermission(str, PyEnum):
 
 class File(Base):
     __tablename__ = "files"
+    __table_args__ = (
+        # Keyset pagination of the file list, per owner and (for admins) overall
+        Index("ix_files_owner_created", "owner_id", "created_at", "id"),
+        Index("ix_files_created", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     filename = Column(String)
@@ -20,6 +26,13 @@ class File(Base):
     owner_id = Column(Integer, ForeignKey("users.id"))
     is_deleted = Column(Boolean, default=False)
     file_type = Column(String)
+    # Envelope encryption: per-file data key wrapped by key-encryption key `kek_id`.
+    # Both are NULL for files encrypted directly with SERVER_AES_KEY.
+    wrapped_key = Column(String, nullable=True)
+    kek_id = Column(Integer, nullable=True, index=True)
+    # Deduplicated content; when set, the blob holds the path and wrapped data key
+    blob_id = Column(Integer, ForeignKey("blobs.id"), nullable=True, index=True)
     # Relationships
     owner = relationship("User", back_populates="files")
+    blob = relationship("Blob", back_populates="files")
     shares = relationship("FileShare", back_populates="file", cascade="all, delete-orphan")
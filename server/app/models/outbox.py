@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index
+from datetime import datetime
+from ..database import Base
+
+class OutboxMessage(Base):
+    """An email waiting to be delivered by the background dispatcher"""
+    __tablename__ = "email_outbox"
+    __table_args__ = (Index("ix_email_outbox_due", "status", "next_attempt_at"),)
+
+    PENDING = "pending"
+    SENDING = "sending"  # Claimed by a dispatcher until next_attempt_at (the lease)
+    SENT = "sent"
+    FAILED = "failed"
+    EXPIRED = "expired"  # Not delivered before expires_at
+    STATUSES = (PENDING, SENDING, SENT, FAILED, EXPIRED)
+
+    id = Column(Integer, primary_key=True, index=True)
+    recipient = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    body = Column(Text, nullable=False)
+    subtype = Column(String, default="html", nullable=False)
+    status = Column(String(16), default=PENDING, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True, index=True)  # Sent messages are swept after MAIL_RETENTION_DAYS
+    # Set for messages carrying short-lived secrets (login codes): they are not sent
+    # after this, and their body is cleared once they are sent, fail or expire
+    expires_at = Column(DateTime, nullable=True, index=True)
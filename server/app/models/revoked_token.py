@@ -0,0 +1,13 @@
+from sqlalchemy import Column, String, DateTime
+from datetime import datetime
+from ..database import Base
+
+class RevokedToken(Base):
+    """A revoked access token, identified by its ``jti`` claim"""
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String(32), primary_key=True)
+    # Rows are pruned once the token would have expired anyway
+    expires_at = Column(DateTime, nullable=False, index=True)
+    # Watermark for incremental refreshes of the in-memory revocation list
+    revoked_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
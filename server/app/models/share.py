@@ -11,7 +11,7 @@ class FileShare(Base):
     file_id = Column(Integer, ForeignKey("files.id"))
     shared_with_user_id = Column(Integer, ForeignKey("users.id"))
     share_link = Column(String, unique=True, index=True)
-    expires_at = Column(DateTime)
+    expires_at = Column(DateTime, index=True)  # Expired shares are swept by the maintenance scheduler
     permission = Column(Enum(SharePermission))
     created_at = Column(DateTime, default=datetime.utcnow)
 
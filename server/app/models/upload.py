@@ -0,0 +1,41 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy.orm import relationship
+from datetime import datetime
+from ..database import Base
+
+class UploadSession(Base):
+    """A resumable multipart upload that hasn't been completed yet"""
+    __tablename__ = "upload_sessions"
+
+    id = Column(String(32), primary_key=True)  # Random token handed to the client
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    filename = Column(String, nullable=False)
+    content_type = Column(String)
+    # The client's AES-GCM key, wrapped by KEK `kek_id` like a data key
+    client_key = Column(String, nullable=False)
+    # Data key the parts (and the assembled blob) are encrypted with
+    wrapped_key = Column(String, nullable=False)
+    kek_id = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+    parts = relationship(
+        "UploadPart",
+        back_populates="session",
+        cascade="all, delete-orphan",
+        order_by="UploadPart.part_number"
+    )
+
+class UploadPart(Base):
+    """One independently encrypted and stored part of an upload session"""
+    __tablename__ = "upload_parts"
+    __table_args__ = (UniqueConstraint("session_id", "part_number", name="uq_upload_part_number"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(String(32), ForeignKey("upload_sessions.id"), nullable=False, index=True)
+    part_number = Column(Integer, nullable=False)
+    size = Column(Integer, nullable=False)  # Plaintext bytes
+    storage_key = Column(String, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    session = relationship("UploadSession", back_populates="parts")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Enum as SQLAlchemyEnum
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Index, Enum as SQLAlchemyEnum
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from enum import Enum
@@ -10,6 +10,10 @@ class UserRole(str, Enum):
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Share picker: users of a role, paginated by name
+        Index("ix_users_role_name", "role", "full_name", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, unique=True, index=True)
@@ -11,7 +11,7 @@ class LoginVerification(Base):
     code = Column(String, nullable=False)
     is_used = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    expires_at = Column(DateTime(timezone=True))
+    expires_at = Column(DateTime(timezone=True), index=True)
 
     def is_expired(self) -> bool:
         return datetime.utcnow() > self.expires_at 
\ No newline at end of file
@@ -1,12 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Body, Request
-from sqlalchemy.orm import Session
-from typing import List, Annotated
+from fastapi import APIRouter, Depends, HTTPException, status, Body, Request, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from collections import Counter
+from typing import List, Annotated, Optional
 from datetime import datetime, timedelta
 
-from ..database import get_db
+from ..database import get_async_db
 from ..models.user import User, UserRole
 from ..models.file import File
-from ..schemas.user import UserResponse
+from ..schemas.user import UserResponse, UserStatusUpdate
 from ..schemas.auth import AdminLoginRequest, AdminLoginResponse, UserInResponse
 from ..utils.auth import (
     verify_password, 
@@ -14,6 +17,12 @@ from ..utils.auth import (
     ACCESS_TOKEN_EXPIRE_MINUTES
 )
 from ..dependencies.auth import check_role
+from ..services.blob_service import BlobService
+from ..utils.user_cache import user_cache
+from ..services.maintenance import maintenance
+from ..utils.pagination import encode_cursor, decode_cursor, set_page_headers
+from ..utils.responses import OrjsonResponse
+from ..config import settings
 
 router = APIRouter(tags=["Admin"])
 
@@ -24,16 +33,33 @@ get_admin_user = check_role([UserRole.ADMIN])
     "/users",
     response_model=List[UserResponse],
     summary="List all non-admin users",
-    description="Get a list of all registered non-admin users. Only accessible by admins.",
+    description="Get a page of registered non-admin users, ordered by id. The next page's cursor is returned in X-Next-Cursor. Only accessible by admins.",
     response_description="List of non-admin users retrieved successfully",
     dependencies=[Depends(get_admin_user)]
 )
 async def get_all_users(
     request: Request,
-    db: Session = Depends(get_db)
+    limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    # Query all users except those with ADMIN role
-    return db.query(User).filter(User.role != UserRole.ADMIN).all()
+    # Query non-admin users by id, one page at a time, without loading password hashes
+    query = select(
+        User.id, User.email, User.full_name, User.is_active, User.role, User.created_at
+    ).where(User.role != UserRole.ADMIN)
+    if cursor:
+        (after_id,) = decode_cursor(cursor, int)
+        query = query.where(User.id > after_id)
+    rows = (await db.execute(query.order_by(User.id).limit(limit + 1))).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].id)
+    # Projected rows already match UserResponse; serialize them directly instead of re-validating
+    response = OrjsonResponse([row._asdict() for row in rows])
+    set_page_headers(response, next_cursor)
+    return response
 
 @router.delete(
     "/users/{user_id}",
@@ -44,10 +70,10 @@ async def get_all_users(
 )
 async def delete_user(
     user_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Find the user
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     
     # Check if user exists
     if not user:
@@ -63,12 +89,75 @@ async def delete_user(
             detail="Cannot delete admin users"
         )
     
+    # Delete the user's files with them, dropping their references to shared blobs
+    files = (await db.execute(
+        select(File)
+        .options(selectinload(File.blob), selectinload(File.shares))
+        .where(File.owner_id == user.id)
+    )).scalars().all()
+    references = Counter(file.blob for file in files if file.blob is not None)
+    blobs = BlobService(db)
+    orphaned_keys = [await blobs.release(blob, count) for blob, count in references.items()]
+    for file in files:
+        await db.delete(file)
+
     # Delete the user
-    db.delete(user)
-    db.commit()
+    await db.delete(user)
+    await db.commit()
+    user_cache.invalidate(subject=user.email, user_id=user.id)
+    for storage_key in orphaned_keys:
+        await blobs.remove(storage_key)
     
     return None
 
+@router.patch(
+    "/users/{user_id}",
+    response_model=UserResponse,
+    summary="Activate or deactivate a user",
+    description="Set whether a user can sign in and use the API. Only accessible by admins.",
+    dependencies=[Depends(get_admin_user)]
+)
+async def update_user_status(
+    user_id: int,
+    update: UserStatusUpdate,
+    db: AsyncSession = Depends(get_async_db)
+):
+    user = await db.get(User, user_id)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    if user.role == UserRole.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Cannot deactivate admin users"
+        )
+
+    user.is_active = update.is_active
+    await db.commit()
+    # Takes effect on this worker's next request; other workers within the cache TTL
+    user_cache.invalidate(subject=user.email, user_id=user.id)
+    return user
+
+@router.get(
+    "/cache/users",
+    summary="Authenticated-user cache statistics",
+    description="Hit/miss counters of this worker's user cache. Only accessible by admins.",
+    dependencies=[Depends(get_admin_user)]
+)
+async def get_user_cache_stats():
+    return user_cache.stats()
+
+@router.get(
+    "/maintenance",
+    summary="Maintenance job statistics",
+    description="Rows swept and time spent by each of this worker's maintenance jobs. Only accessible by admins.",
+    dependencies=[Depends(get_admin_user)]
+)
+async def get_maintenance_stats():
+    return maintenance.stats()
+
 @router.delete(
     "/file/{file_id}",
     status_code=status.HTTP_204_NO_CONTENT,
@@ -78,10 +167,12 @@ async def delete_user(
 )
 async def delete_file(
     file_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Find the file
-    file = db.query(File).filter(File.id == file_id).first()
+    file = (await db.execute(
+        select(File).options(selectinload(File.blob)).where(File.id == file_id)
+    )).scalars().first()
     
     # Check if file exists
     if not file:
@@ -90,9 +181,12 @@ async def delete_file(
             detail="File not found"
         )
     
-    # Delete the file
-    db.delete(file)
-    db.commit()
+    # Delete the file, dropping its reference to the shared blob
+    blobs = BlobService(db)
+    orphaned_key = await blobs.release(file.blob) if file.blob is not None else None
+    await db.delete(file)
+    await db.commit()
+    await blobs.remove(orphaned_key)
     
     return None
 
@@ -1,18 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Body, Request, Response
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, Annotated, Dict, Any
 import re
 from datetime import timedelta, datetime
 import secrets
+import base64
 import string
 import os
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt
 from email_validator import validate_email, EmailNotValidError
 import html
-from collections import defaultdict
 
-from ..database import get_db
+from ..database import get_async_db
 from ..models.user import User, UserRole
 from ..models.verification import LoginVerification
 from ..schemas.user import UserCreate, UserResponse
@@ -20,9 +21,11 @@ from ..utils.auth import (
     get_password_hash, 
     create_access_token, 
     verify_password,
+    averify_password,
     ACCESS_TOKEN_EXPIRE_MINUTES,
     get_current_user,
-    get_current_active_user
+    get_current_active_user,
+    token_from_request
 )
 from ..schemas.auth import (
     Token, 
@@ -33,13 +36,13 @@ from ..schemas.auth import (
     MFASetupResponse,
     MFAVerifyRequest
 )
-from ..utils.email import send_verification_email
+from ..services.mail_dispatcher import mail_dispatcher
 from ..dependencies.auth import check_role
-from ..models.token_blacklist import TokenBlacklist
 from ..config import settings
 from ..services.auth_service import AuthService
 from ..utils.auth_utils import validate_email_address
 from ..utils.mfa import MFAHandler
+from ..utils.keyring import keyring
 
 router = APIRouter(tags=["Auth"])
 
@@ -50,13 +53,6 @@ get_any_user = check_role([UserRole.ADMIN, UserRole.USER])
 # Add these near the top with other router definitions
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-# Add these variables at the top of the file with other constants
-MAX_LOGIN_ATTEMPTS = 5
-LOGIN_TIMEOUT_MINUTES = 15
-
-# Create an in-memory store for login attempts
-login_attempts = defaultdict(list)
-
 def validate_password(password: str) -> bool:
     """
     Validate password strength
@@ -134,10 +130,10 @@ async def register_user(
             "password": "StrongPass123!"
         }
     )],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     auth_service = AuthService(db)
-    return auth_service.register_user(user.dict())
+    return await auth_service.register_user(user.dict())
 
 def generate_verification_code():
     # Generate a 6-digit code
@@ -168,10 +164,10 @@ async def login(
             "password": "StrongPass123!"
         }
     )],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     auth_service = AuthService(db)
-    auth_service.check_login_attempts(request.client.host)
+    await auth_service.check_login_attempts(request.client.host)
     
     if not validate_email_address(login_data.email):
         raise HTTPException(
@@ -180,10 +176,10 @@ async def login(
         )
     
     # Find user by email without role restriction
-    user = db.query(User).filter(User.email == login_data.email).first()
+    user = (await db.execute(select(User).where(User.email == login_data.email))).scalars().first()
     
     # Verify user exists and password is correct
-    if not user or not verify_password(login_data.password, user.hashed_password):
+    if not user or not await averify_password(login_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
@@ -208,16 +204,11 @@ async def login(
         expires_at=datetime.utcnow() + timedelta(minutes=10)
     )
     db.add(verification)
-    db.commit()
     
-    # Send MFA code via email
-    email_sent = await MFAHandler.send_mfa_code(user.email, mfa_code)
-    if not email_sent:
-        db.rollback()
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to send verification code"
-        )
+    # Queue the MFA code email with the verification; the outbox dispatcher sends it
+    MFAHandler.queue_mfa_code(db, user.email, mfa_code, verification.expires_at)
+    await db.commit()
+    mail_dispatcher.notify()
     
     return InitialLoginResponse(
         message="Verification code sent to your email",
@@ -245,14 +236,16 @@ async def verify_login(
             "code": "123456"
         }
     )],
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     response: Response = Response
 ):
     # Get verification record
-    verification = db.query(LoginVerification).filter(
-        LoginVerification.id == verify_data.verification_id,
-        LoginVerification.is_used == False
-    ).first()
+    verification = (await db.execute(
+        select(LoginVerification).where(
+            LoginVerification.id == verify_data.verification_id,
+            LoginVerification.is_used == False
+        )
+    )).scalars().first()
     
     if not verification:
         raise HTTPException(
@@ -275,46 +268,23 @@ async def verify_login(
         )
     
     # Get user
-    user = db.query(User).filter(User.id == verification.user_id).first()
+    user = await db.get(User, verification.user_id)
     
     # Mark verification as used
     verification.is_used = True
-    db.commit()
+    await db.commit()
     
     # Create access token
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    session_id = secrets.token_hex(16)
     access_token = create_access_token(
-        data={"sub": user.email},
+        data={"sub": user.email, "jti": session_id},
         expires_delta=access_token_expires
     )
     
-    # Store the token in the database
-    try:
-        expiresat = datetime.utcnow() + access_token_expires
-        expiry_timestamp = expiresat.timestamp()
-        expiry_timestamp_int = int(expiry_timestamp)
-
-        token_record = TokenBlacklist(
-            token=access_token,
-            expires_at=expiresat
-        )
-        
-        existing_token = db.query(TokenBlacklist).filter(
-            TokenBlacklist.token == access_token
-        ).first()
-        
-        if existing_token:
-            db.delete(existing_token)
-        
-        db.add(token_record)
-        db.commit()
-        
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to store token: {str(e)}"
-        )
+    expiresat = datetime.utcnow() + access_token_expires
+    expiry_timestamp = expiresat.timestamp()
+    expiry_timestamp_int = int(expiry_timestamp)
     
     # Create response with user data
     user_response = UserInResponse(
@@ -337,16 +307,22 @@ async def verify_login(
     return Token(
         access_token=access_token,
         token_type="bearer",
-        user=user_response
+        user=user_response,
+        transport_key=(
+            base64.b64encode(keyring.session_key(session_id)).decode("utf-8")
+            if keyring.transport_secret is not None else None
+        )
     )
 
 @router.post("/logout")
 async def logout(
+    request: Request,
     response: Response,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_any_user)
 ):
-    """Simplified logout that just removes the cookie"""
+    """Revoke the session's token and remove the cookie"""
+    await AuthService(db).revoke_token(token_from_request(request))
     response.delete_cookie(
         key="access_token",
         secure=True,
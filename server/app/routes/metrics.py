@@ -0,0 +1,63 @@
+import secrets
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from ..database import get_async_db, async_engine
+from ..models.outbox import OutboxMessage
+from ..utils.auth import get_current_user
+from ..utils.crypto_engine import crypto_engine
+from ..utils.executor import crypto_executor
+from ..utils.metrics import metrics
+
+router = APIRouter(tags=["Metrics"])
+
+CRYPTO_QUEUE_DEPTH = metrics.gauge("crypto_executor_queue_depth", "Crypto jobs queued or running")
+CRYPTO_COMPLETED = metrics.gauge("crypto_executor_completed", "Crypto jobs completed since startup")
+CRYPTO_BACKEND = metrics.gauge("crypto_backend_info", "AES backend in use (1) by name", ("backend",))
+DB_POOL_CONNECTIONS = metrics.gauge("db_pool_connections", "Async database pool connections", ("state",))
+EMAIL_OUTBOX = metrics.gauge("email_outbox_messages", "Messages in the email outbox", ("status",))
+
+
+async def authorize_metrics(request: Request, db: AsyncSession = Depends(get_async_db)) -> None:
+    """Accept ``Authorization: Bearer <METRICS_TOKEN>`` when configured, otherwise an admin session"""
+    if settings.METRICS_TOKEN:
+        expected = f"Bearer {settings.METRICS_TOKEN}"
+        if secrets.compare_digest(request.headers.get("authorization", ""), expected):
+            return
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+    user = await get_current_user(request, db)
+    if not user.is_active or not user.is_admin():
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You don't have permission to perform this action"
+        )
+
+
+def _collect_pool() -> None:
+    pool = async_engine.pool
+    for state, method in (("size", "size"), ("checked_out", "checkedout"), ("overflow", "overflow")):
+        if hasattr(pool, method):
+            DB_POOL_CONNECTIONS.set(getattr(pool, method)(), state=state)
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics(
+    _: None = Depends(authorize_metrics),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Metrics of this worker in the Prometheus text format"""
+    CRYPTO_QUEUE_DEPTH.set(crypto_executor.pending)
+    CRYPTO_COMPLETED.set(crypto_executor.completed)
+    CRYPTO_BACKEND.set(1, backend=crypto_engine.backend.name)
+    _collect_pool()
+
+    counts = dict((await db.execute(
+        select(OutboxMessage.status, func.count()).group_by(OutboxMessage.status)
+    )).all())
+    for outbox_status in OutboxMessage.STATUSES:
+        EMAIL_OUTBOX.set(counts.get(outbox_status, 0), status=outbox_status)
+
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
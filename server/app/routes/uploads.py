@@ -0,0 +1,118 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+import base64
+import binascii
+
+from ..database import get_async_db
+from ..models.user import User
+from ..models.upload import UploadSession
+from ..schemas.upload import UploadSessionCreate, UploadSessionComplete
+from ..services.upload_service import UploadSessionService
+from ..utils.auth import get_current_user
+from ..config import settings
+
+router = APIRouter(
+    tags=["Uploads"]
+)
+
+def _decode(value: str, name: str) -> bytes:
+    try:
+        return base64.b64decode(value, validate=True)
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=400, detail=f"Invalid {name}")
+
+def _session_response(session: UploadSession) -> dict:
+    return {
+        "upload_id": session.id,
+        "filename": session.filename,
+        "expires_at": session.expires_at,
+        "max_part_size": settings.UPLOAD_PART_MAX_SIZE,
+        "max_parts": settings.UPLOAD_MAX_PARTS,
+        "max_size": settings.UPLOAD_MAX_SIZE,
+        "parts": [
+            {"part_number": part.part_number, "size": part.size}
+            for part in session.parts
+        ]
+    }
+
+@router.post("/uploads")
+async def create_upload_session(
+    body: UploadSessionCreate,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Start a resumable upload.
+
+    Every part is then encrypted by the client on its own (AES-GCM with
+    ``user_key`` and a fresh IV per part) and PUT to
+    ``/uploads/{upload_id}/parts/{part_number}``, in any order and in parallel.
+    """
+    session = await UploadSessionService(db).create(
+        current_user,
+        filename=body.filename,
+        content_type=body.content_type,
+        client_key=_decode(body.user_key, "user_key")
+    )
+    return _session_response(session)
+
+@router.put("/uploads/{upload_id}/parts/{part_number}")
+async def upload_part(
+    upload_id: str,
+    part_number: int,
+    request: Request,
+    iv: str = Header(..., alias="X-Encryption-IV"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Upload one part as a raw ``ciphertext | tag`` body.
+
+    Re-sending a part number replaces the earlier upload, so a part that
+    failed half-way can simply be retried.
+    """
+    service = UploadSessionService(db)
+    session = await service.get(upload_id, current_user)
+    part = await service.put_part(session, part_number, request.stream(), _decode(iv, "IV"))
+    return {"part_number": part.part_number, "size": part.size}
+
+@router.get("/uploads/{upload_id}")
+async def get_upload_session(
+    upload_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Parts received so far, so an interrupted client knows what to resend"""
+    return _session_response(await UploadSessionService(db).get(upload_id, current_user))
+
+@router.post("/uploads/{upload_id}/complete")
+async def complete_upload_session(
+    upload_id: str,
+    body: Optional[UploadSessionComplete] = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Assemble the parts into a stored file"""
+    service = UploadSessionService(db)
+    session = await service.get(upload_id, current_user)
+    db_file = await service.complete(session, part_count=body.part_count if body else None)
+    return {
+        "message": "File uploaded successfully",
+        "filename": db_file.filename,
+        "id": db_file.id,
+        "size": db_file.size,
+        "upload_date": db_file.created_at,
+        "file_type": db_file.file_type
+    }
+
+@router.delete("/uploads/{upload_id}")
+async def abort_upload_session(
+    upload_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Abandon an upload and discard the parts received so far"""
+    service = UploadSessionService(db)
+    await service.abort(await service.get(upload_id, current_user))
+    return {"message": "Upload aborted"}
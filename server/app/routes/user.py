@@ -1,45 +1,140 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Form, Request
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Form, Request, Response, Query
 from fastapi.responses import HTMLResponse, FileResponse, StreamingResponse
-from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy import select, func, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import List, Literal, Optional
 import json
+import logging
 import secrets
-import os
-from pathlib import Path
-from ..database import get_db
+from ..database import get_async_db
 from ..models.user import User
 from ..models.file import File as FileModel, SharePermission
 from ..schemas.file import FileResponse, FileCreate, ShareFileRequest
 from ..utils.auth import get_current_user, get_current_active_user
-from ..utils.encryption import FileEncryption
+from ..utils.crypto_engine import AuthenticationError
+from ..utils.executor import crypto_executor
+from ..utils.file_crypto import (
+    stream_upload_to_disk,
+    iter_plaintext,
+    iter_transport_encrypted,
+    reencrypt_for_transport
+)
+from ..utils.file_format import EncryptedFileReader, TAG_SIZE
+from ..utils.keyring import keyring
+from ..utils.metrics import StageTimings, FILE_BYTES, optional_stage
+from ..utils.responses import OrjsonResponse
+from ..services.blob_service import BlobService
+from ..storage import StorageError
+from ..utils.pagination import encode_cursor, decode_cursor, keyset_condition, set_page_headers
+from ..utils.http_range import (
+    file_validators, requested_ranges, coalesce_ranges, partial_content_response, content_disposition
+)
+from ..utils.file_response import StoredFileResponse
 from datetime import datetime, timedelta
 from ..models.share import FileShare
 import base64
-from Crypto.Cipher import AES
-from Crypto.Util.Padding import pad, unpad
 from ..config import settings
 from dotenv import load_dotenv
 from ..schemas.user import UserBasicResponse
-from ..utils.email import send_share_email
-from io import BytesIO
+from ..utils.email import queue_share_email
+from ..services.mail_dispatcher import mail_dispatcher
 load_dotenv()
+logger = logging.getLogger(__name__)
 router = APIRouter(
     tags=["User"]
 )
-# Create uploads directory inside app directory
-UPLOAD_DIR = Path(__file__).parent.parent / "uploads"
-# file_encryption = FileEncryption()
-os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+async def _open_reader(blobs: BlobService, file: FileModel) -> EncryptedFileReader:
+    """Open a stored file through the storage backend, off the event loop"""
+    try:
+        return await crypto_executor.run(blobs.open_reader, file)
+    except StorageError:
+        raise HTTPException(status_code=404, detail="File not found")
+
+async def _partial_content(
+    request: Request,
+    file: FileModel,
+    blobs: BlobService,
+    timings: Optional[StageTimings] = None
+):
+    """
+    Serve a Range request for a stored file, or return None for a full response.
+
+    With ``timings`` the response is metered like a full download: stage
+    timings once the body is sent, and the bytes served in ``FILE_BYTES``.
+    """
+    if "range" not in request.headers:
+        return None
+    try:
+        etag, last_modified = file_validators(file.id, await blobs.stat(file))
+    except StorageError:
+        raise HTTPException(status_code=404, detail="File not found")
+    with optional_stage(timings, "open"):
+        reader = await _open_reader(blobs, file)
+    try:
+        ranges = requested_ranges(request, reader.size, etag, last_modified)
+    except HTTPException:
+        reader.close()
+        raise
+    if ranges is None:
+        reader.close()
+        return None
+    if file.blob is not None and file.blob.codec:
+        # Compressed content decodes from the start; serve every range in one pass
+        ranges = coalesce_ranges(ranges)
+    if timings is not None:
+        FILE_BYTES.inc(sum(end - start for start, end in ranges), direction="out")
+    return partial_content_response(
+        reader,
+        ranges,
+        content_type=file.file_type or "application/octet-stream",
+        etag=etag,
+        last_modified=last_modified,
+        timings=timings
+    )
 
-# Validate key lengths
-SERVER_AES_KEY = base64.b64decode(os.getenv("SERVER_AES_KEY"))
-if len(SERVER_AES_KEY) != 32:
-    raise ValueError(f"SERVER_AES_KEY must be 32 bytes, got {len(SERVER_AES_KEY)}")
+async def _sealed_response(request: Request, file: FileModel, blobs: BlobService, timings: StageTimings):
+    """
+    Serve the stored ciphertext as-is, with the file's data key wrapped for this session.
+
+    The body is the segmented on-disk format (``utils/file_format.py``). The
+    client unwraps ``X-Wrapped-Key`` (associated data ``file:<id>``) with its
+    session transport key and verifies and decrypts the segments itself, so
+    the server does no per-byte crypto. Local blobs are sent with sendfile
+    where the server supports it (see ``StoredFileResponse``), and ``Range``
+    requests address the ciphertext, so clients can fetch whole segments.
+    """
+    session_id = getattr(request.state, "session_id", None)
+    if not session_id:
+        raise HTTPException(status_code=400, detail="Session has no transport key, please log in again")
+    try:
+        stat = await blobs.stat(file)
+    except StorageError:
+        raise HTTPException(status_code=404, detail="File not found")
+    with timings.measure("wrap_key"):
+        wrapped_key = await crypto_executor.run(keyring.wrap_for_session, file, session_id, f"file:{file.id}")
+    timings.record()
 
-SERVER_AES_IV = base64.b64decode(os.getenv("SERVER_AES_IV"))
-if len(SERVER_AES_IV) != 16:
-    raise ValueError(f"SERVER_AES_IV must be 16 bytes, got {len(SERVER_AES_IV)}")
+    headers = {
+        "Content-Disposition": content_disposition(file.filename),
+        "X-Encryption-Mode": "sealed",
+        "X-Wrapped-Key": wrapped_key,
+        "Cache-Control": "no-store"
+    }
+    path = blobs.local_path(file)
+    if path is not None:
+        etag, last_modified = file_validators(file.id, stat)
+        # The bytes sent are ciphertext, and only the requested ranges of it
+        try:
+            ranges = requested_ranges(request, stat.size, etag, last_modified)
+        except HTTPException:
+            ranges = []
+        FILE_BYTES.inc(stat.size if ranges is None else sum(end - start for start, end in ranges), direction="out")
+        return StoredFileResponse(path, stat.size, etag, last_modified, headers=headers)
+    FILE_BYTES.inc(stat.size, direction="out")
+    headers["Content-Length"] = str(stat.size)
+    return StreamingResponse(blobs.iter_stored(file), media_type="application/octet-stream", headers=headers)
 
 @router.post("/upload")
 async def upload_file(
@@ -48,54 +143,71 @@ async def upload_file(
     iv: str = Form(...),
     user_key: str = Form(...),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Handle file upload with double encryption:
     1. Decrypt the client-side encrypted file (Web Crypto API AES-GCM)
-    2. Re-encrypt with server-side AES-256-GCM
-    3. Store the server-encrypted file
+    2. Re-encrypt with server-side AES-256-GCM under a per-blob data key
+    3. Store the server-encrypted content, deduplicated by a keyed hash
+
+    The file is processed as a stream of fixed-size chunks, so memory use does
+    not grow with the size of the upload.
     """
     try:
         # Parse encryption metadata from client
-        encrypted_data = await file.read()
         iv = base64.b64decode(iv)
         decoded_key = base64.b64decode(user_key)
-        print(f"Received Base64 Key: {user_key}")
-        print(f"Decoded Key Length: {len(decoded_key)} bytes")  # Should be 32
-        print(f"Decoded Key: {decoded_key.hex()}")  # Print actual bytes
 
-        # Decrypt client-side encryption
-        cipher = AES.new(decoded_key, AES.MODE_GCM, nonce=iv)
-        decrypted_data = cipher.decrypt(encrypted_data)
-
-        # Use GCM mode with the correct nonce length
-        server_cipher = AES.new(SERVER_AES_KEY, AES.MODE_GCM)  # Let it generate its own nonce
-        re_encrypted_data, tag = server_cipher.encrypt_and_digest(decrypted_data)
-        
         # Generate a secure random filename
         stored_filename = f"{secrets.token_hex(16)}_{file.filename}"
-        save_path = UPLOAD_DIR / f"{file.filename}.enc"
-        
-        with open(save_path, "wb") as f:
-            f.write(server_cipher.nonce)
-            f.write(tag)
-            f.write(re_encrypted_data)
+
+        # Each blob gets its own data key, stored wrapped by the active KEK
+        data_key, wrapped_key, kek_id = keyring.generate_data_key()
+
+        timings = StageTimings("upload")
+        try:
+            upload = await stream_upload_to_disk(
+                file,
+                client_key=decoded_key,
+                client_iv=iv,
+                server_key=data_key,
+                dest=BlobService.temp_path(),
+                hasher=keyring.content_hasher(),
+                timings=timings
+            )
+        except AuthenticationError:
+            raise HTTPException(status_code=400, detail="Upload failed authentication")
+
+        # Identical content is stored once; the new file just references it
+        with timings.measure("store"):
+            blob = await BlobService(db).store(
+                upload.path,
+                digest=upload.digest,
+                size=upload.size,
+                wrapped_key=wrapped_key,
+                kek_id=kek_id,
+                codec=upload.codec
+            )
         
         # Store file metadata in database
         db_file = FileModel(
             filename=file.filename,
             stored_filename=stored_filename,
-            file_path=str(save_path),  # Convert Path to string for database
-            size=len(re_encrypted_data),
+            file_path=blob.file_path,
+            size=upload.size,
             owner_id=current_user.id,
             created_at=datetime.utcnow(),
-            file_type=file.content_type
+            file_type=file.content_type,
+            blob_id=blob.id
         )
         
         db.add(db_file)
-        db.commit()
-        db.refresh(db_file)
+        with timings.measure("db_commit"):
+            await db.commit()
+            await db.refresh(db_file)
+        timings.record()
+        FILE_BYTES.inc(upload.size, direction="in")
         
         return {
             "message": "File uploaded successfully",
@@ -105,8 +217,10 @@ async def upload_file(
             "upload_date": db_file.created_at,
             "file_type": db_file.file_type
 }
+    except HTTPException:
+        raise
     except Exception as e:
-        print(e)
+        logger.exception("File upload failed")
         raise HTTPException(
             status_code=500,
             detail=f"Error processing file upload: {str(e)}"
@@ -114,137 +228,240 @@ async def upload_file(
 
 @router.get("/files", response_model=List[FileResponse])
 async def get_user_files(
+    limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    order: Literal["desc", "asc"] = Query("desc", description="Order by upload date"),
+    file_type: Optional[str] = Query(None, description="Exact MIME type, e.g. image/png"),
+    min_size: Optional[int] = Query(None, ge=0),
+    max_size: Optional[int] = Query(None, ge=0),
+    name_prefix: Optional[str] = Query(None, min_length=1, max_length=255),
+    include_total: bool = Query(False, description="Return the number of matching files in X-Total-Count"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Get all files owned by the current logged-in user, sorted by most recent first.
+    Get files owned by the current logged-in user, most recent first.
     If user has admin role, return all files in the system.
+
+    Results are paginated by ``(upload date, id)``: when more files match,
+    the ``X-Next-Cursor`` header holds the ``cursor`` for the next page.
+    ``include_total`` adds the number of matching files as ``X-Total-Count``.
     """
-    # Create base query
-    query = db.query(FileModel)
-    
-    # Check if user has admin role
-    is_admin = current_user.role == "admin"
-    
-    # If not admin, filter by user's files only
-    if not is_admin:
-        query = query.filter(FileModel.owner_id == current_user.id)
-    
-    # Get files sorted by creation date
-    files = query.order_by(FileModel.created_at.desc()).all()
-    
-    return [
+    # Filters shared by the page and the total count
+    filters = []
+    if current_user.role != "admin":
+        filters.append(FileModel.owner_id == current_user.id)
+    if file_type:
+        filters.append(FileModel.file_type == file_type)
+    if min_size is not None:
+        filters.append(FileModel.size >= min_size)
+    if max_size is not None:
+        filters.append(FileModel.size <= max_size)
+    if name_prefix:
+        filters.append(FileModel.filename.startswith(name_prefix, autoescape=True))
+
+    descending = order == "desc"
+    key = (FileModel.created_at, FileModel.id)
+    query = select(FileModel.id, FileModel.filename, FileModel.size, FileModel.created_at).where(*filters)
+    if cursor:
+        query = query.where(keyset_condition(key, decode_cursor(cursor, datetime, int), descending))
+    query = query.order_by(*(column.desc() if descending else column.asc() for column in key))
+
+    # Fetch one extra row to know whether another page follows
+    rows = (await db.execute(query.limit(limit + 1))).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+
+    total = None
+    if include_total:
+        total = (await db.execute(select(func.count()).select_from(FileModel).where(*filters))).scalar_one()
+
+    # The rows already match FileResponse; serialize them directly instead of re-validating
+    response = OrjsonResponse([
         {
-            "filename": file.filename,
-            "id": file.id,
-            "size": file.size,
-            "upload_date": file.created_at
+            "filename": row.filename,
+            "id": row.id,
+            "size": row.size,
+            "upload_date": row.created_at
         }
-        for file in files
-    ]
+        for row in rows
+    ])
+    set_page_headers(response, next_cursor, total)
+    return response
 
 @router.get("/download/{file_id}")
 async def download_file(
     file_id: int,
+    request: Request,
+    response: Response,
+    response_format: Literal["json", "binary", "sealed"] = Query("json", alias="format"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Download and decrypt a file:
     1. Verify file ownership
     2. Read the encrypted file
     3. Return encrypted data with necessary decryption metadata
+
+    With ``?format=binary`` the file is streamed as ``application/octet-stream``
+    (``ciphertext | tag``) and the key and IV are sent in the ``X-Encryption-Key``
+    and ``X-Encryption-IV`` headers. The default JSON body is kept for older clients.
+
+    With ``?format=sealed`` the stored ciphertext is sent unchanged and only
+    the file's data key is encrypted, for the session transport key returned
+    by ``verify-login`` (see ``_sealed_response``). Files without a data key
+    of their own (``KeyRing.can_seal``), compressed files, which clients
+    can't decode, and any file while ``TRANSPORT_KEY_SECRET`` is unset are
+    answered as ``format=binary`` instead; the
+    ``X-Encryption-Mode`` header says which one the client got.
+
+    Other requests carrying a ``Range`` header (optionally guarded by
+    ``If-Range``) receive a ``206 Partial Content`` response with just the
+    requested plaintext bytes.
     """
+    timings = StageTimings("download")
+
     # Check file ownership
-    file = db.query(FileModel).filter(
-        FileModel.id == file_id,
-        FileModel.owner_id == current_user.id
-    ).first()
+    with timings.measure("db_lookup"):
+        file = (await db.execute(
+            select(FileModel)
+            .options(selectinload(FileModel.blob))
+            .where(
+                FileModel.id == file_id,
+                FileModel.owner_id == current_user.id
+            )
+        )).scalars().first()
     
     if not file:
         raise HTTPException(status_code=404, detail="File not found")
     
+    blobs = BlobService(db)
+    if response_format == "sealed":
+        if keyring.can_seal(file) and not file.blob.codec:
+            return await _sealed_response(request, file, blobs, timings)
+        response_format = "binary"
+
+    partial = await _partial_content(request, file, blobs, timings)
+    if partial is not None:
+        return partial
+
     try:
-        # Read the encrypted file
-        with open(file.file_path, "rb") as f:
-            # First 16 bytes are nonce, next 16 bytes are tag, rest is encrypted data
-            nonce = f.read(16)
-            tag = f.read(16)
-            encrypted_data = f.read()
-        
-        # Create cipher for decryption
-        cipher = AES.new(SERVER_AES_KEY, AES.MODE_GCM, nonce=nonce)
-        
-        # Decrypt the data
-        decrypted_data = cipher.decrypt_and_verify(encrypted_data, tag)
-        
         # Generate a new key and IV for client-side encryption
         client_key = secrets.token_bytes(32)
         client_iv = secrets.token_bytes(12)  # 12 bytes for GCM mode
+
+        if response_format == "binary":
+            with timings.measure("open"):
+                reader = await _open_reader(blobs, file)
+            FILE_BYTES.inc(reader.size, direction="out")
+            # Stage timings are recorded once the body has been streamed
+            return StreamingResponse(
+                crypto_executor.iterate(iter_transport_encrypted(reader, client_key, client_iv, timings)),
+                media_type="application/octet-stream",
+                headers={
+                    "Content-Length": str(reader.size + TAG_SIZE),
+                    "Content-Disposition": content_disposition(file.filename),
+                    "X-Encryption-Key": base64.b64encode(client_key).decode('utf-8'),
+                    "X-Encryption-IV": base64.b64encode(client_iv).decode('utf-8'),
+                    "X-Encryption-Mode": "transport",
+                    "Accept-Ranges": "bytes",
+                    "Cache-Control": "no-store"
+                }
+            )
+
+        # Verify and re-encrypt the stored file one segment at a time
+        with timings.measure("open"):
+            reader = await _open_reader(blobs, file)
+        with reader:
+            re_encrypted_data, new_tag = await crypto_executor.run(
+                reencrypt_for_transport, reader, client_key, client_iv, timings
+            )
         
-        # Encrypt with the new key for transmission
-        client_cipher = AES.new(client_key, AES.MODE_GCM, nonce=client_iv)
-        re_encrypted_data, new_tag = client_cipher.encrypt_and_digest(decrypted_data)
-        
+        response.headers["Accept-Ranges"] = "bytes"
+
         # Encode binary data for JSON response
-        response_data = {
-            "filename": file.filename,
-            "encrypted_data": base64.b64encode(re_encrypted_data).decode('utf-8'),
-            "key": base64.b64encode(client_key).decode('utf-8'),
-            "iv": base64.b64encode(client_iv).decode('utf-8'),
-            "tag": base64.b64encode(new_tag).decode('utf-8')
-        }
+        with timings.measure("encode"):
+            response_data = {
+                "filename": file.filename,
+                "encrypted_data": base64.b64encode(re_encrypted_data).decode('utf-8'),
+                "key": base64.b64encode(client_key).decode('utf-8'),
+                "iv": base64.b64encode(client_iv).decode('utf-8'),
+                "tag": base64.b64encode(new_tag).decode('utf-8')
+            }
+        timings.record()
+        FILE_BYTES.inc(len(re_encrypted_data), direction="out")
         
         return response_data
         
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error downloading file: {str(e)}"
-        )
+    except HTTPException:
+        raise
+    except Exception:
+        logger.exception("File download failed")
+        raise HTTPException(status_code=500, detail="Error downloading file")
 
 @router.get("/users", response_model=List[UserBasicResponse])
 async def get_users_list(
+    q: Optional[str] = Query(None, min_length=1, max_length=100, description="Name or email prefix"),
+    limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Get list of all users with 'user' role, excluding the current user.
+    Get users with 'user' role, excluding the current user, ordered by name.
     Only returns basic info (id and name)
+
+    ``q`` matches the start of the name or email. Results are paginated;
+    the ``X-Next-Cursor`` header holds the ``cursor`` for the next page.
     """
-    users = db.query(User).filter(
+    query = select(User.id, User.full_name).where(
         User.role == "user",
         User.id != current_user.id  # Exclude current user
-    ).all()
-    
-    return [
+    )
+    if q:
+        query = query.where(or_(
+            User.full_name.startswith(q, autoescape=True),
+            User.email.startswith(q, autoescape=True)
+        ))
+    key = (User.full_name, User.id)
+    if cursor:
+        query = query.where(keyset_condition(key, decode_cursor(cursor, str, int), descending=False))
+    rows = (await db.execute(query.order_by(*key).limit(limit + 1))).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].full_name, rows[-1].id)
+    response = OrjsonResponse([
         {
-            "id": user.id,
-            "name": user.full_name
+            "id": row.id,
+            "name": row.full_name
         }
-        for user in users
-    ]
+        for row in rows
+    ])
+    set_page_headers(response, next_cursor)
+    return response
 
 @router.post("/share")
 async def share_file(
     request: ShareFileRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-
-    print(request.model_dump())
     # Validate permission type
     if request.permission not in [SharePermission.VIEW, SharePermission.DOWNLOAD]:
         raise HTTPException(status_code=400, detail="Invalid permission type")
 
     # Check if file exists and belongs to current user
-    file = db.query(FileModel).filter(FileModel.id == request.file_id).first()
+    file = await db.get(FileModel, request.file_id)
     if not file or file.owner_id != current_user.id:
         raise HTTPException(status_code=404, detail="File not found")
     
     # Check if user exists
-    shared_user = db.query(User).filter(User.id == request.user_id).first()
+    shared_user = await db.get(User, request.user_id)
     if not shared_user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -258,19 +475,21 @@ async def share_file(
     )
     
     db.add(share)
-    db.commit()
-    db.refresh(share)
     
     # Generate the full share URL
     share_url = f"{settings.FRONTEND_URL}/file/{share.share_link}/{request.permission}"
 
-    # Send email to the shared user
-    await send_share_email(
+    # Queue the email to the shared user in the same transaction as the share
+    queue_share_email(
+        db,
         email=shared_user.email,
         file_name=file.filename,
         share_link=share_url,
         current_user=current_user
-    )   
+    )
+    await db.commit()
+    await db.refresh(share)
+    mail_dispatcher.notify()
     
     return {
         "message": "File shared successfully",
@@ -283,37 +502,67 @@ async def share_file(
 @router.get("/shared/{share_link}")
 async def access_shared_file(
     share_link: str,
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    response_format: Literal["json", "binary"] = Query("json", alias="format"),
+    db: AsyncSession = Depends(get_async_db)
 ):
+    """
+    Access a file through a share link.
+
+    The default response is JSON with base64 encoded content. With
+    ``?format=binary`` the decrypted file is streamed as-is, with the share
+    details in ``X-Share-Permission`` and ``X-File-Id`` headers.
+    """
     # Get share record
-    share = db.query(FileShare).filter(FileShare.share_link == share_link).first()
+    share = (await db.execute(
+        select(FileShare).where(FileShare.share_link == share_link)
+    )).scalars().first()
     if not share:
         raise HTTPException(status_code=404, detail="Share link not found")
     
     # Check if share link has expired
     if share.expires_at < datetime.utcnow():
         # Delete expired share
-        db.delete(share)
-        db.commit()
+        await db.delete(share)
+        await db.commit()
         raise HTTPException(status_code=410, detail="Share link has expired")
     
     # Get file
-    file = db.query(FileModel).filter(FileModel.id == share.file_id).first()
+    file = (await db.execute(
+        select(FileModel)
+        .options(selectinload(FileModel.blob))
+        .where(FileModel.id == share.file_id)
+    )).scalars().first()
     if not file:
         raise HTTPException(status_code=404, detail="File not found")
+
+    blobs = BlobService(db)
+    partial = await _partial_content(request, file, blobs)
+    if partial is not None:
+        return partial
     
     try:
-        # Read the encrypted file
-        with open(file.file_path, "rb") as f:
-            nonce = f.read(16)
-            tag = f.read(16)
-            encrypted_data = f.read()
-        
-        # Create cipher for decryption
-        cipher = AES.new(SERVER_AES_KEY, AES.MODE_GCM, nonce=nonce)
-        
-        # Decrypt the data
-        decrypted_data = cipher.decrypt_and_verify(encrypted_data, tag)
+        if response_format == "binary":
+            reader = await _open_reader(blobs, file)
+            return StreamingResponse(
+                crypto_executor.iterate(iter_plaintext(reader)),
+                media_type=file.file_type or "application/octet-stream",
+                headers={
+                    "Content-Length": str(reader.size),
+                    "Content-Disposition": content_disposition(file.filename, "inline"),
+                    "X-Share-Permission": share.permission.value,
+                    "X-File-Id": str(file.id),
+                    "Accept-Ranges": "bytes",
+                    "Cache-Control": "no-store"
+                }
+            )
+
+        # Read, verify and decrypt the stored file
+        with await _open_reader(blobs, file) as reader:
+            decrypted_data = await crypto_executor.run(reader.read)
+
+        response.headers["Accept-Ranges"] = "bytes"
 
         # provide decrypted data as a response
         return {
@@ -324,8 +573,10 @@ async def access_shared_file(
             "id": file.id
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
-        print(e)
+        logger.exception("Shared file access failed")
         raise HTTPException(
             status_code=500,
             detail=f"Error accessing file: {str(e)}"
@@ -13,6 +13,8 @@ class Token(BaseModel):
     access_token: str
     token_type: str
     user: UserInResponse
+    # Base64 AES-256 key for ``?format=sealed`` downloads in this session
+    transport_key: Optional[str] = None
 
 class TokenData(BaseModel):
     email: Optional[str] = None
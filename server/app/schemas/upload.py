@@ -0,0 +1,10 @@
+from pydantic import BaseModel
+from typing import Optional
+
+class UploadSessionCreate(BaseModel):
+    filename: str
+    content_type: Optional[str] = None
+    user_key: str  # Base64 AES key the client encrypts every part with
+
+class UploadSessionComplete(BaseModel):
+    part_count: Optional[int] = None
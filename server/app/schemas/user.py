@@ -25,6 +25,9 @@ class UserResponse(UserBase):
     class Config:
         orm_mode = True
 
+class UserStatusUpdate(BaseModel):
+    is_active: bool
+
 class UserBasicResponse(BaseModel):
     id: int
     name: str
@@ -1,25 +1,22 @@
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
+from jose import JWTError, jwt
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status
-from collections import defaultdict
 
 from ..models.user import User, UserRole
 from ..models.verification import LoginVerification
-from ..models.token_blacklist import TokenBlacklist
-from ..utils.auth import get_password_hash, verify_password
+from ..utils.revocation import revocation_list
+from ..utils.rate_limit import login_limiter
+from ..utils.auth import get_password_hash, verify_password, aget_password_hash
 from ..utils.auth_utils import validate_password, sanitize_input, validate_user_input
 from ..config import settings
 
-# Rate limiting storage
-login_attempts = defaultdict(list)
-MAX_LOGIN_ATTEMPTS = 100
-LOGIN_TIMEOUT_MINUTES = 15
-
 class AuthService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def register_user(self, user_data: dict) -> User:
+    async def register_user(self, user_data: dict) -> User:
         """Handle user registration logic"""
         validation_errors = validate_user_input(user_data)
         if validation_errors:
@@ -30,7 +27,8 @@ class AuthService:
         
         sanitized_full_name = sanitize_input(user_data["full_name"])
         
-        if self.db.query(User).filter(User.email == user_data["email"].lower()).first():
+        existing = await self.db.execute(select(User.id).where(User.email == user_data["email"].lower()))
+        if existing.first():
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email already registered"
@@ -42,7 +40,7 @@ class AuthService:
                 detail="Password must be at least 8 characters long and contain uppercase, lowercase, number and special character"
             )
         
-        hashed_password = get_password_hash(user_data["password"])
+        hashed_password = await aget_password_hash(user_data["password"])
         db_user = User(
             email=user_data["email"].lower(),
             full_name=sanitized_full_name,
@@ -52,44 +50,38 @@ class AuthService:
         
         try:
             self.db.add(db_user)
-            self.db.commit()
-            self.db.refresh(db_user)
+            await self.db.commit()
+            await self.db.refresh(db_user)
             return db_user
         except Exception as e:
-            self.db.rollback()
+            await self.db.rollback()
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Could not create user"
             )
 
-    def check_login_attempts(self, client_ip: str):
+    async def check_login_attempts(self, client_ip: str):
         """Handle rate limiting logic"""
-        current_time = datetime.utcnow()
-        
-        login_attempts[client_ip] = [
-            attempt_time for attempt_time in login_attempts[client_ip]
-            if current_time - attempt_time < timedelta(minutes=LOGIN_TIMEOUT_MINUTES)
-        ]
-        
-        if len(login_attempts[client_ip]) >= MAX_LOGIN_ATTEMPTS:
-            raise HTTPException(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail=f"Too many login attempts. Please try again in {LOGIN_TIMEOUT_MINUTES} minutes"
-            )
-        
-        login_attempts[client_ip].append(current_time)
+        await login_limiter.check(
+            client_ip,
+            detail=f"Too many login attempts. Please try again in {settings.LOGIN_WINDOW_SECONDS // 60} minutes"
+        )
 
-    def blacklist_token(self, token: str) -> bool:
-        """Remove token from database on logout"""
+    async def revoke_token(self, token: str) -> bool:
+        """Revoke a token (on logout) by its jti until it would have expired"""
+        if not token:
+            return False
+        try:
+            claims = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.ALGORITHM])
+        except JWTError:
+            return False
+        jti = claims.get("jti")
+        if not jti:
+            return False
+        expires_at = datetime.utcfromtimestamp(claims["exp"])
         try:
-            # Find and delete the token
-            result = self.db.query(TokenBlacklist).filter(
-                TokenBlacklist.token == token
-            ).delete()
-            
-            self.db.commit()
-            return result > 0  # Returns True if a token was deleted
-            
+            await revocation_list.revoke(self.db, jti, expires_at)
+            return True
         except Exception:
-            self.db.rollback()
-            return False 
\ No newline at end of file
+            await self.db.rollback()
+            return False
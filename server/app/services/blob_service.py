@@ -0,0 +1,178 @@
+import logging
+import os
+import secrets
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, Optional
+from sqlalchemy import select, update, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.blob import Blob
+from ..storage import StorageBackend, StorageError, StorageStat, storage as default_storage, temp_dir
+from ..utils.content_codec import open_decoded
+from ..utils.file_format import EncryptedFileReader
+from ..utils.keyring import keyring
+
+logger = logging.getLogger(__name__)
+
+
+class BlobService:
+    """
+    Content-addressed storage for encrypted uploads.
+
+    Blobs are keyed by an HMAC of the plaintext and reference counted, so
+    identical content uploaded by many users is stored (and encrypted) once.
+    Database changes are made in the caller's session; the caller commits.
+    """
+
+    def __init__(self, db: AsyncSession, storage: Optional[StorageBackend] = None):
+        self.db = db
+        self.storage = storage or default_storage
+
+    @staticmethod
+    def temp_path() -> Path:
+        """Fresh local path for an upload that hasn't been addressed yet"""
+        directory = temp_dir()
+        os.makedirs(directory, exist_ok=True)
+        return directory / f"{secrets.token_hex(16)}.enc"
+
+    async def _acquire_existing(self, digest: str) -> Optional[Blob]:
+        blob = (await self.db.execute(select(Blob).where(Blob.digest == digest))).scalars().first()
+        if blob is None:
+            return None
+        # Only take a reference if the blob isn't concurrently being released
+        result = await self.db.execute(
+            update(Blob)
+            .where(Blob.id == blob.id, Blob.ref_count > 0)
+            .values(ref_count=Blob.ref_count + 1)
+        )
+        if result.rowcount == 0:
+            return None
+        await self.db.refresh(blob)
+        return blob
+
+    async def store(
+        self,
+        tmp_path: Path,
+        digest: str,
+        size: int,
+        wrapped_key: str,
+        kek_id: int,
+        codec: Optional[str] = None
+    ) -> Blob:
+        """
+        Take a reference to the blob for ``digest``, creating it from ``tmp_path`` if needed.
+
+        When the content already exists the freshly written temporary file is
+        discarded and the existing blob (and its data key and codec) is reused.
+        ``size`` is the original size, ``codec`` the compression applied, if any.
+        """
+        try:
+            blob = await self._acquire_existing(digest)
+            if blob is not None:
+                logger.info(f"Deduplicated upload into blob {blob.id}")
+                return blob
+
+            # Every row gets its own object: a released blob's late delete must
+            # never hit the object of a new blob for the same content
+            storage_key = f"{digest}-{secrets.token_hex(8)}"
+            blob = Blob(
+                digest=digest,
+                storage_key=storage_key,
+                file_path=self.storage.uri(storage_key),
+                size=size,
+                codec=codec,
+                ref_count=1,
+                wrapped_key=wrapped_key,
+                kek_id=kek_id,
+                own_data_key=True
+            )
+            try:
+                # Claims the digest before the content is moved into place. The
+                # savepoint confines a conflict to this insert, not the caller's session.
+                async with self.db.begin_nested():
+                    self.db.add(blob)
+            except IntegrityError:
+                # Someone stored the same content concurrently
+                blob = await self._acquire_existing(digest)
+                if blob is None:
+                    raise
+                return blob
+
+            await self.storage.put_file(storage_key, tmp_path)
+            return blob
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    async def release(self, blob: Blob, count: int = 1) -> Optional[str]:
+        """
+        Drop ``count`` references. Returns the storage key to delete once the
+        caller has committed, if these were the last references.
+        """
+        storage_key = blob.storage_key
+        await self.db.execute(
+            update(Blob).where(Blob.id == blob.id).values(ref_count=Blob.ref_count - count)
+        )
+        result = await self.db.execute(
+            delete(Blob).where(Blob.id == blob.id, Blob.ref_count <= 0)
+        )
+        if result.rowcount:
+            self.db.expunge(blob)
+            return storage_key
+        self.db.expire(blob)
+        return None
+
+    async def remove(self, storage_key: Optional[str]) -> None:
+        if storage_key:
+            await self.storage.delete(storage_key)
+
+    def open_reader(self, file) -> EncryptedFileReader:
+        """
+        Reader for a File row (with ``blob`` loaded), whether it is blob-backed or a legacy flat file.
+
+        Compressed blobs are decompressed on the fly, so the reader always
+        yields the original content.
+        """
+        data_key = keyring.data_key_for(file)
+        blob = file.blob
+        if blob is not None and blob.storage_key:
+            reader = EncryptedFileReader(self.storage.open(blob.storage_key), data_key)
+            return open_decoded(reader, blob.codec, blob.size)
+        # Files stored before the storage backend existed keep a local path
+        path = blob.file_path if blob is not None else file.file_path
+        try:
+            return EncryptedFileReader.open(path, data_key)
+        except FileNotFoundError:
+            raise StorageError(f"Object not found: {path}")
+
+    def local_path(self, file) -> Optional[str]:
+        """Filesystem path of a file's stored ciphertext, when the backend keeps one"""
+        blob = file.blob
+        if blob is not None and blob.storage_key:
+            return self.storage.local_path(blob.storage_key)
+        return blob.file_path if blob is not None else file.file_path
+
+    def iter_stored(self, file, chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+        """Blocking iterator over a blob-backed file's stored ciphertext, as-is"""
+        fileobj = self.storage.open(file.blob.storage_key)
+        try:
+            while True:
+                chunk = fileobj.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+        finally:
+            fileobj.close()
+
+    async def stat(self, file) -> StorageStat:
+        blob = file.blob
+        if blob is not None and blob.storage_key:
+            return await self.storage.stat(blob.storage_key)
+        path = blob.file_path if blob is not None else file.file_path
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            raise StorageError(f"Object not found: {path}")
+        return StorageStat(stat.st_size, datetime.utcfromtimestamp(stat.st_mtime))
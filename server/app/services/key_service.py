@@ -0,0 +1,74 @@
+import logging
+from typing import Optional
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from ..models.blob import Blob
+from ..models.file import File
+from ..utils.keyring import KeyRing, keyring as default_keyring
+
+logger = logging.getLogger(__name__)
+
+
+class KeyRotationService:
+    """
+    Re-wraps per-file and per-blob data keys under the active key-encryption key.
+
+    File contents are never touched: each row only has its 32-byte data key
+    unwrapped with the old KEK and wrapped with the new one, in bulk
+    transactions of ``batch_size`` rows.
+    """
+
+    def __init__(self, db: Session, keyring: Optional[KeyRing] = None):
+        self.db = db
+        self.keyring = keyring or default_keyring
+
+    def _pending_query(self, model, adopt_legacy: bool):
+        stale = model.kek_id != self.keyring.active_id
+        if adopt_legacy:
+            # Legacy rows get SERVER_AES_KEY wrapped as their data key
+            stale = or_(stale, model.kek_id.is_(None))
+        query = self.db.query(model.id, model.wrapped_key, model.kek_id).filter(stale)
+        if model is File:
+            # Deduplicated files keep their key on the blob
+            query = query.filter(File.blob_id.is_(None))
+        return query
+
+    def pending_count(self, adopt_legacy: bool = False) -> int:
+        return sum(self._pending_query(model, adopt_legacy).count() for model in (Blob, File))
+
+    def rotate(self, batch_size: int = 1000, adopt_legacy: bool = False) -> int:
+        """Re-wrap every stale data key; returns the number of rows updated"""
+        return sum(self._rotate_model(model, batch_size, adopt_legacy) for model in (Blob, File))
+
+    def _rotate_model(self, model, batch_size: int, adopt_legacy: bool) -> int:
+        rotated = 0
+        last_id = 0
+        while True:
+            rows = (
+                self._pending_query(model, adopt_legacy)
+                .filter(model.id > last_id)
+                .order_by(model.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not rows:
+                break
+
+            mappings = []
+            for row in rows:
+                wrapped_key, kek_id = self.keyring.rewrap(row.wrapped_key, row.kek_id)
+                mappings.append({"id": row.id, "wrapped_key": wrapped_key, "kek_id": kek_id})
+
+            try:
+                self.db.bulk_update_mappings(model, mappings)
+                self.db.commit()
+            except Exception:
+                self.db.rollback()
+                raise
+
+            rotated += len(mappings)
+            last_id = rows[-1].id
+            logger.info(f"Re-wrapped {rotated} {model.__tablename__} data keys (up to id {last_id})")
+
+        return rotated
@@ -0,0 +1,273 @@
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from typing import Callable, List, Optional, Tuple
+import aiosmtplib
+from sqlalchemy import select, update
+
+from ..config import settings
+from ..database import AsyncSessionLocal
+from ..models.outbox import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+
+def default_smtp_factory() -> aiosmtplib.SMTP:
+    return aiosmtplib.SMTP(
+        hostname=settings.SMTP_HOST,
+        port=settings.SMTP_PORT,
+        use_tls=settings.MAIL_SSL,
+        start_tls=settings.MAIL_TLS,
+        username=settings.SMTP_USER or None,
+        password=settings.SMTP_PASSWORD or None,
+        timeout=settings.SMTP_TIMEOUT_SECONDS
+    )
+
+
+class SMTPConnectionPool:
+    """
+    Up to ``size`` long-lived SMTP connections.
+
+    Connections are reused across messages and batches, so the TCP/TLS
+    handshake and AUTH happen once per connection rather than per email.
+    Idle connections older than ``idle_timeout`` are closed instead of
+    reused, before the server drops them on its own.
+    """
+
+    def __init__(self, size: int = 2, factory: Callable[[], aiosmtplib.SMTP] = default_smtp_factory, idle_timeout: float = 60):
+        self.size = size
+        self.factory = factory
+        self.idle_timeout = idle_timeout
+        self._idle: List[Tuple[aiosmtplib.SMTP, float]] = []
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.connects = 0
+
+    async def _close(self, smtp: aiosmtplib.SMTP) -> None:
+        try:
+            if smtp.is_connected:
+                await smtp.quit()
+        except Exception:
+            smtp.close()
+
+    async def acquire(self) -> aiosmtplib.SMTP:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.size)
+        await self._semaphore.acquire()
+        try:
+            while self._idle:
+                smtp, idle_since = self._idle.pop()
+                if smtp.is_connected and time.monotonic() - idle_since < self.idle_timeout:
+                    return smtp
+                await self._close(smtp)
+            smtp = self.factory()
+            await smtp.connect()
+            self.connects += 1
+            return smtp
+        except Exception:
+            self._semaphore.release()
+            raise
+
+    async def release(self, smtp: aiosmtplib.SMTP, broken: bool = False) -> None:
+        try:
+            if broken:
+                await self._close(smtp)
+            else:
+                self._idle.append((smtp, time.monotonic()))
+        finally:
+            self._semaphore.release()
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+        for smtp, _ in idle:
+            await self._close(smtp)
+
+
+class MailDispatcher:
+    """
+    Delivers the email outbox in the background.
+
+    Due messages are claimed in batches with a lease (so several workers can
+    run a dispatcher without sending twice), sent concurrently over the
+    connection pool, and either marked sent or rescheduled with exponential
+    backoff. After ``max_attempts`` a message is marked failed. Messages
+    past their ``expires_at`` are marked expired instead of sent, and the
+    body of an expiring message is cleared once it is sent, fails or expires.
+    """
+
+    def __init__(
+        self,
+        session_factory=AsyncSessionLocal,
+        pool: Optional[SMTPConnectionPool] = None,
+        batch_size: int = 50,
+        max_attempts: int = 5,
+        retry_base: float = 30,
+        retry_max: float = 3600,
+        poll_interval: float = 5,
+        lease: float = 300,
+        sender: str = ""
+    ):
+        self.session_factory = session_factory
+        self.pool = pool or SMTPConnectionPool()
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.sender = sender
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.sent = 0
+        self.failed = 0
+
+    def backoff(self, attempts: int) -> float:
+        delay = min(self.retry_max, self.retry_base * 2 ** (attempts - 1))
+        return delay * random.uniform(0.8, 1.2)
+
+    def notify(self) -> None:
+        """Wake the dispatcher after enqueueing, instead of waiting for the next poll"""
+        if self._loop is not None and self._wakeup is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _expire(self, db, now: datetime) -> None:
+        # Only claimable rows: a message mid-send keeps its lease
+        await db.execute(
+            update(OutboxMessage)
+            .where(
+                OutboxMessage.status.in_([OutboxMessage.PENDING, OutboxMessage.SENDING]),
+                OutboxMessage.next_attempt_at <= now,
+                OutboxMessage.expires_at <= now
+            )
+            .values(status=OutboxMessage.EXPIRED, body="")
+            .execution_options(synchronize_session=False)
+        )
+
+    async def _claim(self, db) -> List[OutboxMessage]:
+        now = datetime.utcnow()
+        await self._expire(db, now)
+        result = await db.execute(
+            select(OutboxMessage)
+            .where(
+                OutboxMessage.status.in_([OutboxMessage.PENDING, OutboxMessage.SENDING]),
+                OutboxMessage.next_attempt_at <= now
+            )
+            .order_by(OutboxMessage.next_attempt_at)
+            .limit(self.batch_size)
+        )
+        claimed = []
+        for message in result.scalars().all():
+            # Expired SENDING leases belong to a dispatcher that died mid-send
+            claim = await db.execute(
+                update(OutboxMessage)
+                .where(
+                    OutboxMessage.id == message.id,
+                    OutboxMessage.status == message.status,
+                    OutboxMessage.next_attempt_at == message.next_attempt_at
+                )
+                .values(
+                    status=OutboxMessage.SENDING,
+                    attempts=OutboxMessage.attempts + 1,
+                    next_attempt_at=now + timedelta(seconds=self.lease)
+                )
+                .execution_options(synchronize_session=False)
+            )
+            if claim.rowcount:
+                claimed.append(message)
+        await db.commit()
+        for message in claimed:
+            await db.refresh(message)
+        return claimed
+
+    def _build(self, message: OutboxMessage) -> EmailMessage:
+        email = EmailMessage()
+        email["From"] = self.sender
+        email["To"] = message.recipient
+        email["Subject"] = message.subject
+        email.set_content(message.body, subtype=message.subtype)
+        return email
+
+    async def _deliver(self, message: OutboxMessage) -> Optional[str]:
+        """Send one message, returning an error description on failure"""
+        try:
+            smtp = await self.pool.acquire()
+        except Exception as e:
+            return f"connect: {e}"
+        try:
+            await smtp.send_message(self._build(message))
+        except Exception as e:
+            await self.pool.release(smtp, broken=True)
+            return str(e)
+        await self.pool.release(smtp)
+        return None
+
+    async def dispatch_once(self) -> int:
+        """Claim and send one batch, returning how many messages were processed"""
+        async with self.session_factory() as db:
+            messages = await self._claim(db)
+            if not messages:
+                return 0
+            errors = await asyncio.gather(*(self._deliver(message) for message in messages))
+
+            now = datetime.utcnow()
+            for message, error in zip(messages, errors):
+                if error is None:
+                    message.status = OutboxMessage.SENT
+                    message.sent_at = now
+                    message.last_error = None
+                    self.sent += 1
+                elif message.attempts >= self.max_attempts:
+                    message.status = OutboxMessage.FAILED
+                    message.last_error = error[:500]
+                    self.failed += 1
+                    logger.error(f"Giving up on email {message.id} to {message.recipient}: {error}")
+                elif message.expires_at is not None and message.expires_at <= now:
+                    message.status = OutboxMessage.EXPIRED
+                    message.last_error = error[:500]
+                    logger.warning(f"Email {message.id} expired before it could be sent: {error}")
+                else:
+                    message.status = OutboxMessage.PENDING
+                    message.next_attempt_at = now + timedelta(seconds=self.backoff(message.attempts))
+                    message.last_error = error[:500]
+                    logger.warning(f"Email {message.id} failed (attempt {message.attempts}), retrying: {error}")
+                if message.expires_at is not None and message.status != OutboxMessage.PENDING:
+                    message.body = ""
+            await db.commit()
+            return len(messages)
+
+    async def run(self) -> None:
+        """Dispatch until cancelled"""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        while True:
+            try:
+                processed = await self.dispatch_once()
+            except Exception as e:
+                logger.error(f"Email dispatch failed: {str(e)}")
+                processed = 0
+            if processed >= self.batch_size:
+                # More may be due; keep draining
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def close(self) -> None:
+        await self.pool.close()
+
+
+mail_dispatcher = MailDispatcher(
+    pool=SMTPConnectionPool(
+        size=settings.SMTP_POOL_SIZE,
+        idle_timeout=settings.SMTP_IDLE_TIMEOUT_SECONDS
+    ),
+    batch_size=settings.MAIL_BATCH_SIZE,
+    max_attempts=settings.MAIL_MAX_ATTEMPTS,
+    retry_base=settings.MAIL_RETRY_BASE_SECONDS,
+    poll_interval=settings.MAIL_POLL_INTERVAL_SECONDS,
+    sender=settings.SMTP_USER
+)
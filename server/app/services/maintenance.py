@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional, Set
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from ..database import AsyncSessionLocal
+from ..models.share import FileShare
+from ..models.verification import LoginVerification
+from ..models.outbox import OutboxMessage
+from ..utils.revocation import revocation_list
+from .upload_service import UploadSessionService
+
+logger = logging.getLogger(__name__)
+
+Job = Callable[[AsyncSession], Awaitable[Optional[int]]]
+
+
+async def sweep_expired(db: AsyncSession, column, cutoff: datetime, *where, batch_size: int = 1000) -> int:
+    """
+    Delete rows whose ``column`` is at or before ``cutoff``, ``batch_size`` at a time.
+
+    Each batch is found through the index on ``column`` and deleted by primary
+    key in its own transaction, so locks stay short and requests can run
+    between batches. Returns the number of rows deleted.
+    """
+    model = column.class_
+    primary_key = model.__mapper__.primary_key[0]
+    total = 0
+    while True:
+        ids = (await db.execute(
+            select(primary_key).where(column <= cutoff, *where).order_by(column).limit(batch_size)
+        )).scalars().all()
+        if not ids:
+            break
+        await db.execute(
+            delete(model).where(primary_key.in_(ids)).execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        total += len(ids)
+        if len(ids) < batch_size:
+            break
+        await asyncio.sleep(0)
+    return total
+
+
+async def sweep_shares(db: AsyncSession) -> int:
+    return await sweep_expired(
+        db, FileShare.expires_at, datetime.utcnow(), batch_size=settings.MAINTENANCE_BATCH_SIZE
+    )
+
+
+async def sweep_verifications(db: AsyncSession) -> int:
+    return await sweep_expired(
+        db, LoginVerification.expires_at, datetime.utcnow(), batch_size=settings.MAINTENANCE_BATCH_SIZE
+    )
+
+
+async def sweep_sent_mail(db: AsyncSession) -> int:
+    cutoff = datetime.utcnow() - timedelta(days=settings.MAIL_RETENTION_DAYS)
+    sent = await sweep_expired(
+        db,
+        OutboxMessage.sent_at,
+        cutoff,
+        OutboxMessage.status == OutboxMessage.SENT,
+        batch_size=settings.MAINTENANCE_BATCH_SIZE
+    )
+    expired = await sweep_expired(
+        db,
+        OutboxMessage.expires_at,
+        cutoff,
+        OutboxMessage.status == OutboxMessage.EXPIRED,
+        batch_size=settings.MAINTENANCE_BATCH_SIZE
+    )
+    return sent + expired
+
+
+async def collect_stale_uploads(db: AsyncSession) -> int:
+    """Remove upload sessions that were never completed"""
+    return await UploadSessionService(db).gc_stale()
+
+
+class JobStats:
+    def __init__(self):
+        self.runs = 0
+        self.failures = 0
+        self.rows = 0
+        self.seconds = 0.0
+        self.last_rows = 0
+        self.last_seconds = 0.0
+        self.last_run: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, object]:
+        return dict(vars(self))
+
+
+class MaintenanceScheduler:
+    """
+    Runs periodic housekeeping jobs, each in its own task and DB session.
+
+    A job takes an ``AsyncSession`` and returns how many rows it removed.
+    Per-job counters (runs, rows swept, time spent, last error) are kept for
+    the admin maintenance endpoint.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal):
+        self.session_factory = session_factory
+        self._jobs: Dict[str, tuple] = {}
+        self._stats: Dict[str, JobStats] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    def add_job(self, name: str, interval: float, job: Job) -> None:
+        self._jobs[name] = (interval, job)
+        self._stats[name] = JobStats()
+
+    async def run_job(self, name: str) -> int:
+        """Run one job now, recording its metrics; errors are logged, not raised"""
+        _, job = self._jobs[name]
+        stats = self._stats[name]
+        started = time.perf_counter()
+        rows = 0
+        try:
+            async with self.session_factory() as db:
+                rows = await job(db) or 0
+            stats.last_error = None
+        except Exception as e:
+            stats.failures += 1
+            stats.last_error = str(e)
+            logger.error(f"Maintenance job {name} failed: {str(e)}")
+        elapsed = time.perf_counter() - started
+        stats.runs += 1
+        stats.rows += rows
+        stats.seconds += elapsed
+        stats.last_rows = rows
+        stats.last_seconds = elapsed
+        stats.last_run = datetime.utcnow()
+        if rows:
+            logger.info(f"Maintenance job {name} removed {rows} rows in {elapsed:.3f}s")
+        return rows
+
+    async def _run_periodically(self, name: str, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            await self.run_job(name)
+
+    def start(self) -> None:
+        for name, (interval, _) in self._jobs.items():
+            self._tasks.add(asyncio.create_task(self._run_periodically(name, interval)))
+
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks, set()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Dict[str, object]]:
+        return {name: stats.as_dict() for name, stats in self._stats.items()}
+
+
+maintenance = MaintenanceScheduler()
+maintenance.add_job("expired_shares", settings.MAINTENANCE_INTERVAL_SECONDS, sweep_shares)
+maintenance.add_job("expired_verifications", settings.MAINTENANCE_INTERVAL_SECONDS, sweep_verifications)
+maintenance.add_job("sent_email", settings.MAINTENANCE_INTERVAL_SECONDS, sweep_sent_mail)
+maintenance.add_job("stale_uploads", settings.UPLOAD_SESSION_GC_INTERVAL_SECONDS, collect_stale_uploads)
+maintenance.add_job("revoked_tokens", settings.REVOCATION_PRUNE_INTERVAL_SECONDS, revocation_list.prune)
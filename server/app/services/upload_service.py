@@ -0,0 +1,275 @@
+import asyncio
+import logging
+import os
+import secrets
+from datetime import datetime, timedelta
+from typing import AsyncIterator, List, Optional
+from fastapi import HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from ..config import settings
+from ..models.file import File
+from ..models.upload import UploadPart, UploadSession
+from ..models.user import User
+from ..storage import StorageBackend, storage as default_storage
+from ..utils.crypto_engine import AuthenticationError
+from ..utils.executor import crypto_executor
+from ..utils.file_crypto import PartTooLargeError, compressing_writer, stream_part_to_disk
+from ..utils.file_format import EncryptedFileReader, SegmentWriter
+from ..utils.keyring import KeyRing, keyring as default_keyring
+from .blob_service import BlobService
+
+logger = logging.getLogger(__name__)
+
+
+class UploadSessionService:
+    """
+    Resumable multipart uploads.
+
+    A session owns a data key. Each part is a complete client-side AES-GCM
+    message; it is verified, re-encrypted under the session's data key and
+    stored on its own, so parts can arrive in any order, over parallel
+    connections, and be retried individually. Completing the session
+    assembles the parts, in order, into a regular deduplicated blob.
+    """
+
+    def __init__(self, db: AsyncSession, storage: Optional[StorageBackend] = None, keyring: Optional[KeyRing] = None):
+        self.db = db
+        self.storage = storage or default_storage
+        self.keyring = keyring or default_keyring
+
+    async def create(self, owner: User, filename: str, content_type: Optional[str], client_key: bytes) -> UploadSession:
+        if len(client_key) not in (16, 24, 32):
+            raise HTTPException(status_code=400, detail="Invalid encryption key")
+        _, wrapped_key, kek_id = self.keyring.generate_data_key()
+        wrapped_client_key, _ = self.keyring.wrap(client_key, kek_id)
+        now = datetime.utcnow()
+        session = UploadSession(
+            id=secrets.token_hex(16),
+            owner_id=owner.id,
+            filename=filename,
+            content_type=content_type,
+            client_key=wrapped_client_key,
+            wrapped_key=wrapped_key,
+            kek_id=kek_id,
+            created_at=now,
+            expires_at=now + timedelta(hours=settings.UPLOAD_SESSION_TTL_HOURS),
+            parts=[]
+        )
+        self.db.add(session)
+        await self.db.commit()
+        return session
+
+    async def get(self, upload_id: str, owner: User) -> UploadSession:
+        result = await self.db.execute(
+            select(UploadSession)
+            .options(selectinload(UploadSession.parts))
+            .where(
+                UploadSession.id == upload_id,
+                UploadSession.owner_id == owner.id,
+                UploadSession.expires_at > datetime.utcnow()
+            )
+        )
+        session = result.scalars().first()
+        if session is None:
+            raise HTTPException(status_code=404, detail="Upload session not found")
+        return session
+
+    async def put_part(
+        self,
+        session: UploadSession,
+        part_number: int,
+        chunks: AsyncIterator[bytes],
+        iv: bytes
+    ) -> UploadPart:
+        """Verify, encrypt and store one part, replacing any earlier upload of it"""
+        if not 1 <= part_number <= settings.UPLOAD_MAX_PARTS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Part number must be between 1 and {settings.UPLOAD_MAX_PARTS}"
+            )
+        # Both AES backends accept GCM nonces of 8 to 128 bytes
+        if not 8 <= len(iv) <= 128:
+            raise HTTPException(status_code=400, detail="Invalid IV")
+        # The session as a whole may not outgrow UPLOAD_MAX_SIZE
+        received = sum(part.size for part in session.parts if part.part_number != part_number)
+        max_size = min(settings.UPLOAD_PART_MAX_SIZE, settings.UPLOAD_MAX_SIZE - received)
+        if max_size <= 0:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Upload exceeds {settings.UPLOAD_MAX_SIZE} bytes"
+            )
+
+        data_key = self.keyring.unwrap(session.wrapped_key, session.kek_id)
+        client_key = self.keyring.unwrap(session.client_key, session.kek_id)
+        try:
+            result = await stream_part_to_disk(
+                chunks,
+                client_key=client_key,
+                client_iv=iv,
+                server_key=data_key,
+                dest=BlobService.temp_path(),
+                max_size=max_size
+            )
+        except PartTooLargeError as e:
+            raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+        except AuthenticationError:
+            raise HTTPException(status_code=400, detail="Part failed authentication")
+
+        storage_key = secrets.token_hex(16)
+        await self.storage.put_file(storage_key, result.path)
+
+        part = (await self.db.execute(
+            select(UploadPart).where(
+                UploadPart.session_id == session.id,
+                UploadPart.part_number == part_number
+            )
+        )).scalars().first()
+        replaced_key = None
+        if part is None:
+            part = UploadPart(session_id=session.id, part_number=part_number)
+            self.db.add(part)
+        else:
+            replaced_key = part.storage_key
+        part.size = result.size
+        part.storage_key = storage_key
+        part.created_at = datetime.utcnow()
+        try:
+            await self.db.commit()
+        except IntegrityError:
+            # The same part number was uploaded concurrently; the other one wins
+            await self.db.rollback()
+            await self.storage.delete(storage_key)
+            raise HTTPException(status_code=409, detail="Part is being uploaded concurrently")
+
+        if replaced_key:
+            await self.storage.delete(replaced_key)
+        return part
+
+    def _assemble_part(self, part: UploadPart, data_key: bytes, writer, hasher) -> None:
+        with EncryptedFileReader(self.storage.open(part.storage_key), data_key) as reader:
+            for chunk in reader.iter_range():
+                hasher.update(chunk)
+                writer.write(chunk)
+
+    async def complete(self, session: UploadSession, part_count: Optional[int] = None) -> File:
+        """
+        Assemble the parts into a blob and create the file.
+
+        Parts must be numbered 1..N without gaps. When ``part_count`` is given
+        it must match N, which catches a client finishing before all of its
+        parallel part uploads have landed.
+
+        Assembly happens within the request: each part is decrypted, hashed
+        and resealed as one job on the crypto executor, so the event loop
+        stays free, and the total is bounded by ``UPLOAD_MAX_SIZE``.
+        """
+        parts: List[UploadPart] = list(session.parts)
+        numbers = [part.part_number for part in parts]
+        if not parts or numbers != list(range(1, len(parts) + 1)):
+            raise HTTPException(status_code=400, detail="Parts must be numbered 1..N without gaps")
+        if part_count is not None and part_count != len(parts):
+            raise HTTPException(
+                status_code=400,
+                detail=f"Expected {part_count} parts, received {len(parts)}"
+            )
+        # Parts uploaded in parallel each pass the check in put_part on their own
+        if sum(part.size for part in parts) > settings.UPLOAD_MAX_SIZE:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Upload exceeds {settings.UPLOAD_MAX_SIZE} bytes"
+            )
+
+        data_key = self.keyring.unwrap(session.wrapped_key, session.kek_id)
+        hasher = self.keyring.content_hasher()
+        tmp_path = BlobService.temp_path()
+        try:
+            with open(tmp_path, "wb") as f:
+                writer = SegmentWriter(f, data_key, settings.ENCRYPTION_SEGMENT_SIZE)
+                if settings.FILE_COMPRESSION_ENABLED:
+                    writer = compressing_writer(writer)
+                for part in parts:
+                    # One executor job per part keeps each job bounded by the part size
+                    await crypto_executor.run(self._assemble_part, part, data_key, writer, hasher)
+                await crypto_executor.run(writer.close)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        blob = await BlobService(self.db, self.storage).store(
+            tmp_path,
+            digest=hasher.hexdigest(),
+            size=writer.plaintext_size,
+            wrapped_key=session.wrapped_key,
+            kek_id=session.kek_id,
+            codec=getattr(writer, "codec", None)
+        )
+        db_file = File(
+            filename=session.filename,
+            stored_filename=f"{secrets.token_hex(16)}_{session.filename}",
+            file_path=blob.file_path,
+            size=writer.plaintext_size,
+            owner_id=session.owner_id,
+            created_at=datetime.utcnow(),
+            file_type=session.content_type,
+            blob_id=blob.id
+        )
+        part_keys = [part.storage_key for part in parts]
+        self.db.add(db_file)
+        await self.db.delete(session)
+        await self.db.commit()
+
+        await self._remove_objects(part_keys)
+        return db_file
+
+    async def abort(self, session: UploadSession) -> None:
+        part_keys = [part.storage_key for part in session.parts]
+        await self.db.delete(session)
+        await self.db.commit()
+        await self._remove_objects(part_keys)
+
+    async def gc_stale(self, now: Optional[datetime] = None, batch_size: Optional[int] = None) -> int:
+        """
+        Delete expired sessions and their stored parts, returning how many were removed.
+
+        Sessions are handled ``batch_size`` at a time (``MAINTENANCE_BATCH_SIZE``
+        by default), each batch in its own transaction, like the other sweeps
+        in ``services/maintenance.py``.
+        """
+        now = now or datetime.utcnow()
+        batch_size = batch_size or settings.MAINTENANCE_BATCH_SIZE
+        total = 0
+        while True:
+            result = await self.db.execute(
+                select(UploadSession)
+                .options(selectinload(UploadSession.parts))
+                .where(UploadSession.expires_at <= now)
+                .order_by(UploadSession.expires_at)
+                .limit(batch_size)
+            )
+            sessions = result.scalars().all()
+            if not sessions:
+                break
+            part_keys = [part.storage_key for session in sessions for part in session.parts]
+            for session in sessions:
+                await self.db.delete(session)
+            await self.db.commit()
+            await self._remove_objects(part_keys)
+            total += len(sessions)
+            logger.info(f"Removed {len(sessions)} stale upload sessions ({len(part_keys)} parts)")
+            if len(sessions) < batch_size:
+                break
+            await asyncio.sleep(0)
+        return total
+
+    async def _remove_objects(self, keys: List[str]) -> None:
+        for key in keys:
+            try:
+                await self.storage.delete(key)
+            except Exception as e:
+                # Orphaned parts only cost space; never fail the request over them
+                logger.warning(f"Failed to remove upload part {key}: {e}")
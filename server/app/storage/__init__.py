@@ -0,0 +1,52 @@
+"""
+Storage backends for encrypted blobs
+"""
+from pathlib import Path
+
+from ..config import settings
+from .base import StorageBackend, StorageError, StorageStat, shard_key
+from .local import LocalStorage
+
+APP_DIR = Path(__file__).parent.parent
+
+
+def upload_root() -> Path:
+    """Resolved UPLOAD_DIR; relative paths are taken from the app package"""
+    root = Path(settings.UPLOAD_DIR)
+    return root if root.is_absolute() else APP_DIR / root
+
+
+def temp_dir() -> Path:
+    """Local scratch space for uploads in flight, whatever the backend"""
+    return upload_root() / "tmp"
+
+
+def create_storage() -> StorageBackend:
+    if settings.STORAGE_BACKEND == "local":
+        return LocalStorage(upload_root())
+    if settings.STORAGE_BACKEND == "s3":
+        from .s3 import S3Storage
+        return S3Storage(
+            bucket=settings.S3_BUCKET,
+            prefix=settings.S3_PREFIX,
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            region=settings.S3_REGION,
+            access_key_id=settings.S3_ACCESS_KEY_ID,
+            secret_access_key=settings.S3_SECRET_ACCESS_KEY
+        )
+    raise ValueError(f"Unknown storage backend: {settings.STORAGE_BACKEND}")
+
+
+storage = create_storage()
+
+__all__ = [
+    "StorageBackend",
+    "StorageError",
+    "StorageStat",
+    "LocalStorage",
+    "shard_key",
+    "storage",
+    "create_storage",
+    "upload_root",
+    "temp_dir",
+]
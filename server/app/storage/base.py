@@ -0,0 +1,69 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from pathlib import Path
+from typing import BinaryIO, NamedTuple, Optional
+
+
+class StorageStat(NamedTuple):
+    size: int
+    modified: datetime
+
+
+class StorageError(Exception):
+    """Raised when an object is missing or the backend fails"""
+
+
+def shard_key(key: str, depth: int = 2, width: int = 2) -> str:
+    """Spread keys over nested directories by prefix, e.g. ``ab/cd/abcd...``"""
+    parts = [key[i * width:(i + 1) * width] for i in range(depth)]
+    return "/".join(parts + [key])
+
+
+class StorageBackend(ABC):
+    """
+    Where encrypted blobs live.
+
+    Keys are opaque strings (blob digests); backends decide the physical
+    layout. The async methods are for request handlers; :meth:`open` returns
+    a seekable, blocking file object meant to be consumed on the crypto
+    executor by :class:`~app.utils.file_format.EncryptedFileReader`.
+    """
+
+    @abstractmethod
+    async def put_file(self, key: str, src: Path) -> None:
+        """Move a finished local file into storage under ``key``"""
+
+    @abstractmethod
+    async def write(self, key: str, data: bytes) -> None:
+        """Store ``data`` under ``key``, replacing any existing object"""
+
+    @abstractmethod
+    async def read(self, key: str, offset: int = 0, length: Optional[int] = None) -> bytes:
+        """Read ``length`` bytes (or everything) starting at ``offset``"""
+
+    @abstractmethod
+    async def stat(self, key: str) -> StorageStat:
+        """Size and modification time; raises StorageError if missing"""
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """Remove an object; missing objects are ignored"""
+
+    async def exists(self, key: str) -> bool:
+        try:
+            await self.stat(key)
+            return True
+        except StorageError:
+            return False
+
+    @abstractmethod
+    def open(self, key: str) -> BinaryIO:
+        """Seekable, blocking reader for an object"""
+
+    @abstractmethod
+    def uri(self, key: str) -> str:
+        """Human readable location, recorded for operators"""
+
+    def local_path(self, key: str) -> Optional[str]:
+        """Filesystem path of an object, if the backend keeps one"""
+        return None
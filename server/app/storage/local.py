@@ -0,0 +1,81 @@
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import BinaryIO, Optional
+from starlette.concurrency import run_in_threadpool
+
+from .base import StorageBackend, StorageError, StorageStat, shard_key
+
+
+class LocalStorage(StorageBackend):
+    """Blobs on the local filesystem, sharded as ``root/ab/cd/<key>``"""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        if not key or "/" in key or key.startswith("."):
+            raise StorageError(f"Invalid storage key: {key!r}")
+        return self.root / shard_key(key)
+
+    def local_path(self, key: str) -> Optional[str]:
+        return str(self._path(key))
+
+    def uri(self, key: str) -> str:
+        return str(self._path(key))
+
+    def _put_file(self, key: str, src: Path) -> None:
+        path = self._path(key)
+        os.makedirs(path.parent, exist_ok=True)
+        os.replace(src, path)
+
+    async def put_file(self, key: str, src: Path) -> None:
+        await run_in_threadpool(self._put_file, key, src)
+
+    def _write(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        os.makedirs(path.parent, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".part")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    async def write(self, key: str, data: bytes) -> None:
+        await run_in_threadpool(self._write, key, data)
+
+    def _read(self, key: str, offset: int, length: Optional[int]) -> bytes:
+        try:
+            with open(self._path(key), "rb") as f:
+                f.seek(offset)
+                return f.read() if length is None else f.read(length)
+        except FileNotFoundError:
+            raise StorageError(f"Object not found: {key}")
+
+    async def read(self, key: str, offset: int = 0, length: Optional[int] = None) -> bytes:
+        return await run_in_threadpool(self._read, key, offset, length)
+
+    def _stat(self, key: str) -> StorageStat:
+        try:
+            stat = os.stat(self._path(key))
+        except FileNotFoundError:
+            raise StorageError(f"Object not found: {key}")
+        return StorageStat(stat.st_size, datetime.utcfromtimestamp(stat.st_mtime))
+
+    async def stat(self, key: str) -> StorageStat:
+        return await run_in_threadpool(self._stat, key)
+
+    def _delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    async def delete(self, key: str) -> None:
+        await run_in_threadpool(self._delete, key)
+
+    def open(self, key: str) -> BinaryIO:
+        try:
+            return open(self._path(key), "rb")
+        except FileNotFoundError:
+            raise StorageError(f"Object not found: {key}")
@@ -0,0 +1,134 @@
+import io
+import os
+from pathlib import Path
+from typing import BinaryIO, Optional
+from starlette.concurrency import run_in_threadpool
+
+from .base import StorageBackend, StorageError, StorageStat, shard_key
+
+try:
+    from botocore.exceptions import ClientError
+except ImportError:  # boto3 not installed; S3Storage refuses to start without it
+    ClientError = Exception
+
+
+class _S3ObjectReader(io.RawIOBase):
+    """Seekable reader issuing ranged GETs, so segments can be fetched individually"""
+
+    def __init__(self, client, bucket: str, key: str):
+        super().__init__()
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        try:
+            self.size = client.head_object(Bucket=bucket, Key=key)["ContentLength"]
+        except ClientError:
+            raise StorageError(f"Object not found: {key}")
+        self.position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        if whence == os.SEEK_SET:
+            self.position = offset
+        elif whence == os.SEEK_CUR:
+            self.position += offset
+        else:
+            self.position = self.size + offset
+        return self.position
+
+    def read(self, size: int = -1) -> bytes:
+        if self.position >= self.size:
+            return b""
+        end = self.size if size is None or size < 0 else min(self.position + size, self.size)
+        response = self.client.get_object(
+            Bucket=self.bucket,
+            Key=self.key,
+            Range=f"bytes={self.position}-{end - 1}"
+        )
+        data = response["Body"].read()
+        self.position += len(data)
+        return data
+
+    def readall(self) -> bytes:
+        return self.read(-1)
+
+
+class S3Storage(StorageBackend):
+    """
+    Blobs in an S3-compatible bucket (AWS, MinIO, Ceph...).
+
+    ``boto3`` is only imported when this backend is configured. Blocking
+    client calls run on the thread pool.
+    """
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        endpoint_url: Optional[str] = None,
+        region: Optional[str] = None,
+        access_key_id: Optional[str] = None,
+        secret_access_key: Optional[str] = None,
+        client=None
+    ):
+        if client is None:
+            try:
+                import boto3
+            except ImportError:
+                raise RuntimeError("The S3 storage backend requires boto3 (pip install boto3)")
+            client = boto3.client(
+                "s3",
+                endpoint_url=endpoint_url or None,
+                region_name=region or None,
+                aws_access_key_id=access_key_id or None,
+                aws_secret_access_key=secret_access_key or None
+            )
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+
+    def _key(self, key: str) -> str:
+        sharded = shard_key(key)
+        return f"{self.prefix}/{sharded}" if self.prefix else sharded
+
+    def uri(self, key: str) -> str:
+        return f"s3://{self.bucket}/{self._key(key)}"
+
+    async def put_file(self, key: str, src: Path) -> None:
+        await run_in_threadpool(self.client.upload_file, str(src), self.bucket, self._key(key))
+        os.remove(src)
+
+    async def write(self, key: str, data: bytes) -> None:
+        await run_in_threadpool(self.client.put_object, Bucket=self.bucket, Key=self._key(key), Body=data)
+
+    def _read(self, key: str, offset: int, length: Optional[int]) -> bytes:
+        reader = self.open(key)
+        reader.seek(offset)
+        return reader.read(-1 if length is None else length)
+
+    async def read(self, key: str, offset: int = 0, length: Optional[int] = None) -> bytes:
+        return await run_in_threadpool(self._read, key, offset, length)
+
+    def _stat(self, key: str) -> StorageStat:
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except ClientError:
+            raise StorageError(f"Object not found: {key}")
+        return StorageStat(head["ContentLength"], head["LastModified"].replace(tzinfo=None))
+
+    async def stat(self, key: str) -> StorageStat:
+        return await run_in_threadpool(self._stat, key)
+
+    async def delete(self, key: str) -> None:
+        await run_in_threadpool(self.client.delete_object, Bucket=self.bucket, Key=self._key(key))
+
+    def open(self, key: str) -> BinaryIO:
+        return _S3ObjectReader(self.client, self.bucket, self._key(key))
@@ -3,13 +3,17 @@ from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends, Request
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 import os
+import secrets
 
-from ..database import get_db
+from ..database import get_async_db
 from ..models.user import User
-from ..models.token_blacklist import TokenBlacklist
 from ..config import settings
+from .executor import crypto_executor
+from .user_cache import UserSnapshot, user_cache
+from .revocation import revocation_list
 
 # Security configurations
 SECRET_KEY = settings.JWT_SECRET_KEY
@@ -24,6 +28,14 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+async def averify_password(plain_password: str, hashed_password: str) -> bool:
+    """verify_password on the crypto executor, so bcrypt doesn't stall the event loop"""
+    return await crypto_executor.run_stateless(verify_password, plain_password, hashed_password)
+
+async def aget_password_hash(password: str) -> str:
+    """get_password_hash on the crypto executor"""
+    return await crypto_executor.run_stateless(get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta:
@@ -31,29 +43,34 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
     to_encode.update({"exp": expire})
+    # Unique id so the token can be revoked without storing it
+    to_encode.setdefault("jti", secrets.token_hex(16))
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def token_from_request(request: Request) -> Optional[str]:
+    """The raw JWT from the ``access_token`` cookie, if any"""
+    auth_cookie = request.cookies.get("access_token")
+    if not auth_cookie:
+        return None
+    # Remove quotes and 'Bearer ' prefix if present
+    token = auth_cookie.strip('"')  # Remove surrounding quotes
+    return token.replace("Bearer ", "") if token.startswith("Bearer ") else token
+
 # Update the get_current_user function to check cookies
 async def get_current_user(
     request: Request,
-    db: Session = Depends(get_db)
-) -> User:
+    db: AsyncSession = Depends(get_async_db)
+) -> UserSnapshot:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    # Get token from cookie
-    auth_cookie = request.cookies.get("access_token")
-    if not auth_cookie:
+    token = token_from_request(request)
+    if not token:
         raise credentials_exception
-        
-    # Remove quotes and 'Bearer ' prefix if present
-    token = auth_cookie.strip('"')  # Remove surrounding quotes
-    token = token.replace("Bearer ", "") if token.startswith("Bearer ") else token
-    print("1111111",token)
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
@@ -62,14 +79,25 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
 
-    user = db.query(User).filter(User.email == email).first()
+    if await revocation_list.is_revoked(db, payload.get("jti")):
+        raise credentials_exception
+    # The token id doubles as the session id (e.g. for the download transport key)
+    request.state.session_id = payload.get("jti")
+
+    cached = user_cache.get(email)
+    if cached is not None:
+        return cached
+
+    user = (await db.execute(select(User).where(User.email == email))).scalars().first()
     if user is None:
         raise credentials_exception
-    return user
+    snapshot = UserSnapshot.from_user(user)
+    user_cache.set(email, snapshot)
+    return snapshot
 
 async def get_current_active_user(
-    current_user: User = Depends(get_current_user)
-) -> User:
+    current_user: UserSnapshot = Depends(get_current_user)
+) -> UserSnapshot:
     if not current_user.is_active:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -78,17 +106,18 @@ async def get_current_active_user(
     return current_user
 
 # Add this function to check for blacklisted tokens
-def is_token_blacklisted(db: Session, token: str) -> bool:
-    """Check if a token is blacklisted"""
-    return db.query(TokenBlacklist).filter(
-        TokenBlacklist.token == token,
-        TokenBlacklist.expires_at > datetime.utcnow()
-    ).first() is not None
+async def is_token_blacklisted(db: AsyncSession, token: str) -> bool:
+    """Check if a token has been revoked"""
+    try:
+        claims = jwt.get_unverified_claims(token)
+    except JWTError:
+        return False
+    return await revocation_list.is_revoked(db, claims.get("jti"))
 
 # Modify the existing verify_token function to check blacklist
-async def verify_token(token: str, db: Session) -> Optional[str]:
+async def verify_token(token: str, db: AsyncSession) -> Optional[str]:
     try:
-        if is_token_blacklisted(db, token):
+        if await is_token_blacklisted(db, token):
             return None
         
         payload = jwt.decode(
@@ -0,0 +1,112 @@
+"""
+HTTP content codings: gzip (always available), zstd and brotli (when the
+optional ``zstandard`` / ``brotli`` packages are installed).
+"""
+import zlib
+from typing import Dict, List, Optional
+
+try:
+    import zstandard
+except ImportError:  # zstd is offered only when zstandard is installed
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:  # br is offered only when brotli is installed
+    brotli = None
+
+
+class StreamCompressor:
+    """Incremental compressor for one response body"""
+
+    def compress(self, data: bytes) -> bytes:
+        raise NotImplementedError
+
+    def flush(self) -> bytes:
+        raise NotImplementedError
+
+
+class _GzipCompressor(StreamCompressor):
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _ZstdCompressor(StreamCompressor):
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _BrotliCompressor(StreamCompressor):
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.finish()
+
+
+def available_encodings() -> List[str]:
+    """Supported codings, best first"""
+    encodings = []
+    if zstandard is not None:
+        encodings.append("zstd")
+    if brotli is not None:
+        encodings.append("br")
+    encodings.append("gzip")
+    return encodings
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Map each coding in an ``Accept-Encoding`` header to its q-value"""
+    accepted = {}
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate_encoding(header: str, supported: List[str]) -> Optional[str]:
+    """Pick the coding the client rates highest, preferring ``supported`` order on ties"""
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get("*", 0.0)
+    best, best_q = None, 0.0
+    for coding in supported:
+        q = accepted.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def create_compressor(encoding: str, gzip_level: int = 6, zstd_level: int = 3, brotli_quality: int = 4) -> StreamCompressor:
+    if encoding == "gzip":
+        return _GzipCompressor(gzip_level)
+    if encoding == "zstd" and zstandard is not None:
+        return _ZstdCompressor(zstd_level)
+    if encoding == "br" and brotli is not None:
+        return _BrotliCompressor(brotli_quality)
+    raise ValueError(f"Unsupported content coding: {encoding}")
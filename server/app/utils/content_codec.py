@@ -0,0 +1,213 @@
+"""
+Optional compression of file content before server-side encryption.
+
+Compression has to happen on the plaintext, i.e. between client decryption
+and sealing; ciphertext does not compress. :class:`CompressingWriter` sits
+in front of a :class:`~.file_format.SegmentWriter` and decides per file:
+the first ``sample_size`` bytes are trial-compressed and, unless they shrink
+to at most ``max_ratio`` of their size, the file is stored as-is. Media,
+archives and other already-compressed types fail that test on their own,
+so no list of content types is needed.
+
+The codec (``zstd`` or none) is recorded on the blob row.
+:func:`open_decoded` wraps a reader of a compressed blob so callers keep
+seeing the original bytes and size. A zstd stream can only be decoded from
+its start, so a range of a compressed file costs a decode of everything
+before it; multi-range requests are therefore served in ascending order
+(see :func:`~.http_range.coalesce_ranges`) and decoded in one pass.
+"""
+from typing import Iterator, Optional
+
+from .file_format import EncryptedFileReader, FileFormatError
+from .metrics import StageTimings, optional_stage
+
+try:
+    import zstandard
+except ImportError:  # files are stored uncompressed when zstandard isn't installed
+    zstandard = None
+
+CODEC_ZSTD = "zstd"
+DECODE_CHUNK_SIZE = 256 * 1024
+
+
+def compression_available() -> bool:
+    return zstandard is not None
+
+
+def is_compressible(sample: bytes, level: int, max_ratio: float) -> bool:
+    """Whether ``sample`` compresses to at most ``max_ratio`` of its size"""
+    if zstandard is None or not sample:
+        return False
+    compressed = zstandard.ZstdCompressor(level=level).compress(sample)
+    return len(compressed) <= len(sample) * max_ratio
+
+
+class CompressingWriter:
+    """
+    Writer that zstd-compresses what it is given when the content allows.
+
+    Writes are held back until ``sample_size`` bytes have arrived (or the
+    file ends), then the codec is chosen from that sample. ``codec`` is
+    ``None`` for content stored uncompressed, and ``plaintext_size`` counts
+    the original bytes either way.
+    """
+
+    def __init__(
+        self,
+        writer,
+        level: int = 3,
+        sample_size: int = 64 * 1024,
+        max_ratio: float = 0.9,
+        timings: Optional[StageTimings] = None
+    ):
+        self.writer = writer
+        self.level = level
+        self.sample_size = sample_size
+        self.max_ratio = max_ratio
+        self.timings = timings
+        self.codec: Optional[str] = None
+        self.plaintext_size = 0
+        self._sample = bytearray()
+        self._compressor = None
+        self._decided = zstandard is None
+
+    def _decide(self) -> None:
+        sample = bytes(self._sample)
+        self._sample.clear()
+        self._decided = True
+        with optional_stage(self.timings, "compress"):
+            compressible = is_compressible(sample, self.level, self.max_ratio)
+        if compressible:
+            self.codec = CODEC_ZSTD
+            self._compressor = zstandard.ZstdCompressor(level=self.level).compressobj()
+        self._emit(sample)
+
+    def _emit(self, data: bytes) -> None:
+        if self._compressor is not None:
+            with optional_stage(self.timings, "compress"):
+                data = self._compressor.compress(data)
+        if data:
+            self.writer.write(data)
+
+    def write(self, data: bytes) -> None:
+        self.plaintext_size += len(data)
+        if self._decided:
+            self._emit(data)
+            return
+        self._sample += data
+        if len(self._sample) >= self.sample_size:
+            self._decide()
+
+    def close(self) -> None:
+        if not self._decided:
+            # The whole file fit in the sample
+            self._decide()
+        if self._compressor is not None:
+            with optional_stage(self.timings, "compress"):
+                tail = self._compressor.flush()
+            self._compressor = None
+            if tail:
+                self.writer.write(tail)
+        self.writer.close()
+
+
+class _ChunkStream:
+    """Minimal file object over an iterator of chunks, for the zstd stream decoder"""
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks = chunks
+        self._buffer = b""
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        if size < 0:
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+class DecompressingReader:
+    """
+    Reader over a compressed file that yields the original content.
+
+    Offers the parts of :class:`~.file_format.EncryptedFileReader` that
+    downloads use (``size``, ``iter_range``, ``read``, ``close``). Output is
+    produced in ``DECODE_CHUNK_SIZE`` pieces, however well the input
+    compressed. The decoder is kept between calls, so ranges asked for in
+    ascending order cost a single pass over the file.
+    """
+
+    def __init__(self, reader: EncryptedFileReader, size: int):
+        self.reader = reader
+        self.size = size
+        self._decoder = None
+        # Decoded bytes not yet passed over, starting at original offset _offset
+        self._pending = b""
+        self._offset = 0
+
+    def close(self) -> None:
+        self.reader.close()
+
+    def __enter__(self) -> "DecompressingReader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _restart(self) -> None:
+        self._decoder = zstandard.ZstdDecompressor().read_to_iter(
+            _ChunkStream(self.reader.iter_range()),
+            read_size=DECODE_CHUNK_SIZE,
+            write_size=DECODE_CHUNK_SIZE
+        )
+        self._pending = b""
+        self._offset = 0
+
+    def _next_chunk(self) -> bytes:
+        try:
+            data = next(self._decoder, None)
+        except zstandard.ZstdError:
+            raise FileFormatError("Compressed content is corrupt")
+        if data is None:
+            raise FileFormatError("Compressed content is shorter than recorded")
+        return data
+
+    def iter_range(self, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """Yield the original bytes ``start`` to ``end`` (exclusive)"""
+        start, end = max(0, start), self.size if end is None else min(end, self.size)
+        if start >= end:
+            return
+        if self._decoder is None or start < self._offset:
+            # zstd streams only decode forwards
+            self._restart()
+        while True:
+            if not self._pending:
+                self._pending = self._next_chunk()
+            data, chunk_start = self._pending, self._offset
+            chunk_end = chunk_start + len(data)
+            if chunk_end > start:
+                lo = max(start - chunk_start, 0)
+                hi = min(end - chunk_start, len(data))
+                yield data[lo:hi] if (lo, hi) != (0, len(data)) else data
+                if chunk_end >= end:
+                    # The rest of this chunk may serve the next range
+                    return
+            self._pending, self._offset = b"", chunk_end
+
+    def read(self, start: int = 0, end: Optional[int] = None) -> bytes:
+        return b"".join(self.iter_range(start, end))
+
+
+def open_decoded(reader: EncryptedFileReader, codec: Optional[str], size: Optional[int]):
+    """``reader``, or a reader that undoes ``codec`` when the content was stored compressed"""
+    if not codec:
+        return reader
+    if codec != CODEC_ZSTD or zstandard is None:
+        reader.close()
+        raise FileFormatError(f"Content codec {codec} is not available")
+    return DecompressingReader(reader, size)
@@ -0,0 +1,285 @@
+"""
+AES-256-GCM engine behind every cipher the server uses.
+
+The on-disk file format (:mod:`.file_format`), key wrapping, client upload
+decryption and transport re-encryption all go through :data:`crypto_engine`,
+so a faster backend lands everywhere at once.
+
+Two backends implement the same primitives: ``cryptography`` (OpenSSL,
+AES-NI accelerated) and pycryptodome. With ``CRYPTO_BACKEND = "auto"`` a
+short micro-benchmark picks the faster one on this machine at startup.
+Keyed ciphers are cached per key, so the key schedule of a data key or
+KEK is expanded once and reused across segments and requests.
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from Crypto.Cipher import AES
+
+from ..config import settings
+
+try:
+    from cryptography.exceptions import InvalidTag
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+except ImportError:  # pycryptodome is used when cryptography isn't installed
+    AESGCM = None
+
+logger = logging.getLogger(__name__)
+
+NONCE_SIZE = 12
+TAG_SIZE = 16
+CALIBRATION_CHUNK_SIZE = 64 * 1024
+CALIBRATION_ROUNDS = 32
+
+
+class AuthenticationError(ValueError):
+    """Raised when a ciphertext or tag fails verification"""
+
+
+class StreamCipher:
+    """
+    One GCM message processed in pieces.
+
+    Encryptors return the tag from :meth:`finalize`; decryptors check it
+    with :meth:`verify`.
+    """
+
+    def update(self, data: bytes) -> bytes:
+        raise NotImplementedError
+
+    def finalize(self) -> bytes:
+        raise NotImplementedError
+
+    def verify(self, tag: bytes) -> None:
+        raise NotImplementedError
+
+
+class KeyedCipher:
+    """One-shot AEAD bound to a key: ``seal`` returns ``ciphertext | tag``"""
+
+    def seal(self, nonce: bytes, data: bytes, aad: Optional[bytes] = None) -> bytes:
+        raise NotImplementedError
+
+    def open(self, nonce: bytes, sealed: bytes, aad: Optional[bytes] = None) -> bytes:
+        raise NotImplementedError
+
+
+class CipherBackend:
+    name = "abstract"
+
+    def keyed(self, key: bytes) -> KeyedCipher:
+        raise NotImplementedError
+
+    def encryptor(self, key: bytes, nonce: bytes) -> StreamCipher:
+        raise NotImplementedError
+
+    def decryptor(self, key: bytes, nonce: bytes) -> StreamCipher:
+        raise NotImplementedError
+
+
+class _PycryptodomeStream(StreamCipher):
+    def __init__(self, key: bytes, nonce: bytes, encrypt: bool):
+        self._cipher = AES.new(key, AES.MODE_GCM, nonce=nonce)
+        self.update = self._cipher.encrypt if encrypt else self._cipher.decrypt
+
+    def finalize(self) -> bytes:
+        return self._cipher.digest()
+
+    def verify(self, tag: bytes) -> None:
+        try:
+            self._cipher.verify(tag)
+        except ValueError:
+            raise AuthenticationError("Authentication tag does not match")
+
+
+class _PycryptodomeKeyed(KeyedCipher):
+    # pycryptodome expands the key for every AES.new; there is nothing to keep
+    def __init__(self, key: bytes):
+        self.key = key
+
+    def _cipher(self, nonce: bytes, aad: Optional[bytes]):
+        cipher = AES.new(self.key, AES.MODE_GCM, nonce=nonce)
+        if aad:
+            cipher.update(aad)
+        return cipher
+
+    def seal(self, nonce: bytes, data: bytes, aad: Optional[bytes] = None) -> bytes:
+        ciphertext, tag = self._cipher(nonce, aad).encrypt_and_digest(data)
+        return ciphertext + tag
+
+    def open(self, nonce: bytes, sealed: bytes, aad: Optional[bytes] = None) -> bytes:
+        if len(sealed) < TAG_SIZE:
+            raise AuthenticationError("Ciphertext is too short to carry a tag")
+        try:
+            return self._cipher(nonce, aad).decrypt_and_verify(sealed[:-TAG_SIZE], sealed[-TAG_SIZE:])
+        except ValueError:
+            raise AuthenticationError("Authentication tag does not match")
+
+
+class PycryptodomeBackend(CipherBackend):
+    name = "pycryptodome"
+
+    def keyed(self, key: bytes) -> KeyedCipher:
+        return _PycryptodomeKeyed(key)
+
+    def encryptor(self, key: bytes, nonce: bytes) -> StreamCipher:
+        return _PycryptodomeStream(key, nonce, encrypt=True)
+
+    def decryptor(self, key: bytes, nonce: bytes) -> StreamCipher:
+        return _PycryptodomeStream(key, nonce, encrypt=False)
+
+
+class _CryptographyStream(StreamCipher):
+    def __init__(self, key: bytes, nonce: bytes, encrypt: bool):
+        cipher = Cipher(algorithms.AES(key), modes.GCM(nonce))
+        self._context = cipher.encryptor() if encrypt else cipher.decryptor()
+        self.update = self._context.update
+
+    def finalize(self) -> bytes:
+        self._context.finalize()
+        return self._context.tag
+
+    def verify(self, tag: bytes) -> None:
+        try:
+            self._context.finalize_with_tag(tag)
+        except (InvalidTag, ValueError):
+            raise AuthenticationError("Authentication tag does not match")
+
+
+class _CryptographyKeyed(KeyedCipher):
+    def __init__(self, key: bytes):
+        self._aead = AESGCM(key)
+
+    def seal(self, nonce: bytes, data: bytes, aad: Optional[bytes] = None) -> bytes:
+        return self._aead.encrypt(nonce, data, aad)
+
+    def open(self, nonce: bytes, sealed: bytes, aad: Optional[bytes] = None) -> bytes:
+        try:
+            return self._aead.decrypt(nonce, sealed, aad)
+        except InvalidTag:
+            raise AuthenticationError("Authentication tag does not match")
+
+
+class CryptographyBackend(CipherBackend):
+    name = "cryptography"
+
+    def keyed(self, key: bytes) -> KeyedCipher:
+        return _CryptographyKeyed(key)
+
+    def encryptor(self, key: bytes, nonce: bytes) -> StreamCipher:
+        return _CryptographyStream(key, nonce, encrypt=True)
+
+    def decryptor(self, key: bytes, nonce: bytes) -> StreamCipher:
+        return _CryptographyStream(key, nonce, encrypt=False)
+
+
+def available_backends() -> Dict[str, CipherBackend]:
+    backends: Dict[str, CipherBackend] = {"pycryptodome": PycryptodomeBackend()}
+    if AESGCM is not None:
+        backends["cryptography"] = CryptographyBackend()
+    return backends
+
+
+def calibrate(backends: Dict[str, CipherBackend], chunk_size: int = CALIBRATION_CHUNK_SIZE, rounds: int = CALIBRATION_ROUNDS) -> Dict[str, float]:
+    """Best observed seal throughput (MB/s) of each backend on ``chunk_size`` byte messages"""
+    key, nonce, data = os.urandom(32), os.urandom(NONCE_SIZE), os.urandom(chunk_size)
+    results = {}
+    for name, backend in backends.items():
+        cipher = backend.keyed(key)
+        cipher.seal(nonce, data)  # Warm up
+        best = float("inf")
+        for _ in range(rounds):
+            started = time.perf_counter()
+            cipher.seal(nonce, data)
+            best = min(best, time.perf_counter() - started)
+        results[name] = chunk_size / max(best, 1e-9) / 1e6
+    return results
+
+
+class CryptoEngine:
+    """
+    Chooses the AES-GCM backend and hands out ciphers for it.
+
+    Keyed ciphers are kept in a small LRU cache (``key_cache_size`` keys)
+    so repeated use of a key, such as every segment of a file or every
+    unwrap under one KEK, skips the key expansion.
+    """
+
+    def __init__(self, backend: str = "auto", key_cache_size: int = 256):
+        backends = available_backends()
+        if backend != "auto" and backend not in backends:
+            raise ValueError(f"Unknown or unavailable crypto backend: {backend}")
+        self.requested = backend
+        self.key_cache_size = key_cache_size
+        self.calibration: Dict[str, float] = {}
+        self._backends = backends
+        self._backend: Optional[CipherBackend] = None
+        self._keys: "OrderedDict[bytes, KeyedCipher]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self) -> CipherBackend:
+        if self._backend is None:
+            self.select_backend()
+        return self._backend
+
+    def select_backend(self) -> str:
+        """Resolve the backend (benchmarking when ``"auto"``) and return its name"""
+        with self._lock:
+            if self._backend is not None:
+                return self._backend.name
+            if self.requested == "auto" and len(self._backends) > 1:
+                self.calibration = calibrate(self._backends)
+                name = max(self.calibration, key=self.calibration.get)
+                logger.info("Crypto backend %s selected (%s)", name, ", ".join(
+                    f"{backend} {rate:.0f} MB/s" for backend, rate in sorted(self.calibration.items())
+                ))
+            else:
+                name = next(iter(self._backends)) if self.requested == "auto" else self.requested
+            self._backend = self._backends[name]
+            self._keys.clear()
+            return name
+
+    def key(self, key: bytes) -> KeyedCipher:
+        """Keyed cipher for ``key``, reusing its expanded schedule when cached"""
+        backend = self.backend
+        with self._lock:
+            cipher = self._keys.get(key)
+            if cipher is not None:
+                self._keys.move_to_end(key)
+                return cipher
+        cipher = backend.keyed(key)
+        if self.key_cache_size > 0:
+            with self._lock:
+                self._keys[key] = cipher
+                while len(self._keys) > self.key_cache_size:
+                    self._keys.popitem(last=False)
+        return cipher
+
+    @staticmethod
+    def new_nonce() -> bytes:
+        """Random 96-bit nonce; used for every message not covered by a counter scheme"""
+        return os.urandom(NONCE_SIZE)
+
+    def seal(self, key: bytes, data: bytes, aad: Optional[bytes] = None) -> bytes:
+        """Encrypt under a fresh nonce, returning ``nonce | ciphertext | tag``"""
+        nonce = self.new_nonce()
+        return nonce + self.key(key).seal(nonce, data, aad)
+
+    def open(self, key: bytes, blob: bytes, aad: Optional[bytes] = None) -> bytes:
+        """Reverse of :meth:`seal`"""
+        return self.key(key).open(blob[:NONCE_SIZE], blob[NONCE_SIZE:], aad)
+
+    def encryptor(self, key: bytes, nonce: bytes) -> StreamCipher:
+        return self.backend.encryptor(key, nonce)
+
+    def decryptor(self, key: bytes, nonce: bytes) -> StreamCipher:
+        return self.backend.decryptor(key, nonce)
+
+
+crypto_engine = CryptoEngine(settings.CRYPTO_BACKEND, settings.CRYPTO_KEY_CACHE_SIZE)
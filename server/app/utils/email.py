@@ -1,8 +1,12 @@
 from fastapi_mail import FastMail, MessageSchema, ConnectionConfig
 import os
+from datetime import datetime
+from typing import Optional, Tuple
 from dotenv import load_dotenv
 from pathlib import Path
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.user import User
+from app.models.outbox import OutboxMessage
 load_dotenv()
 
 conf = ConnectionConfig(
@@ -20,19 +24,72 @@ conf = ConnectionConfig(
 
 fastmail = FastMail(conf)
 
-async def send_verification_email(email: str, code: str, verification_link: str):
-    try:
-        message = MessageSchema(
-            subject="Login Verification Code",
-            recipients=[email],
-            body=f"""
+def verification_email(code: str) -> Tuple[str, str]:
+    """Subject and HTML body of the login verification email"""
+    return "Login Verification Code", f"""
             <html>
                 <body>
                     <p>Your verification code is: <strong>{code}</strong></p>
                     <strong>This code will expire in 10 minutes.</strong>
                 </body>
             </html>
-            """,
+            """
+
+def share_email(file_name: str, share_link: str, current_user: User) -> Tuple[str, str]:
+    """Subject and HTML body of the file share invitation"""
+    return "File Shared with You", f"""
+            <html>
+                <body>
+                    <p>You have been invited to view the file <strong>{file_name}</strong> shared by <strong>{current_user.full_name}</strong>. Click the link below to access the file: <a href="{share_link}">{share_link}</a></p>
+                </body>
+            </html>
+            """
+
+def enqueue_email(
+    db: AsyncSession,
+    recipient: str,
+    subject: str,
+    body: str,
+    subtype: str = "html",
+    expires_at: Optional[datetime] = None
+) -> OutboxMessage:
+    """
+    Add an email to the outbox in the caller's transaction.
+
+    It is delivered by the background dispatcher once the caller commits,
+    so request handlers never wait on the mail server. Messages with
+    ``expires_at`` are dropped if they can't be sent by then, and their
+    body is not kept once they are done.
+    """
+    message = OutboxMessage(
+        recipient=recipient,
+        subject=subject,
+        body=body,
+        subtype=subtype,
+        status=OutboxMessage.PENDING,
+        attempts=0,
+        next_attempt_at=datetime.utcnow(),
+        expires_at=expires_at
+    )
+    db.add(message)
+    return message
+
+def queue_verification_email(db: AsyncSession, email: str, code: str, expires_at: Optional[datetime] = None) -> OutboxMessage:
+    subject, body = verification_email(code)
+    return enqueue_email(db, email, subject, body, expires_at=expires_at)
+
+def queue_share_email(db: AsyncSession, email: str, file_name: str, share_link: str, current_user: User) -> OutboxMessage:
+    subject, body = share_email(file_name, share_link, current_user)
+    return enqueue_email(db, email, subject, body)
+
+async def send_verification_email(email: str, code: str, verification_link: str):
+    """Send the verification email right away, bypassing the outbox"""
+    try:
+        subject, body = verification_email(code)
+        message = MessageSchema(
+            subject=subject,
+            recipients=[email],
+            body=body,
             subtype="html"
         )
         
@@ -43,18 +100,14 @@ async def send_verification_email(email: str, code: str, verification_link: str)
         return False 
 
 async def send_share_email(email: str, file_name: str, share_link: str, current_user: User):
+    """Send the share invitation right away, bypassing the outbox"""
     try:
         print(f"Sending share email to {email} for file {file_name} shared by {current_user.full_name} with link {share_link}")
+        subject, body = share_email(file_name, share_link, current_user)
         message = MessageSchema(
-            subject="File Shared with You",
+            subject=subject,
             recipients=[email],
-            body=f"""
-            <html>
-                <body>
-                    <p>You have been invited to view the file <strong>{file_name}</strong> shared by <strong>{current_user.full_name}</strong>. Click the link below to access the file: <a href="{share_link}">{share_link}</a></p>
-                </body>
-            </html>
-            """,
+            body=body,
             subtype="html"
         )
         
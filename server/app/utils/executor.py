@@ -0,0 +1,119 @@
+import asyncio
+import threading
+import weakref
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional
+
+from ..config import settings
+
+_SENTINEL = object()
+
+
+class CryptoExecutor:
+    """
+    Runs AES and bcrypt work off the event loop.
+
+    pycryptodome and bcrypt release the GIL, so a thread pool is enough for
+    most deployments. Stateful work (a cipher object carried across chunks)
+    always runs on the thread pool; stateless calls such as password hashing
+    go to a process pool when ``CRYPTO_EXECUTOR`` is ``"process"``.
+
+    ``CRYPTO_MAX_CONCURRENCY`` bounds how many jobs may be queued or running
+    at once per event loop, so a burst of uploads applies backpressure instead
+    of piling work onto the pool.
+    """
+
+    def __init__(self, kind: str = "thread", max_workers: int = 4, max_concurrency: int = 16):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown crypto executor kind: {kind}")
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_concurrency = max_concurrency
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._processes: Optional[ProcessPoolExecutor] = None
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+
+    def _thread_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._threads is None:
+                self._threads = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="crypto"
+                )
+            return self._threads
+
+    def _process_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._processes is None:
+                self._processes = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._processes
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphores[loop] = semaphore
+        return semaphore
+
+    async def _submit(self, executor: Executor, fn: Callable, *args, **kwargs) -> Any:
+        self.pending += 1
+        try:
+            async with self._semaphore():
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(executor, partial(fn, *args, **kwargs))
+        finally:
+            self.pending -= 1
+            self.completed += 1
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run a (possibly stateful) call on the crypto thread pool"""
+        return await self._submit(self._thread_pool(), fn, *args, **kwargs)
+
+    async def run_stateless(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run a picklable, self-contained call on the configured pool"""
+        if self.kind == "process":
+            return await self._submit(self._process_pool(), fn, *args, **kwargs)
+        return await self.run(fn, *args, **kwargs)
+
+    async def iterate(self, iterator: Iterator[bytes]) -> AsyncIterator[bytes]:
+        """Drive a blocking iterator (e.g. segment decryption) on the thread pool"""
+        try:
+            while True:
+                chunk = await self.run(next, iterator, _SENTINEL)
+                if chunk is _SENTINEL:
+                    break
+                yield chunk
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "max_concurrency": self.max_concurrency,
+            "pending": self.pending,
+            "completed": self.completed,
+        }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._threads is not None:
+                self._threads.shutdown(wait=False)
+                self._threads = None
+            if self._processes is not None:
+                self._processes.shutdown(wait=False)
+                self._processes = None
+
+
+crypto_executor = CryptoExecutor(
+    kind=settings.CRYPTO_EXECUTOR,
+    max_workers=settings.CRYPTO_MAX_WORKERS,
+    max_concurrency=settings.CRYPTO_MAX_CONCURRENCY
+)
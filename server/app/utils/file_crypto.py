@@ -0,0 +1,272 @@
+import os
+import time
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO, Callable, Iterator, NamedTuple, Optional, Tuple
+from fastapi import UploadFile
+
+from ..config import settings
+from .content_codec import CompressingWriter
+from .crypto_engine import AuthenticationError, StreamCipher, crypto_engine
+from .executor import crypto_executor
+from .file_format import EncryptedFileReader, SegmentWriter, TAG_SIZE
+from .metrics import StageTimings, optional_stage
+
+
+class UploadResult(NamedTuple):
+    path: Path
+    size: int
+    digest: Optional[str]
+    codec: Optional[str] = None
+
+
+class PartTooLargeError(ValueError):
+    """Raised when a streamed upload part exceeds the configured maximum"""
+
+
+class _TimedWriter:
+    """File wrapper adding the time spent in ``write`` to a ``disk_write`` stage"""
+
+    def __init__(self, fileobj: BinaryIO, timings: StageTimings):
+        self.fileobj = fileobj
+        self.timings = timings
+
+    def write(self, data: bytes) -> int:
+        with self.timings.measure("disk_write"):
+            return self.fileobj.write(data)
+
+
+def compressing_writer(writer: SegmentWriter, timings: Optional[StageTimings] = None) -> CompressingWriter:
+    """Wrap a segment writer in the compression stage configured in settings"""
+    return CompressingWriter(
+        writer,
+        level=settings.FILE_COMPRESSION_LEVEL,
+        sample_size=settings.FILE_COMPRESSION_SAMPLE_SIZE,
+        max_ratio=settings.FILE_COMPRESSION_MAX_RATIO,
+        timings=timings
+    )
+
+
+async def _seal_to_disk(
+    chunks: AsyncIterator[bytes],
+    decrypt: Callable[[bytes], bytes],
+    server_key: bytes,
+    dest: Path,
+    hasher=None,
+    finalize: Optional[Callable[[], None]] = None,
+    timings: Optional[StageTimings] = None,
+    compress: bool = False
+) -> UploadResult:
+    """
+    Decrypt each chunk, seal it in the segmented format and write it out.
+
+    Work for every chunk runs on the crypto executor. The output goes to a
+    temporary file next to ``dest`` and is moved into place only once
+    ``finalize`` (e.g. tag verification) has succeeded. With ``compress``,
+    the plaintext passes through a :class:`CompressingWriter` first. With
+    ``timings``, the client decrypt, hash, compress, server encrypt and
+    disk write stages are timed.
+    """
+    def process(chunk: bytes) -> None:
+        with optional_stage(timings, "client_decrypt"):
+            plaintext = decrypt(chunk)
+        if hasher is not None:
+            with optional_stage(timings, "hash"):
+                hasher.update(plaintext)
+        seal(writer.write, plaintext)
+
+    def seal(fn: Callable, *args) -> None:
+        # Sealing includes the compression and writes it triggers; those have stages of their own
+        if timings is None:
+            fn(*args)
+            return
+        other_before = timings.seconds["compress"] + timings.seconds["disk_write"]
+        started = time.perf_counter()
+        fn(*args)
+        elapsed = time.perf_counter() - started
+        other = timings.seconds["compress"] + timings.seconds["disk_write"] - other_before
+        timings.add("server_encrypt", elapsed - other)
+
+    tmp_path = dest.with_name(dest.name + ".part")
+    try:
+        with open(tmp_path, "wb") as f:
+            out = f if timings is None else _TimedWriter(f, timings)
+            writer = SegmentWriter(out, server_key, settings.ENCRYPTION_SEGMENT_SIZE)
+            if compress:
+                writer = compressing_writer(writer, timings)
+            async for chunk in chunks:
+                # Decryption, sealing and the disk write happen off the event loop
+                await crypto_executor.run(process, chunk)
+            if finalize is not None:
+                await crypto_executor.run(finalize)
+            await crypto_executor.run(seal, writer.close)
+        os.replace(tmp_path, dest)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return UploadResult(
+        dest,
+        writer.plaintext_size,
+        hasher.hexdigest() if hasher is not None else None,
+        getattr(writer, "codec", None)
+    )
+
+
+class _TagHoldback:
+    """
+    Passes a Web Crypto AES-GCM message (``ciphertext | tag``) through as
+    ciphertext, holding back the trailing tag for :meth:`verify`.
+    """
+
+    def __init__(self, client_cipher: StreamCipher, max_size: Optional[int] = None):
+        self.client_cipher = client_cipher
+        self.max_size = max_size
+        self.held = bytearray()
+        self.received = 0
+
+    async def ciphertext(self, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        async for chunk in chunks:
+            self.received += len(chunk)
+            if self.max_size is not None and self.received > self.max_size + TAG_SIZE:
+                raise PartTooLargeError(f"Part exceeds {self.max_size} bytes")
+            self.held.extend(chunk)
+            if len(self.held) > TAG_SIZE:
+                ready = bytes(self.held[:-TAG_SIZE])
+                del self.held[:-TAG_SIZE]
+                yield ready
+
+    def verify(self) -> None:
+        if len(self.held) != TAG_SIZE:
+            raise AuthenticationError("Message is too short to carry an authentication tag")
+        self.client_cipher.verify(bytes(self.held))
+
+
+async def _iter_upload(upload: UploadFile, chunk_size: int, timings: Optional[StageTimings] = None) -> AsyncIterator[bytes]:
+    while True:
+        with optional_stage(timings, "read"):
+            chunk = await upload.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+async def stream_upload_to_disk(
+    upload: UploadFile,
+    client_key: bytes,
+    client_iv: bytes,
+    server_key: bytes,
+    dest: Path,
+    chunk_size: int = None,
+    hasher=None,
+    timings: Optional[StageTimings] = None
+) -> UploadResult:
+    """
+    Decrypt a client-encrypted upload and re-encrypt it for storage, one chunk at a time.
+
+    The upload is the Web Crypto AES-GCM output (``ciphertext | tag``). It is
+    read in bounded chunks, so peak memory stays at a few chunks regardless of
+    the file size. The trailing tag is held back and verified before the
+    result, written in the segmented format to a temporary file next to
+    ``dest``, is moved into place; a tampered or truncated upload raises
+    :class:`AuthenticationError`.
+    If a ``hasher`` (e.g. an HMAC) is given, it is fed the plaintext on the way.
+    Compressible content is zstd-compressed before encryption when
+    ``FILE_COMPRESSION_ENABLED`` is set.
+
+    Returns the destination, the number of plaintext bytes stored, the hex
+    digest, if any, and the codec applied.
+    """
+    chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
+    client_cipher = crypto_engine.decryptor(client_key, client_iv)
+    message = _TagHoldback(client_cipher)
+    return await _seal_to_disk(
+        message.ciphertext(_iter_upload(upload, chunk_size, timings)),
+        client_cipher.update,
+        server_key,
+        dest,
+        hasher=hasher,
+        finalize=message.verify,
+        timings=timings,
+        compress=settings.FILE_COMPRESSION_ENABLED
+    )
+
+
+async def stream_part_to_disk(
+    chunks: AsyncIterator[bytes],
+    client_key: bytes,
+    client_iv: bytes,
+    server_key: bytes,
+    dest: Path,
+    max_size: int
+) -> UploadResult:
+    """
+    Store one part of a multipart upload.
+
+    The part is a complete Web Crypto AES-GCM message (``ciphertext | tag``).
+    The trailing tag is held back while streaming and verified before the
+    part is kept, so corrupted or truncated parts are rejected.
+    """
+    client_cipher = crypto_engine.decryptor(client_key, client_iv)
+    message = _TagHoldback(client_cipher, max_size)
+    return await _seal_to_disk(message.ciphertext(chunks), client_cipher.update, server_key, dest, finalize=message.verify)
+
+
+def iter_plaintext(reader: EncryptedFileReader) -> Iterator[bytes]:
+    """Yield the verified plaintext of a stored file segment by segment, then close it"""
+    try:
+        yield from reader.iter_range()
+    finally:
+        reader.close()
+
+
+def _timed_segments(reader: EncryptedFileReader, timings: Optional[StageTimings]) -> Iterator[bytes]:
+    """Stored plaintext segment by segment, timing the read and server decrypt as ``read_decrypt``"""
+    segments = reader.iter_range()
+    while True:
+        with optional_stage(timings, "read_decrypt"):
+            chunk = next(segments, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+def reencrypt_for_transport(
+    reader: EncryptedFileReader,
+    key: bytes,
+    iv: bytes,
+    timings: Optional[StageTimings] = None
+) -> Tuple[bytes, bytes]:
+    """Re-encrypt a whole stored file for transport, returning ``(ciphertext, tag)``"""
+    cipher = crypto_engine.encryptor(key, iv)
+    chunks = []
+    for chunk in _timed_segments(reader, timings):
+        with optional_stage(timings, "transport_encrypt"):
+            chunks.append(cipher.update(chunk))
+    return b"".join(chunks), cipher.finalize()
+
+
+def iter_transport_encrypted(
+    reader: EncryptedFileReader,
+    key: bytes,
+    iv: bytes,
+    timings: Optional[StageTimings] = None
+) -> Iterator[bytes]:
+    """
+    Re-encrypt a stored file for transport, segment by segment, then close it.
+
+    The output is ``ciphertext | tag``, the layout produced by Web Crypto's
+    AES-GCM, so clients can decrypt it with the key and IV alone. With
+    ``timings``, the stages are recorded once the whole file has been sent.
+    """
+    cipher = crypto_engine.encryptor(key, iv)
+    try:
+        for chunk in _timed_segments(reader, timings):
+            with optional_stage(timings, "transport_encrypt"):
+                encrypted = cipher.update(chunk)
+            yield encrypted
+        yield cipher.finalize()
+        if timings is not None:
+            timings.record()
+    finally:
+        reader.close()
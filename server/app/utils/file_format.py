@@ -0,0 +1,220 @@
+"""
+On-disk container formats for server-encrypted files.
+
+Version 2 (segmented) layout::
+
+    header  = MAGIC(4) | version(1) | flags(1) | segment_size(4) | nonce_prefix(7)
+    segment = AES-256-GCM(ciphertext) | tag(16)
+
+The plaintext is split into ``segment_size`` byte segments which are sealed
+independently (STREAM construction). Segment ``i`` uses the nonce
+``nonce_prefix | i (4 bytes, big endian) | last (1 byte)`` and the header as
+associated data, so segments cannot be reordered, truncated or moved between
+files. Every segment except the last is full, which makes the segment index
+purely arithmetic: the offset of any segment follows from its number.
+
+Legacy (version 1) files are ``nonce(16) | tag(16) | ciphertext`` with a single
+GCM tag over the whole file. They are still readable through
+:class:`EncryptedFileReader`, but can only be verified as a whole.
+
+All sealing and opening goes through the :mod:`.crypto_engine`, which
+picks the AES backend and keeps the file key's schedule expanded.
+"""
+import os
+import struct
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+from .crypto_engine import AuthenticationError, CryptoEngine, crypto_engine
+
+MAGIC = b"SFSE"
+VERSION = 2
+HEADER_STRUCT = struct.Struct(">4sBBI7s")
+HEADER_SIZE = HEADER_STRUCT.size
+NONCE_PREFIX_SIZE = 7
+TAG_SIZE = 16
+DEFAULT_SEGMENT_SIZE = 64 * 1024
+
+# Legacy single-blob layout
+LEGACY_NONCE_SIZE = 16
+LEGACY_HEADER_SIZE = LEGACY_NONCE_SIZE + TAG_SIZE
+
+
+class FileFormatError(ValueError):
+    """Raised when an encrypted file is malformed or fails authentication"""
+
+
+def _segment_nonce(prefix: bytes, index: int, last: bool) -> bytes:
+    return prefix + struct.pack(">IB", index, 1 if last else 0)
+
+
+class SegmentIndex:
+    """Maps plaintext offsets to segments of a version 2 file"""
+
+    def __init__(self, segment_size: int, body_size: int):
+        if body_size < TAG_SIZE:
+            raise FileFormatError("Encrypted file is truncated")
+        self.segment_size = segment_size
+        self.sealed_size = segment_size + TAG_SIZE
+        self.count = -(-body_size // self.sealed_size)
+        last_size = body_size - (self.count - 1) * self.sealed_size - TAG_SIZE
+        if last_size < 0:
+            raise FileFormatError("Encrypted file is truncated")
+        self.plaintext_size = (self.count - 1) * segment_size + last_size
+
+    def segment_offset(self, index: int) -> int:
+        """Byte offset of a segment, relative to the end of the header"""
+        return index * self.sealed_size
+
+    def segment_length(self, index: int) -> int:
+        """Plaintext length of a segment"""
+        if index < self.count - 1:
+            return self.segment_size
+        return self.plaintext_size - (self.count - 1) * self.segment_size
+
+    def segments_for_range(self, start: int, end: int) -> range:
+        """Segments covering plaintext bytes ``start`` to ``end`` (exclusive)"""
+        if end <= start:
+            return range(0)
+        return range(start // self.segment_size, (end - 1) // self.segment_size + 1)
+
+
+class SegmentWriter:
+    """
+    Incrementally writes a version 2 file.
+
+    Data passed to :meth:`write` is buffered until a full segment is available.
+    The final segment is only sealed in :meth:`close`, because the STREAM
+    construction marks it explicitly.
+    """
+
+    def __init__(self, fileobj: BinaryIO, key: bytes, segment_size: int = DEFAULT_SEGMENT_SIZE, engine: Optional[CryptoEngine] = None):
+        self.fileobj = fileobj
+        self.cipher = (engine or crypto_engine).key(key)
+        self.segment_size = segment_size
+        self.nonce_prefix = os.urandom(NONCE_PREFIX_SIZE)
+        self.header = HEADER_STRUCT.pack(MAGIC, VERSION, 0, segment_size, self.nonce_prefix)
+        self.index = 0
+        self.plaintext_size = 0
+        self._buffer = bytearray()
+        self._closed = False
+        self.fileobj.write(self.header)
+
+    def _seal(self, data: bytes, last: bool) -> None:
+        nonce = _segment_nonce(self.nonce_prefix, self.index, last)
+        self.fileobj.write(self.cipher.seal(nonce, data, self.header))
+        self.index += 1
+
+    def write(self, data: bytes) -> None:
+        if self._closed:
+            raise ValueError("Writer is closed")
+        self._buffer += data
+        self.plaintext_size += len(data)
+        # Keep at least one byte back so the last segment is never sealed early
+        while len(self._buffer) > self.segment_size:
+            self._seal(bytes(self._buffer[:self.segment_size]), last=False)
+            del self._buffer[:self.segment_size]
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._seal(bytes(self._buffer), last=True)
+        self._buffer.clear()
+        self._closed = True
+
+
+class EncryptedFileReader:
+    """
+    Random-access reader over an encrypted file.
+
+    Version 2 files are verified and decrypted one segment at a time, so only
+    the segments covering the requested range are touched. Legacy files are
+    decrypted and verified as a whole on first access.
+    """
+
+    def __init__(self, fileobj: BinaryIO, key: bytes, engine: Optional[CryptoEngine] = None):
+        self.fileobj = fileobj
+        self.cipher = (engine or crypto_engine).key(key)
+        self._legacy_plaintext: Optional[bytes] = None
+
+        self.fileobj.seek(0, os.SEEK_END)
+        total_size = self.fileobj.tell()
+        self.fileobj.seek(0)
+        head = self.fileobj.read(HEADER_SIZE)
+
+        if len(head) == HEADER_SIZE and head[:4] == MAGIC:
+            magic, version, flags, segment_size, nonce_prefix = HEADER_STRUCT.unpack(head)
+            if version != VERSION or segment_size <= 0:
+                raise FileFormatError(f"Unsupported encrypted file version {version}")
+            self.version = version
+            self.header = head
+            self.nonce_prefix = nonce_prefix
+            self.index = SegmentIndex(segment_size, total_size - HEADER_SIZE)
+            self.size = self.index.plaintext_size
+        else:
+            if total_size < LEGACY_HEADER_SIZE:
+                raise FileFormatError("Encrypted file is truncated")
+            self.version = 1
+            self.index = None
+            self.size = total_size - LEGACY_HEADER_SIZE
+
+    @classmethod
+    def open(cls, path: str, key: bytes) -> "EncryptedFileReader":
+        return cls(open(path, "rb"), key)
+
+    def close(self) -> None:
+        self.fileobj.close()
+
+    def __enter__(self) -> "EncryptedFileReader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def read_segment(self, index: int) -> bytes:
+        """Read, verify and decrypt a single segment"""
+        length = self.index.segment_length(index)
+        self.fileobj.seek(HEADER_SIZE + self.index.segment_offset(index))
+        sealed = self.fileobj.read(length + TAG_SIZE)
+        if len(sealed) != length + TAG_SIZE:
+            raise FileFormatError("Encrypted file is truncated")
+        last = index == self.index.count - 1
+        nonce = _segment_nonce(self.nonce_prefix, index, last)
+        try:
+            return self.cipher.open(nonce, sealed, self.header)
+        except AuthenticationError:
+            raise FileFormatError(f"Segment {index} failed authentication")
+
+    def _read_legacy(self) -> bytes:
+        if self._legacy_plaintext is None:
+            self.fileobj.seek(0)
+            nonce = self.fileobj.read(LEGACY_NONCE_SIZE)
+            tag = self.fileobj.read(TAG_SIZE)
+            try:
+                self._legacy_plaintext = self.cipher.open(nonce, self.fileobj.read() + tag)
+            except AuthenticationError:
+                raise FileFormatError("File failed authentication")
+        return self._legacy_plaintext
+
+    def _clamp(self, start: int, end: Optional[int]) -> Tuple[int, int]:
+        end = self.size if end is None else min(end, self.size)
+        return max(0, start), end
+
+    def iter_range(self, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """Yield the verified plaintext for bytes ``start`` to ``end`` (exclusive)"""
+        start, end = self._clamp(start, end)
+        if start >= end:
+            return
+        if self.version == 1:
+            yield self._read_legacy()[start:end]
+            return
+
+        segment_size = self.index.segment_size
+        for index in self.index.segments_for_range(start, end):
+            data = self.read_segment(index)
+            segment_start = index * segment_size
+            lo = max(start - segment_start, 0)
+            hi = min(end - segment_start, len(data))
+            yield data[lo:hi] if (lo, hi) != (0, len(data)) else data
+
+    def read(self, start: int = 0, end: Optional[int] = None) -> bytes:
+        return b"".join(self.iter_range(start, end))
@@ -0,0 +1,163 @@
+"""
+Response that sends a local file's bytes unchanged (e.g. sealed downloads).
+
+The body goes out by the cheapest means the ASGI server offers:
+
+* ``http.response.zerocopy``: the server ``os.sendfile``s straight from the
+  file to the socket, so the bytes never enter Python. Servers only offer
+  it on plaintext connections, i.e. behind a TLS-terminating proxy.
+* ``http.response.pathsend``: the server sends the whole file by path
+  (full responses only).
+* Otherwise, e.g. when uvicorn terminates TLS itself, the file is
+  memory-mapped and sent in ``chunk_size`` slices taken on a worker thread,
+  with no seeks, read calls or per-request buffers.
+
+``Range`` requests (single or multiple ranges, honouring ``If-Range``) are
+answered with ``206 Partial Content`` on every path.
+"""
+import mmap
+import os
+import secrets
+from typing import BinaryIO, List, Mapping, Optional, Tuple, Union
+
+import anyio
+from fastapi import HTTPException
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from ..config import settings
+from .http_range import ByteRange, if_range_matches, parse_range_header
+
+# Body parts: literal bytes (multipart delimiters) or a (offset, count) span of the file
+Part = Union[bytes, Tuple[int, int]]
+
+
+class StoredFileResponse(Response):
+    """
+    ``size`` bytes of the local file at ``path``, with validators for ``If-Range``.
+
+    The caller stats the file (``size``, ``etag``, ``last_modified``) so the
+    headers match what conditional and range requests are checked against.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        size: int,
+        etag: str,
+        last_modified: str,
+        media_type: str = "application/octet-stream",
+        headers: Optional[Mapping[str, str]] = None,
+        chunk_size: Optional[int] = None
+    ):
+        self.path = os.path.abspath(path)
+        self.size = size
+        self.status_code = 200
+        self.media_type = media_type
+        self.background = None
+        self.chunk_size = chunk_size or settings.FILE_SEND_CHUNK_SIZE
+        self.init_headers(headers)
+        self.headers.setdefault("accept-ranges", "bytes")
+        self.headers.setdefault("etag", etag)
+        self.headers.setdefault("last-modified", last_modified)
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def _ranges(self, request_headers: Headers) -> Optional[List[ByteRange]]:
+        header = request_headers.get("range")
+        if not header or not if_range_matches(request_headers.get("if-range"), self.etag, self.last_modified):
+            return None
+        return parse_range_header(header, self.size)
+
+    def _plan(self, ranges: Optional[List[ByteRange]]) -> List[Part]:
+        """Set status and headers for the response and return its body parts"""
+        if ranges is None:
+            self.headers["content-length"] = str(self.size)
+            return [(0, self.size)] if self.size else []
+
+        self.status_code = 206
+        if len(ranges) == 1:
+            start, end = ranges[0]
+            self.headers["content-range"] = f"bytes {start}-{end - 1}/{self.size}"
+            self.headers["content-length"] = str(end - start)
+            return [(start, end - start)]
+
+        boundary = secrets.token_hex(16)
+        parts: List[Part] = []
+        for start, end in ranges:
+            parts.append((
+                f"\r\n--{boundary}\r\n"
+                f"Content-Type: {self.media_type}\r\n"
+                f"Content-Range: bytes {start}-{end - 1}/{self.size}\r\n\r\n"
+            ).encode("latin-1"))
+            parts.append((start, end - start))
+        parts.append(f"\r\n--{boundary}--\r\n".encode("latin-1"))
+        self.headers["content-type"] = f"multipart/byteranges; boundary={boundary}"
+        self.headers["content-length"] = str(sum(len(p) if isinstance(p, bytes) else p[1] for p in parts))
+        return parts
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            parts = self._plan(self._ranges(Headers(scope=scope)))
+        except HTTPException as e:
+            # Raised by parse_range_header when no range overlaps the file
+            await Response(status_code=e.status_code, headers=e.headers)(scope, receive, send)
+            return
+
+        start = {"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers}
+        if scope["method"] == "HEAD" or not parts:
+            await send(start)
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        extensions = scope.get("extensions") or {}
+        if "http.response.pathsend" in extensions and self.status_code == 200:
+            await send(start)
+            await send({"type": "http.response.pathsend", "path": self.path})
+            return
+
+        # Opened before the response starts, so a missing file is still a clean error
+        fileobj: BinaryIO = await anyio.to_thread.run_sync(open, self.path, "rb")
+        try:
+            await send(start)
+            if "http.response.zerocopy" in extensions:
+                await self._send_zerocopy(fileobj, parts, send)
+            else:
+                await self._send_mapped(fileobj, parts, send)
+        finally:
+            fileobj.close()
+
+    async def _send_zerocopy(self, fileobj: BinaryIO, parts: List[Part], send: Send) -> None:
+        for part in parts:
+            if isinstance(part, bytes):
+                await send({"type": "http.response.body", "body": part, "more_body": True})
+            else:
+                offset, count = part
+                await send({
+                    "type": "http.response.zerocopy",
+                    "file": fileobj,
+                    "offset": offset,
+                    "count": count,
+                    "more_body": True
+                })
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    async def _send_mapped(self, fileobj: BinaryIO, parts: List[Part], send: Send) -> None:
+        mapped = mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            for part in parts:
+                if isinstance(part, bytes):
+                    await send({"type": "http.response.body", "body": part, "more_body": True})
+                    continue
+                offset, count = part
+                end = offset + count
+                while offset < end:
+                    stop = min(offset + self.chunk_size, end)
+                    # Slicing may fault pages in from disk, so it runs off the event loop
+                    chunk = await anyio.to_thread.run_sync(mapped.__getitem__, slice(offset, stop))
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                    offset = stop
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            mapped.close()
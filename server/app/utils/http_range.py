@@ -0,0 +1,184 @@
+import secrets
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Iterator, List, Optional, Tuple
+from urllib.parse import quote
+from fastapi import HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+
+from ..storage import StorageStat
+from .executor import crypto_executor
+from .file_format import EncryptedFileReader
+from .metrics import StageTimings, optional_stage
+
+# Requests asking for more ranges than this are served in full instead
+MAX_RANGES = 16
+
+ByteRange = Tuple[int, int]
+
+
+def parse_range_header(header: str, size: int) -> Optional[List[ByteRange]]:
+    """
+    Parse a ``Range: bytes=...`` header into ``(start, end)`` pairs, end exclusive.
+
+    Returns ``None`` when the header is malformed or unsupported, in which case
+    the full representation should be served. Raises a 416 error when the
+    header is valid but none of the ranges overlap the file.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec:
+        return None
+
+    ranges = []
+    for part in spec.split(","):
+        first, sep, last = part.strip().partition("-")
+        if not sep:
+            return None
+        try:
+            if first == "":
+                # Suffix range: the last N bytes
+                length = int(last)
+                if length <= 0:
+                    continue
+                ranges.append((max(size - length, 0), size))
+            else:
+                start = int(first)
+                end = int(last) + 1 if last else size
+                if start < 0 or end <= start:
+                    return None
+                if start >= size:
+                    continue
+                ranges.append((start, min(end, size)))
+        except ValueError:
+            return None
+
+    if len(ranges) > MAX_RANGES:
+        return None
+    if not ranges:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+    return ranges
+
+
+def coalesce_ranges(ranges: List[ByteRange]) -> List[ByteRange]:
+    """
+    Sort ``ranges`` and merge those that overlap or touch.
+
+    HTTP lets a server do this regardless of the requested order. Readers
+    that can only move forwards (compressed content) then need one pass.
+    """
+    merged: List[ByteRange] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def file_validators(file_id: int, stat: StorageStat) -> Tuple[str, str]:
+    """Strong ETag and Last-Modified value for a stored file"""
+    modified = stat.modified.replace(tzinfo=timezone.utc)
+    etag = f'"{file_id:x}-{stat.size:x}-{int(modified.timestamp() * 1_000_000):x}"'
+    last_modified = format_datetime(modified.replace(microsecond=0), usegmt=True)
+    return etag, last_modified
+
+
+def content_disposition(filename: str, disposition: str = "attachment") -> str:
+    """Content-Disposition value that survives non-ASCII file names"""
+    fallback = filename.encode("ascii", "replace").decode("ascii").replace('"', "")
+    return f'{disposition}; filename="{fallback}"; filename*=UTF-8\'\'{quote(filename)}'
+
+
+def if_range_matches(if_range: Optional[str], etag: str, last_modified: str) -> bool:
+    """Whether a (possibly absent) ``If-Range`` precondition allows a partial response"""
+    if not if_range:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        # Weak validators never match for range requests
+        return if_range == etag
+    try:
+        return parsedate_to_datetime(if_range) >= parsedate_to_datetime(last_modified)
+    except (TypeError, ValueError):
+        return False
+
+
+def requested_ranges(request: Request, size: int, etag: str, last_modified: str) -> Optional[List[ByteRange]]:
+    """Ranges to serve for this request, or ``None`` for a full response"""
+    header = request.headers.get("range")
+    if not header or not if_range_matches(request.headers.get("if-range"), etag, last_modified):
+        return None
+    return parse_range_header(header, size)
+
+
+def _iter_multipart(
+    reader: EncryptedFileReader,
+    ranges: List[ByteRange],
+    content_type: str,
+    boundary: str
+) -> Iterator[bytes]:
+    for start, end in ranges:
+        yield (
+            f"\r\n--{boundary}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Range: bytes {start}-{end - 1}/{reader.size}\r\n\r\n"
+        ).encode("latin-1")
+        yield from reader.iter_range(start, end)
+    yield f"\r\n--{boundary}--\r\n".encode("latin-1")
+
+
+def partial_content_response(
+    reader: EncryptedFileReader,
+    ranges: List[ByteRange],
+    content_type: str,
+    etag: str,
+    last_modified: str,
+    timings: Optional[StageTimings] = None
+) -> StreamingResponse:
+    """
+    Build a 206 response for the given ranges.
+
+    Only the segments covering the requested bytes are decrypted. The reader
+    is closed once the body has been sent; with ``timings``, reading and
+    decrypting is timed as ``read_decrypt`` and recorded at that point.
+    """
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Last-Modified": last_modified,
+        "Cache-Control": "no-store",
+    }
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        headers["Content-Range"] = f"bytes {start}-{end - 1}/{reader.size}"
+        headers["Content-Length"] = str(end - start)
+        body = reader.iter_range(start, end)
+        media_type = content_type
+    else:
+        boundary = secrets.token_hex(16)
+        body = _iter_multipart(reader, ranges, content_type, boundary)
+        media_type = f"multipart/byteranges; boundary={boundary}"
+
+    def stream() -> Iterator[bytes]:
+        try:
+            while True:
+                with optional_stage(timings, "read_decrypt"):
+                    chunk = next(body, None)
+                if chunk is None:
+                    break
+                yield chunk
+            if timings is not None:
+                timings.record()
+        finally:
+            reader.close()
+
+    return StreamingResponse(
+        crypto_executor.iterate(stream()),
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        media_type=media_type,
+        headers=headers
+    )
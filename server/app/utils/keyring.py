@@ -0,0 +1,161 @@
+import base64
+import hashlib
+import hmac
+import os
+from typing import Dict, Optional, Tuple
+
+from ..config import settings
+from .crypto_engine import AuthenticationError, crypto_engine
+
+DATA_KEY_SIZE = 32
+WRAP_NONCE_SIZE = 12
+WRAP_TAG_SIZE = 16
+
+
+class KeyRingError(ValueError):
+    """Raised for unknown key-encryption keys or keys that fail to unwrap"""
+
+
+def _decode_key(value: str, name: str) -> bytes:
+    key = base64.b64decode(value)
+    if len(key) != 32:
+        raise ValueError(f"{name} must be 32 bytes, got {len(key)}")
+    return key
+
+
+class KeyRing:
+    """
+    Envelope encryption for stored files.
+
+    Every file is encrypted with its own random data key. The data key is
+    wrapped (AES-256-GCM) by a versioned key-encryption key (KEK) and stored
+    next to the file's metadata, so rotating a KEK only re-wraps 32-byte keys
+    instead of re-encrypting file contents.
+
+    Files written before envelope encryption have no wrapped key and are
+    encrypted directly with ``SERVER_AES_KEY`` (the legacy key).
+    """
+
+    def __init__(
+        self,
+        keks: Dict[int, bytes],
+        active_id: int,
+        legacy_key: bytes,
+        dedup_key: Optional[bytes] = None,
+        transport_secret: Optional[bytes] = None
+    ):
+        if active_id not in keks:
+            raise KeyRingError(f"Active KEK {active_id} is not configured")
+        self.keks = keks
+        self.active_id = active_id
+        self.legacy_key = legacy_key
+        # Key for content digests; kept separate from any encryption key
+        self.dedup_key = dedup_key or hmac.new(legacy_key, b"sfs-dedup-digest", hashlib.sha256).digest()
+        # Root of the per-session transport keys. Never derived from the legacy
+        # key: without its own secret, sealed downloads are simply unavailable
+        self.transport_secret = transport_secret
+
+    @classmethod
+    def from_settings(cls) -> "KeyRing":
+        """
+        Build the key ring from ``KEY_ENCRYPTION_KEYS`` (``"id:base64,id:base64"``).
+
+        Without explicit KEKs, ``SERVER_AES_KEY`` doubles as KEK 1 so existing
+        deployments keep working unchanged.
+        """
+        legacy_key = _decode_key(settings.SERVER_AES_KEY, "SERVER_AES_KEY")
+        keks = {}
+        for entry in filter(None, (e.strip() for e in settings.KEY_ENCRYPTION_KEYS.split(","))):
+            kek_id, _, value = entry.partition(":")
+            keks[int(kek_id)] = _decode_key(value, f"KEK {kek_id}")
+        if not keks:
+            keks = {1: legacy_key}
+        dedup_key = _decode_key(settings.DEDUP_HMAC_KEY, "DEDUP_HMAC_KEY") if settings.DEDUP_HMAC_KEY else None
+        transport_secret = (
+            _decode_key(settings.TRANSPORT_KEY_SECRET, "TRANSPORT_KEY_SECRET") if settings.TRANSPORT_KEY_SECRET else None
+        )
+        return cls(keks, settings.ACTIVE_KEK_ID, legacy_key, dedup_key, transport_secret)
+
+    def content_hasher(self) -> "hmac.HMAC":
+        """Keyed hash used to address deduplicated blobs"""
+        return hmac.new(self.dedup_key, digestmod=hashlib.sha256)
+
+    def _kek(self, kek_id: int) -> bytes:
+        try:
+            return self.keks[kek_id]
+        except KeyError:
+            raise KeyRingError(f"Unknown key-encryption key {kek_id}")
+
+    def wrap(self, data_key: bytes, kek_id: Optional[int] = None) -> Tuple[str, int]:
+        """Wrap a data key, returning ``(wrapped_key, kek_id)`` for storage"""
+        kek_id = self.active_id if kek_id is None else kek_id
+        # nonce(12) | ciphertext | tag(16)
+        blob = crypto_engine.seal(self._kek(kek_id), data_key, f"kek:{kek_id}".encode())
+        return base64.b64encode(blob).decode("utf-8"), kek_id
+
+    def unwrap(self, wrapped_key: str, kek_id: int) -> bytes:
+        blob = base64.b64decode(wrapped_key)
+        if len(blob) < WRAP_NONCE_SIZE + WRAP_TAG_SIZE:
+            raise KeyRingError("Wrapped data key is truncated")
+        try:
+            return crypto_engine.open(self._kek(kek_id), blob, f"kek:{kek_id}".encode())
+        except AuthenticationError:
+            raise KeyRingError(f"Data key failed to unwrap with KEK {kek_id}")
+
+    def generate_data_key(self) -> Tuple[bytes, str, int]:
+        """New random data key, returned together with its wrapped form and KEK id"""
+        data_key = os.urandom(DATA_KEY_SIZE)
+        wrapped_key, kek_id = self.wrap(data_key)
+        return data_key, wrapped_key, kek_id
+
+    def rewrap(self, wrapped_key: Optional[str], kek_id: Optional[int]) -> Tuple[str, int]:
+        """Re-wrap a stored data key under the active KEK (legacy rows adopt the legacy key)"""
+        data_key = self.legacy_key if wrapped_key is None else self.unwrap(wrapped_key, kek_id)
+        return self.wrap(data_key)
+
+    def data_key_for(self, record) -> bytes:
+        """Data key for any row carrying ``wrapped_key`` and ``kek_id`` columns"""
+        # Deduplicated files keep their key on the shared blob
+        if getattr(record, "blob", None) is not None:
+            record = record.blob
+        if record.wrapped_key is None:
+            return self.legacy_key
+        return self.unwrap(record.wrapped_key, record.kek_id)
+
+    def session_key(self, session_id: str) -> bytes:
+        """
+        Transport key of a login session (the access token's ``jti``).
+
+        Derived rather than stored: the client receives it once from
+        ``verify-login`` and the server recomputes it for each download.
+        """
+        if self.transport_secret is None:
+            raise KeyRingError("TRANSPORT_KEY_SECRET is not configured")
+        return hmac.new(self.transport_secret, f"session:{session_id}".encode(), hashlib.sha256).digest()
+
+    def can_seal(self, file) -> bool:
+        """
+        Whether a file's data key may be handed to a session.
+
+        Only blobs flagged ``own_data_key`` at upload qualify: segmented
+        content under a random key of its own. Rows adopted from the legacy
+        key carry a ``wrapped_key`` too, but that key is ``SERVER_AES_KEY``.
+        """
+        blob = getattr(file, "blob", None)
+        return self.transport_secret is not None and blob is not None and bool(blob.own_data_key)
+
+    def wrap_for_session(self, record, session_id: str, context: str) -> str:
+        """
+        The row's data key sealed under a session transport key.
+
+        Returns base64 ``nonce(12) | ciphertext | tag(16)`` with ``context``
+        as associated data. Anything :meth:`can_seal` refuses is refused here
+        too, since its key may be the server-wide legacy key.
+        """
+        if not self.can_seal(record):
+            raise KeyRingError("File has no data key of its own")
+        blob = crypto_engine.seal(self.session_key(session_id), self.data_key_for(record), context.encode())
+        return base64.b64encode(blob).decode("utf-8")
+
+
+keyring = KeyRing.from_settings()
@@ -1,6 +1,8 @@
 from datetime import datetime, timedelta
 import secrets
-from ..utils.email import send_verification_email
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..config import settings
+from ..utils.email import send_verification_email, queue_verification_email
 
 class MFAHandler:
     @staticmethod
@@ -15,6 +17,18 @@ class MFAHandler:
         content = f"Your verification code is: {code}\nThis code will expire in 10 minutes."
         return await send_verification_email(email, code, None)
     
+    @staticmethod
+    def queue_mfa_code(db: AsyncSession, email: str, code: str, code_expires_at: datetime) -> None:
+        """
+        Queue MFA code email in the outbox; sent once the session commits.
+
+        The email expires ``MAIL_MFA_TTL_SECONDS`` from now (never after the
+        code itself), so a delayed retry can't deliver a dead code and the
+        code doesn't linger in the outbox.
+        """
+        expires_at = min(code_expires_at, datetime.utcnow() + timedelta(seconds=settings.MAIL_MFA_TTL_SECONDS))
+        queue_verification_email(db, email, code, expires_at=expires_at)
+    
     @staticmethod
     def verify_code(stored_code: str, provided_code: str) -> bool:
         """Verify the provided code matches the stored code"""
@@ -0,0 +1,236 @@
+"""
+Sliding-window rate limiting with pluggable storage.
+
+Every key (e.g. a client IP) keeps just two counters: hits in the current
+fixed window and in the previous one. The previous window's count is
+weighted by how much of it still overlaps the sliding window, which
+approximates a true sliding log in constant memory per key.
+
+Backends:
+
+* ``memory``: per-process, LRU-bounded to ``RATE_LIMIT_MAX_KEYS`` keys.
+* ``sqlite``: a small SQLite file shared by every worker on the node.
+* ``redis``: any Redis-compatible server, shared across nodes (needs the
+  ``redis`` package). Idle keys expire on their own.
+"""
+import math
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Tuple
+from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
+
+from ..config import settings
+
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    remaining: int
+    retry_after: int  # Seconds until the next hit would be allowed; 0 if allowed
+
+
+class WindowState(NamedTuple):
+    index: int
+    current: int
+    previous: int
+
+
+def _advance(state: Optional[WindowState], index: int) -> WindowState:
+    """Roll a key's counters forward to window ``index``"""
+    if state is None or state.index < index - 1:
+        return WindowState(index, 0, 0)
+    if state.index == index - 1:
+        return WindowState(index, 0, state.current)
+    return state
+
+
+def sliding_window_hit(
+    state: Optional[WindowState],
+    now: float,
+    limit: int,
+    window: int
+) -> Tuple[WindowState, RateLimitResult]:
+    """Count one hit against ``state``; denied hits are not counted"""
+    index = int(now // window)
+    state = _advance(state, index)
+    elapsed = (now % window) / window
+    estimate = state.previous * (1 - elapsed) + state.current
+
+    if estimate + 1 <= limit:
+        state = state._replace(current=state.current + 1)
+        return state, RateLimitResult(True, int(limit - estimate - 1), 0)
+
+    if state.current + 1 > limit or state.previous == 0:
+        # Nothing frees up before the next window starts
+        retry_after = window - (now % window)
+    else:
+        # Wait until enough of the previous window has slid out
+        needed = 1 - (limit - 1 - state.current) / state.previous
+        retry_after = (needed - elapsed) * window
+    return state, RateLimitResult(False, 0, max(1, math.ceil(retry_after)))
+
+
+class RateLimitBackend(ABC):
+    @abstractmethod
+    async def hit(self, key: str, limit: int, window: int) -> RateLimitResult:
+        """Record a hit for ``key`` unless it exceeds ``limit`` per ``window`` seconds"""
+
+
+class MemoryBackend(RateLimitBackend):
+    """Per-process counters; the least recently used keys are evicted beyond ``max_keys``"""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._states: "OrderedDict[str, WindowState]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def hit(self, key: str, limit: int, window: int) -> RateLimitResult:
+        with self._lock:
+            state, result = sliding_window_hit(self._states.get(key), time.time(), limit, window)
+            self._states[key] = state
+            self._states.move_to_end(key)
+            while len(self._states) > self.max_keys:
+                self._states.popitem(last=False)
+        return result
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+
+class SQLiteBackend(RateLimitBackend):
+    """
+    Counters in a SQLite file shared by every worker on the node.
+
+    Each hit is one short ``BEGIN IMMEDIATE`` transaction. Rows idle for two
+    windows are swept every ``sweep_every`` hits, so the table stays bounded
+    by the number of recently active keys.
+    """
+
+    def __init__(self, path: str, sweep_every: int = 1000):
+        self.path = path
+        self.sweep_every = sweep_every
+        self._local = threading.local()
+        self._hits = 0
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limits ("
+                "key TEXT PRIMARY KEY, window_index INTEGER NOT NULL, "
+                "current INTEGER NOT NULL, previous INTEGER NOT NULL, "
+                "updated_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_rate_limits_updated_at ON rate_limits (updated_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _hit(self, key: str, limit: int, window: int) -> RateLimitResult:
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT window_index, current, previous FROM rate_limits WHERE key = ?", (key,)
+            ).fetchone()
+            state, result = sliding_window_hit(WindowState(*row) if row else None, now, limit, window)
+            conn.execute(
+                "INSERT INTO rate_limits (key, window_index, current, previous, updated_at) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT(key) DO UPDATE SET "
+                "window_index = excluded.window_index, current = excluded.current, "
+                "previous = excluded.previous, updated_at = excluded.updated_at",
+                (key, state.index, state.current, state.previous, now)
+            )
+            self._hits += 1
+            if self._hits % self.sweep_every == 0:
+                conn.execute("DELETE FROM rate_limits WHERE updated_at < ?", (now - 2 * window,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return result
+
+    async def hit(self, key: str, limit: int, window: int) -> RateLimitResult:
+        return await run_in_threadpool(self._hit, key, limit, window)
+
+
+class RedisBackend(RateLimitBackend):
+    """
+    Counters in Redis (or a compatible server), one key per fixed window.
+
+    Window keys expire after two windows, so idle clients cost nothing. The
+    hit is counted optimistically and rolled back if it exceeds the limit.
+    """
+
+    def __init__(self, url: str = "", prefix: str = "ratelimit", client=None):
+        if client is None:
+            import redis.asyncio as redis
+            client = redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, key: str, index: int) -> str:
+        return f"{self.prefix}:{key}:{index}"
+
+    async def hit(self, key: str, limit: int, window: int) -> RateLimitResult:
+        now = time.time()
+        index = int(now // window)
+        current_key = self._key(key, index)
+        pipe = self.client.pipeline()
+        pipe.incr(current_key)
+        pipe.expire(current_key, 2 * window)
+        pipe.get(self._key(key, index - 1))
+        current, _, previous = await pipe.execute()
+        state = WindowState(index, int(current) - 1, int(previous or 0))
+        _, result = sliding_window_hit(state, now, limit, window)
+        if not result.allowed:
+            await self.client.decr(current_key)
+        return result
+
+
+class RateLimiter:
+    """``limit`` hits per sliding ``window`` seconds for each key"""
+
+    def __init__(self, backend: RateLimitBackend, limit: int, window: int, name: str = "default"):
+        self.backend = backend
+        self.limit = limit
+        self.window = window
+        self.name = name
+
+    async def hit(self, key: str) -> RateLimitResult:
+        return await self.backend.hit(f"{self.name}:{key}", self.limit, self.window)
+
+    async def check(self, key: str, detail: Optional[str] = None) -> RateLimitResult:
+        """Count a hit, raising 429 with ``Retry-After`` when over the limit"""
+        result = await self.hit(key)
+        if not result.allowed:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=detail or "Too many requests",
+                headers={"Retry-After": str(result.retry_after)}
+            )
+        return result
+
+
+def create_backend() -> RateLimitBackend:
+    if settings.RATE_LIMIT_BACKEND == "memory":
+        return MemoryBackend(settings.RATE_LIMIT_MAX_KEYS)
+    if settings.RATE_LIMIT_BACKEND == "sqlite":
+        return SQLiteBackend(settings.RATE_LIMIT_SQLITE_PATH)
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        return RedisBackend(settings.RATE_LIMIT_REDIS_URL)
+    raise ValueError(f"Unknown rate limit backend: {settings.RATE_LIMIT_BACKEND}")
+
+
+login_limiter = RateLimiter(
+    create_backend(),
+    limit=settings.LOGIN_MAX_ATTEMPTS,
+    window=settings.LOGIN_WINDOW_SECONDS,
+    name="login"
+)
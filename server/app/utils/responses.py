@@ -0,0 +1,15 @@
+"""
+JSON response class serialized with orjson.
+
+FastAPI's own ``ORJSONResponse`` is deprecated in recent releases and
+warns on every use, so the app ships its own equivalent.
+"""
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+
+class OrjsonResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
@@ -0,0 +1,172 @@
+import hashlib
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from ..models.revoked_token import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (double hashing on one BLAKE2b digest)"""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str) -> Iterable[int]:
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RevocationList:
+    """
+    Answers "is this token revoked?" mostly without touching the database.
+
+    Revoked ``jti``s live in the ``revoked_tokens`` table. Each worker keeps a
+    Bloom filter of them, rebuilt in full by the maintenance task, plus an
+    exact set of revocations seen since that rebuild. A token absent from the
+    filter is definitely not revoked; a filter hit that is not in the exact
+    set (a possible false positive) is confirmed with a primary-key lookup.
+
+    Revocations made on other workers are picked up by an incremental
+    refresh every ``REVOCATION_REFRESH_SECONDS``, which bounds how long they
+    may still be accepted elsewhere.
+    """
+
+    def __init__(self, capacity: int = 100000, error_rate: float = 0.001, refresh_interval: float = 5.0):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._recent: Dict[str, datetime] = {}
+        self._watermark: Optional[datetime] = None
+        self._next_refresh = 0.0
+        self.loaded = False
+        self.database_checks = 0
+
+    def _add(self, jti: str, expires_at: datetime, recent: bool = True) -> None:
+        with self._lock:
+            self._bloom.add(jti)
+            if recent:
+                self._recent[jti] = expires_at
+
+    async def rebuild(self, db: AsyncSession) -> int:
+        """Reload every unexpired revocation into a fresh filter"""
+        now = datetime.utcnow()
+        result = await db.execute(
+            select(RevokedToken.jti, RevokedToken.revoked_at).where(RevokedToken.expires_at > now)
+        )
+        rows = result.all()
+        bloom = BloomFilter(max(self.capacity, len(rows) * 2), self.error_rate)
+        watermark = None
+        for jti, revoked_at in rows:
+            bloom.add(jti)
+            if watermark is None or revoked_at > watermark:
+                watermark = revoked_at
+        with self._lock:
+            self._bloom = bloom
+            self._recent = {}
+            self._watermark = watermark or now
+            self.loaded = True
+        self._next_refresh = time.monotonic() + self.refresh_interval
+        return len(rows)
+
+    async def refresh(self, db: AsyncSession) -> None:
+        """Pull revocations made since the last refresh (by any worker)"""
+        if not self.loaded:
+            await self.rebuild(db)
+            return
+        # Overlap the window so rows committed slightly out of order aren't missed
+        since = self._watermark - timedelta(seconds=self.refresh_interval * 2)
+        result = await db.execute(
+            select(RevokedToken.jti, RevokedToken.expires_at, RevokedToken.revoked_at)
+            .where(RevokedToken.revoked_at >= since)
+        )
+        for jti, expires_at, revoked_at in result.all():
+            self._add(jti, expires_at)
+            if revoked_at > self._watermark:
+                self._watermark = revoked_at
+        self._next_refresh = time.monotonic() + self.refresh_interval
+
+    async def is_revoked(self, db: AsyncSession, jti: Optional[str]) -> bool:
+        if not jti:
+            # Tokens issued before jti claims existed can't be revoked individually
+            return False
+        if time.monotonic() >= self._next_refresh:
+            # Claim the refresh first so concurrent requests don't all run it
+            self._next_refresh = time.monotonic() + self.refresh_interval
+            try:
+                await self.refresh(db)
+            except Exception as e:
+                if not self.loaded:
+                    # There is no earlier filter to fall back on
+                    raise
+                # Keep answering from the last good filter; retried next interval
+                await db.rollback()
+                logger.warning(f"Revocation refresh failed, using the previous filter: {e}")
+
+        if jti not in self._bloom:
+            return False
+        expires_at = self._recent.get(jti)
+        if expires_at is not None:
+            return expires_at > datetime.utcnow()
+
+        self.database_checks += 1
+        row = await db.get(RevokedToken, jti)
+        return row is not None and row.expires_at > datetime.utcnow()
+
+    async def revoke(self, db: AsyncSession, jti: str, expires_at: datetime) -> None:
+        """Record a revocation; the caller's session is committed here"""
+        if await db.get(RevokedToken, jti) is None:
+            db.add(RevokedToken(jti=jti, expires_at=expires_at, revoked_at=datetime.utcnow()))
+            await db.commit()
+        self._add(jti, expires_at)
+
+    async def prune(self, db: AsyncSession) -> int:
+        """Delete expired rows in batches and rebuild the filter without them"""
+        # Imported here: the maintenance module schedules this method
+        from ..services.maintenance import sweep_expired
+
+        removed = await sweep_expired(
+            db, RevokedToken.expires_at, datetime.utcnow(), batch_size=settings.MAINTENANCE_BATCH_SIZE
+        )
+        await self.rebuild(db)
+        if removed:
+            logger.info(f"Pruned {removed} expired token revocations")
+        return removed
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "filter_entries": self._bloom.count,
+            "recent_entries": len(self._recent),
+            "database_checks": self.database_checks,
+        }
+
+
+revocation_list = RevocationList(
+    capacity=settings.REVOCATION_BLOOM_CAPACITY,
+    error_rate=settings.REVOCATION_BLOOM_ERROR_RATE,
+    refresh_interval=settings.REVOCATION_REFRESH_SECONDS
+)
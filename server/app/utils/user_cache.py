@@ -0,0 +1,117 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from ..config import settings
+from ..models.user import UserRole
+
+
+class UserSnapshot(NamedTuple):
+    """Immutable view of the authenticated user, safe to share between requests"""
+    id: int
+    email: str
+    full_name: str
+    role: UserRole
+    is_active: bool
+
+    @classmethod
+    def from_user(cls, user) -> "UserSnapshot":
+        return cls(user.id, user.email, user.full_name, user.role, user.is_active)
+
+    def is_admin(self) -> bool:
+        return self.role == UserRole.ADMIN
+
+    def is_user(self) -> bool:
+        return self.role == UserRole.USER
+
+
+class UserCache:
+    """
+    In-process TTL/LRU cache of user snapshots, keyed by token subject.
+
+    Saves the users query on every authenticated request. Admin changes
+    invalidate entries explicitly; the TTL bounds how long other workers,
+    which keep their own cache, may serve a stale entry.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 30.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, UserSnapshot]]" = OrderedDict()
+        self._subjects: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 and self.ttl > 0
+
+    def get(self, subject: str) -> Optional[UserSnapshot]:
+        with self._lock:
+            entry = self._entries.get(subject)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    self._remove(subject)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(subject)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, subject: str, snapshot: UserSnapshot) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._remove(subject)
+            self._entries[subject] = (time.monotonic() + self.ttl, snapshot)
+            self._subjects[snapshot.id] = subject
+            while len(self._entries) > self.maxsize:
+                oldest, (_, evicted) = self._entries.popitem(last=False)
+                self._forget(oldest, evicted)
+                self.evictions += 1
+
+    def invalidate(self, subject: Optional[str] = None, user_id: Optional[int] = None) -> None:
+        """Drop a user by subject and/or id"""
+        with self._lock:
+            if user_id is not None:
+                subject_for_id = self._subjects.get(user_id)
+                if subject_for_id is not None:
+                    self._remove(subject_for_id)
+            if subject is not None:
+                self._remove(subject)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._subjects.clear()
+
+    def _remove(self, subject: str) -> None:
+        entry = self._entries.pop(subject, None)
+        if entry is not None:
+            self._forget(subject, entry[1])
+
+    def _forget(self, subject: str, snapshot: UserSnapshot) -> None:
+        if self._subjects.get(snapshot.id) == subject:
+            del self._subjects[snapshot.id]
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+user_cache = UserCache(
+    maxsize=settings.USER_CACHE_SIZE,
+    ttl=settings.USER_CACHE_TTL_SECONDS
+)
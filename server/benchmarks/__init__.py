@@ -0,0 +1 @@
+"""Microbenchmarks and an in-process load test; see ``benchmarks/run.py``"""
@@ -0,0 +1,122 @@
+"""
+Measurement helpers shared by the micro and load benchmarks.
+
+Every benchmark reports into a flat ``{name: Metric}`` mapping, which is
+what gets written to the results file and compared against a baseline.
+"""
+import json
+import math
+import platform
+import resource
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, NamedTuple, Sequence
+
+
+class Metric(NamedTuple):
+    value: float
+    unit: str
+    better: str  # "higher" or "lower"
+
+
+class Comparison(NamedTuple):
+    name: str
+    baseline: float
+    current: float
+    change: float  # Relative change, signed so that negative is always worse
+    regressed: bool
+
+
+def percentile(values: Sequence[float], p: float) -> float:
+    """Nearest-rank percentile (``p`` in 0..100)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def measure_rate(fn: Callable[[], object], min_time: float = 0.5, min_runs: int = 3) -> float:
+    """Calls per second of ``fn``, run for at least ``min_time`` seconds"""
+    fn()  # Warm up
+    runs = 0
+    started = time.perf_counter()
+    while True:
+        fn()
+        runs += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time and runs >= min_runs:
+            return runs / elapsed
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def latency_metrics(prefix: str, samples: List[float], elapsed: float) -> Dict[str, Metric]:
+    """p50/p95/p99 latency (ms) and throughput (ops/s) of one operation"""
+    return {
+        f"{prefix}.p50_ms": Metric(percentile(samples, 50) * 1000, "ms", "lower"),
+        f"{prefix}.p95_ms": Metric(percentile(samples, 95) * 1000, "ms", "lower"),
+        f"{prefix}.p99_ms": Metric(percentile(samples, 99) * 1000, "ms", "lower"),
+        f"{prefix}.throughput": Metric(len(samples) / elapsed if elapsed else 0.0, "ops/s", "higher"),
+    }
+
+
+def environment() -> Dict[str, str]:
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+
+
+def save_results(path: str, metrics: Dict[str, Metric], config: Dict[str, object]) -> None:
+    payload = {
+        "meta": {**environment(), "config": config},
+        "metrics": {name: metric._asdict() for name, metric in sorted(metrics.items())},
+    }
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=2)
+        f.write("\n")
+
+
+def load_metrics(path: str) -> Dict[str, Metric]:
+    with open(path) as f:
+        payload = json.load(f)
+    return {name: Metric(**metric) for name, metric in payload["metrics"].items()}
+
+
+def compare(baseline: Dict[str, Metric], current: Dict[str, Metric], tolerance: float = 0.10) -> List[Comparison]:
+    """Compare metrics present in both runs; a change worse than ``tolerance`` is a regression"""
+    comparisons = []
+    for name in sorted(set(baseline) & set(current)):
+        old, new = baseline[name].value, current[name].value
+        if old == 0:
+            continue
+        change = (new - old) / old
+        if current[name].better == "lower":
+            change = -change
+        comparisons.append(Comparison(name, old, new, change, change < -tolerance))
+    return comparisons
+
+
+def format_metrics(metrics: Dict[str, Metric]) -> str:
+    width = max((len(name) for name in metrics), default=0)
+    return "\n".join(
+        f"{name:<{width}}  {metric.value:>12.2f} {metric.unit}" for name, metric in sorted(metrics.items())
+    )
+
+
+def format_comparisons(comparisons: List[Comparison]) -> str:
+    width = max((len(c.name) for c in comparisons), default=0)
+    lines = []
+    for c in comparisons:
+        flag = "  REGRESSION" if c.regressed else ""
+        lines.append(f"{c.name:<{width}}  {c.baseline:>12.2f} -> {c.current:>12.2f}  {c.change:+7.1%}{flag}")
+    return "\n".join(lines)
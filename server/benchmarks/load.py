@@ -0,0 +1,232 @@
+"""
+In-process load generator for the file paths.
+
+The app runs inside this process (full lifespan, so the maintenance jobs
+and the outbox dispatcher are live) against a throwaway SQLite database,
+upload directory and local SMTP stub. Virtual users talk to it through
+``httpx.ASGITransport``, so the numbers cover the whole ASGI stack but no
+network or TLS.
+
+Each operation (login, upload, list, download, sealed download, share access) runs as its
+own phase: all virtual users repeat it ``iterations`` times concurrently,
+giving clean per-operation latency percentiles and throughput.
+"""
+import asyncio
+import base64
+import os
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .harness import Metric, latency_metrics, peak_rss_mb
+
+PASSWORD = "Bench-password-1!"
+
+
+def prepare_environment(workdir: Path, smtp_port: int) -> None:
+    """
+    Point the app at a scratch database, upload dir and SMTP stub.
+
+    Must run before anything from ``app`` is imported, since settings are
+    read at import time.
+    """
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{workdir / 'bench.db'}",
+        "UPLOAD_DIR": str(workdir / "uploads"),
+        "RATE_LIMIT_BACKEND": "memory",
+        "LOGIN_MAX_ATTEMPTS": "1000000",
+        "SMTP_HOST": "127.0.0.1",
+        "SMTP_PORT": str(smtp_port),
+        "SMTP_USER": "bench@example.com",
+        "SMTP_PASSWORD": "bench",
+        "MAIL_SSL": "false",
+        "MAIL_TLS": "false",
+        "MAIL_POLL_INTERVAL_SECONDS": "1",
+    })
+    # Throwaway keys when no .env provides them
+    os.environ.setdefault("SERVER_AES_KEY", base64.b64encode(os.urandom(32)).decode())
+    os.environ.setdefault("TRANSPORT_KEY_SECRET", base64.b64encode(os.urandom(32)).decode())
+
+
+class SMTPStub:
+    """Local SMTP server that accepts any login and counts what it receives"""
+
+    def __init__(self, port: int):
+        from aiosmtpd.controller import Controller
+        from aiosmtpd.smtp import AuthResult
+
+        self.delivered = 0
+        self.controller = Controller(
+            self,
+            hostname="127.0.0.1",
+            port=port,
+            authenticator=lambda *args: AuthResult(success=True),
+            auth_require_tls=False
+        )
+
+    async def handle_DATA(self, server, session, envelope):
+        self.delivered += 1
+        return "250 OK"
+
+    def __enter__(self) -> "SMTPStub":
+        self.controller.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.controller.stop()
+
+
+class VirtualUser:
+    def __init__(self, client, email: str, user_id: int):
+        self.client = client
+        self.email = email
+        self.user_id = user_id
+        self.file_ids: List[int] = []
+        self.share_links: List[str] = []
+
+
+def _check(response) -> None:
+    if response.status_code >= 400:
+        raise RuntimeError(f"{response.request.method} {response.request.url.path}: {response.status_code} {response.text[:200]}")
+
+
+def _create_users(count: int) -> List[Tuple[str, int]]:
+    from app.database import SessionLocal
+    from app.models.user import User, UserRole
+    from app.utils.auth import get_password_hash
+
+    hashed = get_password_hash(PASSWORD)
+    db = SessionLocal()
+    try:
+        users = [User(email=f"bench{i}@example.com", full_name=f"Bench {i}", hashed_password=hashed,
+                      role=UserRole.USER, is_active=True) for i in range(count)]
+        db.add_all(users)
+        db.commit()
+        return [(user.email, user.id) for user in users]
+    finally:
+        db.close()
+
+
+async def _verification_code(verification_id: str) -> str:
+    from app.database import AsyncSessionLocal
+    from app.models.verification import LoginVerification
+
+    async with AsyncSessionLocal() as db:
+        return (await db.get(LoginVerification, verification_id)).code
+
+
+async def login(user: VirtualUser, _: int) -> None:
+    response = await user.client.post("/api/login", json={"email": user.email, "password": PASSWORD})
+    _check(response)
+    verification_id = response.json()["verification_id"]
+    code = await _verification_code(verification_id)
+    response = await user.client.post("/api/verify-login", json={"verification_id": verification_id, "code": code})
+    _check(response)
+    user.client.cookies.set("access_token", response.json()["access_token"])
+
+
+def upload(file_size: int) -> Callable[[VirtualUser, int], Awaitable[None]]:
+    async def run(user: VirtualUser, i: int) -> None:
+        from Crypto.Cipher import AES
+
+        # A real Web Crypto message (ciphertext | tag); the server verifies the tag
+        key, iv = os.urandom(32), os.urandom(12)
+        ciphertext, tag = AES.new(key, AES.MODE_GCM, nonce=iv).encrypt_and_digest(os.urandom(file_size))
+        response = await user.client.post(
+            "/api/user/upload",
+            files={"file": (f"bench_{i}.bin", ciphertext + tag, "application/octet-stream")},
+            data={
+                "iv": base64.b64encode(iv).decode(),
+                "user_key": base64.b64encode(key).decode()
+            }
+        )
+        _check(response)
+        user.file_ids.append(response.json()["id"])
+    return run
+
+
+async def list_files(user: VirtualUser, _: int) -> None:
+    _check(await user.client.get("/api/user/files"))
+
+
+async def download(user: VirtualUser, i: int) -> None:
+    file_id = user.file_ids[i % len(user.file_ids)]
+    _check(await user.client.get(f"/api/user/download/{file_id}", params={"format": "binary"}))
+
+
+async def download_sealed(user: VirtualUser, i: int) -> None:
+    file_id = user.file_ids[i % len(user.file_ids)]
+    _check(await user.client.get(f"/api/user/download/{file_id}", params={"format": "sealed"}))
+
+
+async def share_access(user: VirtualUser, i: int) -> None:
+    link = user.share_links[i % len(user.share_links)]
+    _check(await user.client.get(f"/api/user/shared/{link}", params={"format": "binary"}))
+
+
+async def _create_shares(users: List[VirtualUser]) -> None:
+    for index, user in enumerate(users):
+        recipient = users[(index + 1) % len(users)]
+        response = await user.client.post("/api/user/share", json={
+            "file_id": user.file_ids[0],
+            "user_id": recipient.user_id,
+            "expires_in_seconds": 3600,
+            "permission": "download"
+        })
+        _check(response)
+        # share_link is "<frontend>/file/<link>/<permission>"
+        user.share_links.append(response.json()["share_link"].split("/file/")[1].split("/")[0])
+
+
+async def run_phase(users: List[VirtualUser], iterations: int, operation) -> Tuple[List[float], float]:
+    samples: List[float] = []
+
+    async def worker(user: VirtualUser) -> None:
+        for i in range(iterations):
+            started = time.perf_counter()
+            await operation(user, i)
+            samples.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(user) for user in users))
+    return samples, time.perf_counter() - started
+
+
+async def run_async(concurrency: int, iterations: int, file_size: int, log: Optional[Callable[[str], None]] = None) -> Dict[str, Metric]:
+    import httpx
+    from app import main
+    from app.routes import auth
+
+    # The DNS deliverability check would make the run depend on the network
+    auth.validate_email_address = lambda email: True
+
+    log = log or (lambda message: None)
+    results: Dict[str, Metric] = {}
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        clients = [httpx.AsyncClient(transport=transport, base_url="https://bench") for _ in range(concurrency)]
+        try:
+            users = [VirtualUser(client, email, user_id) for client, (email, user_id) in zip(clients, _create_users(concurrency))]
+            phases = [
+                ("login", login),
+                ("upload", upload(file_size)),
+                ("list", list_files),
+                ("download", download),
+                ("download_sealed", download_sealed),
+                ("share_access", share_access),
+            ]
+            for name, operation in phases:
+                if name == "share_access":
+                    await _create_shares(users)
+                samples, elapsed = await run_phase(users, iterations, operation)
+                results.update(latency_metrics(f"load.{name}", samples, elapsed))
+                log(f"{name}: {len(samples)} ops in {elapsed:.2f}s")
+        finally:
+            for client in clients:
+                await client.aclose()
+    results["load.peak_rss_mb"] = Metric(peak_rss_mb(), "MB", "lower")
+    return results
+
+
+def run(concurrency: int = 8, iterations: int = 10, file_size: int = 256 * 1024, log=None) -> Dict[str, Metric]:
+    return asyncio.run(run_async(concurrency, iterations, file_size, log))
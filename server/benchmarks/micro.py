@@ -0,0 +1,49 @@
+"""
+Microbenchmarks of the per-request crypto: AES-GCM throughput per chunk
+size for each backend of the crypto engine, bcrypt password verification
+and JWT decoding.
+"""
+import os
+from typing import Dict, Sequence
+
+from .harness import Metric, measure_rate
+
+DEFAULT_CHUNK_SIZES = (1024, 16 * 1024, 64 * 1024, 1024 * 1024)
+
+
+def aes_gcm(chunk_sizes: Sequence[int] = DEFAULT_CHUNK_SIZES, min_time: float = 0.5) -> Dict[str, Metric]:
+    from app.utils.crypto_engine import available_backends
+
+    key, nonce = os.urandom(32), os.urandom(12)
+    results = {}
+    for size in chunk_sizes:
+        data = os.urandom(size)
+        for backend, implementation in available_backends().items():
+            cipher = implementation.keyed(key)
+            rate = measure_rate(lambda: cipher.seal(nonce, data), min_time)
+            results[f"micro.aes_gcm.{backend}.{size}"] = Metric(rate * size / 1e6, "MB/s", "higher")
+    return results
+
+
+def bcrypt_verify(min_time: float = 0.5) -> Dict[str, Metric]:
+    from app.utils.auth import get_password_hash, verify_password
+
+    hashed = get_password_hash("benchmark-password")
+    rate = measure_rate(lambda: verify_password("benchmark-password", hashed), min_time)
+    return {"micro.bcrypt.verify_ms": Metric(1000 / rate, "ms", "lower")}
+
+
+def jwt_decode(min_time: float = 0.5) -> Dict[str, Metric]:
+    from jose import jwt
+    from app.utils.auth import ALGORITHM, SECRET_KEY, create_access_token
+
+    token = create_access_token({"sub": "bench@example.com", "role": "user", "id": 1})
+    rate = measure_rate(lambda: jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]), min_time)
+    return {"micro.jwt.decode_us": Metric(1e6 / rate, "us", "lower")}
+
+
+def run(chunk_sizes: Sequence[int] = DEFAULT_CHUNK_SIZES, min_time: float = 0.5) -> Dict[str, Metric]:
+    results = aes_gcm(chunk_sizes, min_time)
+    results.update(bcrypt_verify(min_time))
+    results.update(jwt_decode(min_time))
+    return results
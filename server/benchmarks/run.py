@@ -0,0 +1,87 @@
+"""
+Run the benchmark suite and compare it with a stored baseline.
+
+Usage (from the server directory, with requirements-test.txt installed):
+    python -m benchmarks.run [--suite all|micro|load] [--output results.json]
+                             [--baseline benchmarks/baseline.json] [--fail-on-regression]
+
+Results are written as JSON (``{"meta": ..., "metrics": {name: {value,
+unit, better}}}``). With ``--update-baseline`` the run replaces the
+baseline instead. Baselines are machine-specific: regenerate them on the
+machine you compare on.
+"""
+import argparse
+import os
+import socket
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import harness
+from benchmarks.load import SMTPStub, prepare_environment
+
+DEFAULT_BASELINE = Path(__file__).with_name("baseline.json")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the upload/download paths")
+    parser.add_argument("--suite", choices=("all", "micro", "load"), default="all")
+    parser.add_argument("--output", default="benchmark-results.json", help="Where to write the results")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE), help="Results file to compare with")
+    parser.add_argument("--update-baseline", action="store_true", help="Write the results to --baseline as well")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Relative change counted as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 on regressions")
+    parser.add_argument("--min-time", type=float, default=0.5, help="Seconds per microbenchmark case")
+    parser.add_argument("--concurrency", type=int, default=8, help="Virtual users in the load test")
+    parser.add_argument("--iterations", type=int, default=10, help="Repetitions of each operation per user")
+    parser.add_argument("--file-size", type=int, default=256 * 1024, help="Bytes per uploaded file")
+    args = parser.parse_args()
+
+    config = {key: value for key, value in vars(args).items() if key not in ("output", "baseline", "update_baseline")}
+    metrics = {}
+    with tempfile.TemporaryDirectory(prefix="bench-") as workdir:
+        port = free_port()
+        prepare_environment(Path(workdir), port)
+        from benchmarks import load, micro
+
+        if args.suite in ("all", "micro"):
+            print("Running microbenchmarks...")
+            metrics.update(micro.run(min_time=args.min_time))
+        if args.suite in ("all", "load"):
+            print(f"Running load test ({args.concurrency} users x {args.iterations} iterations)...")
+            with SMTPStub(port) as smtp:
+                metrics.update(load.run(args.concurrency, args.iterations, args.file_size, log=print))
+            print(f"SMTP stub received {smtp.delivered} messages")
+
+    print(harness.format_metrics(metrics))
+    harness.save_results(args.output, metrics, config)
+    print(f"Results written to {args.output}")
+
+    if args.update_baseline:
+        harness.save_results(args.baseline, metrics, config)
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; skipping comparison")
+        return 0
+
+    comparisons = harness.compare(harness.load_metrics(args.baseline), metrics, args.tolerance)
+    print(f"\nCompared with {args.baseline} (tolerance {args.tolerance:.0%}):")
+    print(harness.format_comparisons(comparisons))
+    regressions = [c for c in comparisons if c.regressed]
+    if regressions:
+        print(f"{len(regressions)} regression(s)")
+        return 1 if args.fail_on_regression else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
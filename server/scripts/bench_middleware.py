@@ -0,0 +1,117 @@
+"""
+Compare per-request overhead of the security middleware implementations.
+
+"legacy" is the previous pair of ``@app.middleware("http")`` hooks (HTTPS
+redirect + security headers, i.e. two BaseHTTPMiddleware layers); "asgi" is
+``app.middleware.SecurityMiddleware``. Requests are driven straight
+through the ASGI interface, so the numbers are middleware cost only.
+
+Usage (from the server directory):
+    python -m scripts.bench_middleware [--requests 5000] [--chunks 256]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, RedirectResponse, StreamingResponse
+from starlette.routing import Route
+
+from app.middleware import SecurityMiddleware
+
+CHUNK = b"x" * 64 * 1024
+
+
+def build_app(kind: str, chunks: int) -> Starlette:
+    async def small(request):
+        return PlainTextResponse("ok")
+
+    async def stream(request):
+        async def body():
+            for _ in range(chunks):
+                yield CHUNK
+        return StreamingResponse(body(), media_type="application/octet-stream")
+
+    app = Starlette(routes=[Route("/small", small), Route("/stream", stream)])
+    if kind == "legacy":
+        @app.middleware("http")
+        async def https_redirect(request: Request, call_next):
+            if request.url.scheme == "http":
+                return RedirectResponse(url=str(request.url.replace(scheme="https")), status_code=301)
+            return await call_next(request)
+
+        @app.middleware("http")
+        async def add_security_headers(request: Request, call_next):
+            response = await call_next(request)
+            response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains; preload"
+            response.headers["X-Content-Type-Options"] = "nosniff"
+            response.headers["X-Frame-Options"] = "DENY"
+            response.headers["X-XSS-Protection"] = "1; mode=block"
+            return response
+    elif kind == "asgi":
+        app.add_middleware(SecurityMiddleware)
+    return app
+
+
+async def request(app, path: str):
+    """Run one request, returning (seconds to first body byte, seconds total)"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "https", "path": path, "raw_path": path.encode(), "root_path": "",
+        "query_string": b"", "headers": [(b"host", b"bench")], "server": ("bench", 443), "client": ("127.0.0.1", 1),
+    }
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.Event().wait()
+
+    started = time.perf_counter()
+    first_byte = None
+
+    async def send(message):
+        nonlocal first_byte
+        if message["type"] == "http.response.body" and first_byte is None and message.get("body"):
+            first_byte = time.perf_counter() - started
+
+    await app(scope, receive, send)
+    return first_byte or 0.0, time.perf_counter() - started
+
+
+async def measure(app, path: str, count: int):
+    for _ in range(min(count, 100)):
+        await request(app, path)
+    first, total = 0.0, 0.0
+    for _ in range(count):
+        f, t = await request(app, path)
+        first += f
+        total += t
+    return first / count * 1e6, total / count * 1e6
+
+
+async def main_async(args) -> None:
+    print(f"{'stack':<8}{'small µs/req':>14}{'stream TTFB µs':>16}{'stream µs/req':>16}")
+    for kind in ("none", "legacy", "asgi"):
+        app = build_app(kind, args.chunks)
+        _, small = await measure(app, "/small", args.requests)
+        ttfb, stream = await measure(app, "/stream", max(1, args.requests // 50))
+        print(f"{kind:<8}{small:>14.1f}{ttfb:>16.1f}{stream:>16.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the security middleware")
+    parser.add_argument("--requests", type=int, default=5000, help="Requests per small-response run")
+    parser.add_argument("--chunks", type=int, default=256, help="64 KiB chunks per streamed response")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Re-wrap all per-file data keys under ACTIVE_KEK_ID.
+
+Usage (from the server directory):
+    1. Add the new key to KEY_ENCRYPTION_KEYS and point ACTIVE_KEK_ID at it
+    2. python -m scripts.rotate_keys [--batch-size 1000] [--adopt-legacy]
+    3. Once no rows reference the old KEK, remove it from KEY_ENCRYPTION_KEYS
+"""
+import argparse
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal, Base, engine, sync_schema
+from app.models import blob, file, share, user  # noqa: F401 - register models
+from app.services.key_service import KeyRotationService
+from app.utils.keyring import keyring
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Re-wrap file data keys under the active KEK")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Rows updated per transaction")
+    parser.add_argument(
+        "--adopt-legacy",
+        action="store_true",
+        help="Also wrap SERVER_AES_KEY for files created before envelope encryption"
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Only report how many rows would change")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    Base.metadata.create_all(bind=engine)
+    sync_schema(engine)
+
+    db = SessionLocal()
+    try:
+        service = KeyRotationService(db)
+        pending = service.pending_count(adopt_legacy=args.adopt_legacy)
+        print(f"Active KEK: {keyring.active_id}, rows to re-wrap: {pending}")
+        if args.dry_run or pending == 0:
+            return
+        rotated = service.rotate(batch_size=args.batch_size, adopt_legacy=args.adopt_legacy)
+        print(f"Re-wrapped {rotated} data keys")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
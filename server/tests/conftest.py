@@ -1,24 +1,52 @@
+import os
+import shutil
+import tempfile
+
+# Blobs and the test database go to scratch space, never into the source tree.
+# Set before the app is imported, since settings and storage are built at import.
+TEST_DIR = tempfile.mkdtemp(prefix="sfs-tests-")
+os.environ["UPLOAD_DIR"] = os.path.join(TEST_DIR, "uploads")
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from app.database import Base, get_db
+from sqlalchemy.pool import NullPool
+from app.database import Base, get_db, get_async_db
 from app.main import app
-import os
 from app.models.user import User, UserRole
 from app.utils.auth import get_password_hash, create_access_token
 from datetime import timedelta
 import jwt
 from app.config import settings
+from app.utils.user_cache import user_cache
 
-# Use an in-memory SQLite database for testing
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+# Use a throwaway SQLite database for testing
+TEST_DB_PATH = os.path.join(TEST_DIR, "test.db")
+SQLALCHEMY_DATABASE_URL = f"sqlite:///{TEST_DB_PATH}"
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Same file through the async driver. TestClient runs each request on its own
+# event loop, so connections must not be pooled across requests.
+async_engine = create_async_engine(f"sqlite+aiosqlite:///{TEST_DB_PATH}", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+def client_encrypt(data, key=b"B" * 32, iv=b"A" * 16):
+    """An upload body as the Web Crypto client sends it: AES-GCM ``ciphertext | tag``"""
+    from Crypto.Cipher import AES
+    ciphertext, tag = AES.new(key, AES.MODE_GCM, nonce=iv).encrypt_and_digest(data)
+    return ciphertext + tag
+
+@pytest.fixture(scope="session", autouse=True)
+def test_dir():
+    yield TEST_DIR
+    shutil.rmtree(TEST_DIR, ignore_errors=True)
+
 @pytest.fixture(scope="function")
 def test_db():
     # Create the test database and tables
@@ -39,7 +67,14 @@ def client(test_db):
         finally:
             test_db.close()
 
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as db:
+            yield db
+
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    # Users are recreated per test, often with recycled ids
+    user_cache.clear()
     
     # Configure test client
     client = TestClient(
@@ -125,4 +160,12 @@ def auth_headers(test_user_token):
 
 @pytest.fixture
 def admin_auth_headers(test_admin_token):
-    return {"Authorization": f"Bearer {test_admin_token}"} 
\ No newline at end of file
+    return {"Authorization": f"Bearer {test_admin_token}"}
+
+@pytest.fixture
+def transport_secret(monkeypatch):
+    """Configure ``TRANSPORT_KEY_SECRET``, which sealed downloads require"""
+    from app.utils.keyring import keyring
+    secret = os.urandom(32)
+    monkeypatch.setattr(keyring, "transport_secret", secret)
+    return secret
@@ -1,11 +1,12 @@
 import pytest
 from fastapi import status
-from app.models.user import UserRole
+from app.models.user import User, UserRole
 import base64
 from app.utils.auth import create_access_token, get_current_user
 from datetime import timedelta
 import jwt
 from app.config import settings
+from tests.conftest import client_encrypt
 
 @pytest.fixture
 def admin_token(test_admin):
@@ -48,12 +49,65 @@ def test_admin_delete_user(admin_client, test_user):
     response = admin_client.delete(f"/api/admin/users/{test_user.id}")
     assert response.status_code == status.HTTP_204_NO_CONTENT
 
+def test_admin_delete_user_releases_blobs(admin_client, test_user, test_db, mock_encryption_params):
+    import os
+    from app.models.blob import Blob
+    from app.models.file import File
+    from app.storage import storage
+
+    def upload(content):
+        response = admin_client.post(
+            "/api/user/upload",
+            files={"file": ("f.txt", client_encrypt(content), "text/plain")},
+            data=mock_encryption_params
+        )
+        assert response.status_code == status.HTTP_200_OK
+        return response.json()["id"]
+
+    # The user holds two references to a blob the admin also uses, and the only one to another
+    user_files = [upload(b"shared content"), upload(b"shared content"), upload(b"own content")]
+    kept_id = upload(b"shared content")
+    test_db.query(File).filter(File.id.in_(user_files)).update({File.owner_id: test_user.id})
+    test_db.commit()
+    kept = test_db.query(File).filter(File.id == kept_id).one()
+    own = test_db.query(File).filter(File.id == user_files[2]).one().blob
+    own_id, own_key = own.id, own.storage_key
+
+    response = admin_client.delete(f"/api/admin/users/{test_user.id}")
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+
+    test_db.expire_all()
+    assert test_db.query(File).filter(File.id.in_(user_files)).count() == 0
+    assert kept.blob.ref_count == 1
+    assert test_db.get(Blob, own_id) is None
+    assert not os.path.exists(storage.local_path(own_key))
+
 def test_admin_delete_admin_user(admin_client, test_admin):
     response = admin_client.delete(
         f"/api/admin/users/{test_admin.id}"
     )
     assert response.status_code == status.HTTP_403_FORBIDDEN
 
+def test_admin_deactivate_user_takes_effect(client, test_user_token, test_admin_token, test_user):
+    # Warm the user cache with an active snapshot
+    client.cookies.set("access_token", test_user_token)
+    assert client.get("/api/profile").status_code == status.HTTP_200_OK
+
+    client.cookies.set("access_token", test_admin_token)
+    response = client.patch(f"/api/admin/users/{test_user.id}", json={"is_active": False})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["is_active"] is False
+
+    client.cookies.set("access_token", test_user_token)
+    response = client.post("/api/logout")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+def test_admin_user_cache_stats(admin_client):
+    admin_client.get("/api/admin/users")
+    stats = admin_client.get("/api/admin/cache/users").json()
+    assert stats["misses"] >= 1
+    assert stats["hits"] >= 1
+
 def test_non_admin_access_denied(auth_client):
     response = auth_client.get("/api/admin/users")
     assert response.status_code == status.HTTP_403_FORBIDDEN
@@ -91,7 +145,7 @@ def test_admin_delete_file(admin_client, test_uploaded_file):
 
 @pytest.fixture
 def test_uploaded_file(admin_client, mock_encryption_params):
-    file_content = b"Test file content"
+    file_content = client_encrypt(b"Test file content", key=b"A" * 32, iv=b"B" * 16)
     mock_key = base64.b64encode(b"A" * 32).decode()
     mock_iv = base64.b64encode(b"B" * 16).decode()
     
@@ -128,4 +182,21 @@ def mock_encryption_params():
     return {
         "iv": base64.b64encode(b"A" * 16).decode(),
         "user_key": base64.b64encode(b"B" * 32).decode()
-    } 
\ No newline at end of file
+    }
+
+
+def test_admin_users_paginated(admin_client, test_db):
+    for i in range(5):
+        test_db.add(User(email=f"page{i}@example.com", full_name=f"Page {i}", hashed_password="x", role=UserRole.USER))
+    test_db.commit()
+
+    emails, cursor = [], None
+    while True:
+        response = admin_client.get("/api/admin/users", params={"limit": 2, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == status.HTTP_200_OK
+        assert all("hashed_password" not in user for user in response.json())
+        emails.extend(user["email"] for user in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert emails == [f"page{i}@example.com" for i in range(5)]
@@ -108,6 +108,45 @@ def test_login_flow_success(client, test_user):
     else:
         print(f"Login failed with error: {response.json()}")
 
+def test_verify_login_returns_session_transport_key(client, test_db, test_user, transport_secret):
+    import base64
+    from jose import jwt
+    from app.models.verification import LoginVerification
+    from app.utils.keyring import keyring
+
+    test_db.add(LoginVerification(
+        id="transport-key-test",
+        user_id=test_user.id,
+        code="123456",
+        expires_at=datetime.utcnow() + timedelta(minutes=5)
+    ))
+    test_db.commit()
+
+    response = client.post("/api/verify-login", json={"verification_id": "transport-key-test", "code": "123456"})
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    session_id = jwt.get_unverified_claims(data["access_token"])["jti"]
+    assert base64.b64decode(data["transport_key"]) == keyring.session_key(session_id)
+    assert keyring.session_key(session_id) != keyring.session_key("another-session")
+
+def test_verify_login_without_transport_secret(client, test_db, test_user, monkeypatch):
+    from app.models.verification import LoginVerification
+    from app.utils.keyring import keyring
+
+    # Never falls back to a key derived from SERVER_AES_KEY
+    monkeypatch.setattr(keyring, "transport_secret", None)
+    test_db.add(LoginVerification(
+        id="no-transport-key-test",
+        user_id=test_user.id,
+        code="123456",
+        expires_at=datetime.utcnow() + timedelta(minutes=5)
+    ))
+    test_db.commit()
+
+    response = client.post("/api/verify-login", json={"verification_id": "no-transport-key-test", "code": "123456"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["transport_key"] is None
+
 def test_login_invalid_credentials(client):
     response = client.post(
         "/api/login",
@@ -145,6 +184,14 @@ def test_logout_success(auth_client):
     print(f"Logout response: {response.status_code}")
     assert response.status_code == status.HTTP_200_OK
 
+def test_logout_revokes_token(auth_client, test_user_token):
+    assert auth_client.post("/api/logout").status_code == status.HTTP_200_OK
+
+    # Replaying the same token after logout is rejected
+    auth_client.cookies.set("access_token", test_user_token)
+    response = auth_client.get("/api/profile")
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
 # Profile Tests
 def test_get_profile_success(auth_client, test_user):
     response = auth_client.get("/api/profile")
@@ -0,0 +1,31 @@
+from benchmarks.harness import Metric, compare, latency_metrics, percentile
+
+def test_percentile_nearest_rank():
+    samples = [float(i) for i in range(1, 101)]
+    assert percentile(samples, 50) == 50
+    assert percentile(samples, 99) == 99
+    assert percentile(samples, 100) == 100
+    assert percentile([3.0], 95) == 3.0
+    assert percentile([], 50) == 0.0
+
+def test_latency_metrics():
+    metrics = latency_metrics("load.x", [0.01, 0.02, 0.03, 0.04], elapsed=2.0)
+    assert metrics["load.x.p50_ms"] == Metric(20.0, "ms", "lower")
+    assert metrics["load.x.throughput"].value == 2.0
+
+def test_compare_respects_direction():
+    baseline = {
+        "latency": Metric(100.0, "ms", "lower"),
+        "rate": Metric(100.0, "MB/s", "higher"),
+        "only_baseline": Metric(1.0, "ms", "lower"),
+    }
+    current = {
+        "latency": Metric(120.0, "ms", "lower"),
+        "rate": Metric(120.0, "MB/s", "higher"),
+    }
+    results = {c.name: c for c in compare(baseline, current, tolerance=0.10)}
+    assert set(results) == {"latency", "rate"}
+    assert results["latency"].regressed
+    assert round(results["latency"].change, 2) == -0.2
+    assert not results["rate"].regressed
+    assert round(results["rate"].change, 2) == 0.2
@@ -5,7 +5,17 @@ import aiosmtplib
 from email.message import EmailMessage
 from app.config import settings
 import os
+import socket
+import asyncio
+from datetime import datetime, timedelta
+from aiosmtpd.controller import Controller
+from fastapi import status
 from app.models.user import User, UserRole
+from app.models.outbox import OutboxMessage
+from app.models.verification import LoginVerification
+from app.utils.email import enqueue_email
+from app.services.mail_dispatcher import MailDispatcher, SMTPConnectionPool
+from tests.conftest import TestingAsyncSessionLocal
 
 @pytest.mark.asyncio
 async def test_send_verification_email():
@@ -93,4 +103,123 @@ async def test_send_share_email():
         
         # Verify email was sent
         assert mock_smtp.send_message.called
-        assert result == True 
\ No newline at end of file
+        assert result == True 
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+class CollectingHandler:
+    def __init__(self):
+        self.messages = []
+        self.sessions = set()
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope)
+        self.sessions.add(id(session))
+        return "250 OK"
+
+def make_dispatcher(port, **kwargs):
+    pool = SMTPConnectionPool(
+        size=2,
+        factory=lambda: aiosmtplib.SMTP(hostname="127.0.0.1", port=port, use_tls=False, start_tls=False, timeout=5)
+    )
+    return MailDispatcher(session_factory=TestingAsyncSessionLocal, pool=pool, sender="noreply@example.com", **kwargs)
+
+async def enqueue(count):
+    async with TestingAsyncSessionLocal() as db:
+        for i in range(count):
+            enqueue_email(db, f"user{i}@example.com", "Subject", f"<p>Body {i}</p>")
+        await db.commit()
+
+def test_outbox_delivers_over_reused_connections(test_db):
+    handler = CollectingHandler()
+    port = free_port()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    try:
+        dispatcher = make_dispatcher(port, batch_size=5)
+
+        async def run():
+            await enqueue(12)
+            processed = [await dispatcher.dispatch_once() for _ in range(4)]
+            await dispatcher.close()
+            return processed
+
+        assert asyncio.run(run()) == [5, 5, 2, 0]
+    finally:
+        controller.stop()
+
+    assert len(handler.messages) == 12
+    assert sorted(m.rcpt_tos[0] for m in handler.messages) == sorted(f"user{i}@example.com" for i in range(12))
+    # Three batches, but never more connections than the pool holds
+    assert dispatcher.pool.connects <= 2
+    assert test_db.query(OutboxMessage).filter(OutboxMessage.status == OutboxMessage.SENT).count() == 12
+
+def test_outbox_retries_with_backoff_then_fails(test_db):
+    dispatcher = make_dispatcher(free_port(), max_attempts=2, retry_base=60)
+
+    async def run():
+        await enqueue(1)
+        return await dispatcher.dispatch_once()
+
+    assert asyncio.run(run()) == 1
+    message = test_db.query(OutboxMessage).one()
+    assert message.status == OutboxMessage.PENDING
+    assert message.attempts == 1
+    assert message.last_error
+    assert message.next_attempt_at > datetime.utcnow() + timedelta(seconds=40)
+
+    # Not due yet
+    assert asyncio.run(dispatcher.dispatch_once()) == 0
+
+    message.next_attempt_at = datetime.utcnow()
+    test_db.commit()
+    assert asyncio.run(dispatcher.dispatch_once()) == 1
+    test_db.refresh(message)
+    assert message.status == OutboxMessage.FAILED
+    assert message.attempts == 2
+
+def test_outbox_expires_and_clears_login_codes(test_db):
+    handler = CollectingHandler()
+    port = free_port()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    try:
+        dispatcher = make_dispatcher(port)
+
+        async def run():
+            async with TestingAsyncSessionLocal() as db:
+                enqueue_email(db, "late@example.com", "Code", "<p>11111111</p>", expires_at=datetime.utcnow() - timedelta(seconds=1))
+                enqueue_email(db, "fresh@example.com", "Code", "<p>22222222</p>", expires_at=datetime.utcnow() + timedelta(minutes=5))
+                await db.commit()
+            processed = await dispatcher.dispatch_once()
+            await dispatcher.close()
+            return processed
+
+        assert asyncio.run(run()) == 1
+    finally:
+        controller.stop()
+
+    assert [m.rcpt_tos[0] for m in handler.messages] == ["fresh@example.com"]
+    messages = {m.recipient: m for m in test_db.query(OutboxMessage).all()}
+    assert messages["late@example.com"].status == OutboxMessage.EXPIRED
+    assert messages["fresh@example.com"].status == OutboxMessage.SENT
+    # Neither code stays in the outbox
+    assert messages["late@example.com"].body == messages["fresh@example.com"].body == ""
+
+def test_login_queues_verification_email(client, test_user, test_db, monkeypatch):
+    # Skip the DNS deliverability check on the test domain
+    monkeypatch.setattr("app.routes.auth.validate_email_address", lambda email: True)
+    response = client.post(
+        "/api/login",
+        json={"email": test_user.email, "password": "testpassword123!"}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    message = test_db.query(OutboxMessage).one()
+    assert message.recipient == test_user.email
+    assert message.status == OutboxMessage.PENDING
+    # The email expires well before the code does
+    verification = test_db.query(LoginVerification).one()
+    assert message.expires_at < verification.expires_at
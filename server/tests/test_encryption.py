@@ -1,8 +1,10 @@
 import pytest
-from app.utils.encryption import FileEncryption
 import os
 import base64
 from Crypto.Cipher import AES
+import io
+import hashlib
+from app.utils.file_format import EncryptedFileReader, SegmentWriter, FileFormatError, HEADER_SIZE
 
 def test_encryption():
     key = os.urandom(32)
@@ -33,4 +35,219 @@ def test_encryption_decryption():
     encrypted_data = cipher.encrypt(original_data)
     assert encrypted_data != original_data
 
-# Remove test_key_generation and test_iv_generation if these methods don't exist 
\ No newline at end of file
+# Remove test_key_generation and test_iv_generation if these methods don't exist 
+@pytest.mark.asyncio
+async def test_stream_upload_to_disk_roundtrip(tmp_path):
+    from io import BytesIO
+    from fastapi import UploadFile
+    from app.utils.file_crypto import stream_upload_to_disk
+
+    client_key = os.urandom(32)
+    client_iv = os.urandom(12)
+    server_key = os.urandom(32)
+    plaintext = os.urandom(300_000)
+    ciphertext, tag = AES.new(client_key, AES.MODE_GCM, nonce=client_iv).encrypt_and_digest(plaintext)
+    client_ciphertext = ciphertext + tag
+
+    dest = tmp_path / "blob.enc"
+    result = await stream_upload_to_disk(
+        UploadFile(file=BytesIO(client_ciphertext), filename="blob"),
+        client_key=client_key,
+        client_iv=client_iv,
+        server_key=server_key,
+        dest=dest,
+        chunk_size=64 * 1024,
+        hasher=hashlib.sha256()
+    )
+
+    assert result.size == len(plaintext)
+    assert result.digest == hashlib.sha256(plaintext).hexdigest()
+    with EncryptedFileReader.open(str(dest), server_key) as reader:
+        assert reader.version == 2
+        assert reader.read() == plaintext
+    assert not (tmp_path / "blob.enc.part").exists()
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("tamper", ["tag", "truncate"])
+async def test_stream_upload_to_disk_rejects_unauthenticated_upload(tmp_path, tamper):
+    from io import BytesIO
+    from fastapi import UploadFile
+    from app.utils.crypto_engine import AuthenticationError
+    from app.utils.file_crypto import stream_upload_to_disk
+
+    client_key, client_iv = os.urandom(32), os.urandom(12)
+    ciphertext, tag = AES.new(client_key, AES.MODE_GCM, nonce=client_iv).encrypt_and_digest(os.urandom(1000))
+    body = ciphertext + bytes([tag[0] ^ 1]) + tag[1:] if tamper == "tag" else ciphertext[:8]
+
+    dest = tmp_path / "blob.enc"
+    with pytest.raises(AuthenticationError):
+        await stream_upload_to_disk(
+            UploadFile(file=BytesIO(body), filename="blob"),
+            client_key=client_key,
+            client_iv=client_iv,
+            server_key=os.urandom(32),
+            dest=dest
+        )
+    assert not dest.exists()
+    assert not (tmp_path / "blob.enc.part").exists()
+
+def _write_segmented(key, data, segment_size=1024):
+    buffer = io.BytesIO()
+    writer = SegmentWriter(buffer, key, segment_size)
+    writer.write(data)
+    writer.close()
+    return buffer.getvalue()
+
+@pytest.mark.parametrize("size", [0, 1, 1024, 1025, 5000])
+def test_segmented_format_roundtrip(size):
+    key = os.urandom(32)
+    data = os.urandom(size)
+    reader = EncryptedFileReader(io.BytesIO(_write_segmented(key, data)), key)
+    assert reader.size == size
+    assert reader.read() == data
+
+def test_segmented_format_range_read():
+    key = os.urandom(32)
+    data = os.urandom(5000)
+    reader = EncryptedFileReader(io.BytesIO(_write_segmented(key, data)), key)
+    assert reader.read(1000, 3100) == data[1000:3100]
+    assert reader.read(4990) == data[4990:]
+    assert list(reader.index.segments_for_range(1000, 3100)) == [0, 1, 2, 3]
+
+def test_segmented_format_detects_tampering_and_truncation():
+    key = os.urandom(32)
+    blob = bytearray(_write_segmented(key, os.urandom(5000)))
+    blob[HEADER_SIZE + 10] ^= 1
+    with pytest.raises(FileFormatError):
+        EncryptedFileReader(io.BytesIO(bytes(blob)), key).read()
+
+    # Dropping whole trailing segments must not go unnoticed
+    truncated = _write_segmented(key, os.urandom(5000))[:HEADER_SIZE + 2 * (1024 + 16)]
+    with pytest.raises(FileFormatError):
+        EncryptedFileReader(io.BytesIO(truncated), key).read()
+
+def test_legacy_format_still_readable():
+    key = os.urandom(32)
+    data = b"legacy file content"
+    cipher = AES.new(key, AES.MODE_GCM)
+    ciphertext, tag = cipher.encrypt_and_digest(data)
+    reader = EncryptedFileReader(io.BytesIO(cipher.nonce + tag + ciphertext), key)
+    assert reader.version == 1
+    assert reader.size == len(data)
+    assert reader.read(7, 11) == data[7:11]
+
+def _write_compressed(key, data, sample_size=4096):
+    from app.utils.content_codec import CompressingWriter
+    buffer = io.BytesIO()
+    writer = CompressingWriter(SegmentWriter(buffer, key, 1024), sample_size=sample_size)
+    for start in range(0, len(data), 3000):
+        writer.write(data[start:start + 3000])
+    writer.close()
+    return writer, buffer.getvalue()
+
+def test_compressed_format_roundtrip_and_ranges():
+    pytest.importorskip("zstandard")
+    from app.utils.content_codec import CODEC_ZSTD, open_decoded
+
+    key = os.urandom(32)
+    data = b"".join(b"line %d of a very repetitive log file\n" % i for i in range(20000))
+    writer, stored = _write_compressed(key, data)
+    assert writer.codec == CODEC_ZSTD
+    assert writer.plaintext_size == len(data)
+    assert len(stored) < len(data) // 4
+
+    reader = open_decoded(EncryptedFileReader(io.BytesIO(stored), key), writer.codec, len(data))
+    assert reader.size == len(data)
+    assert reader.read() == data
+    assert reader.read(500_000, 500_100) == data[500_000:500_100]
+    assert reader.read(len(data) - 5) == data[-5:]
+    # Going backwards restarts the decoder
+    assert reader.read(10, 20) == data[10:20]
+
+    # A size that doesn't match the content is reported, not silently truncated
+    with pytest.raises(FileFormatError):
+        open_decoded(EncryptedFileReader(io.BytesIO(stored), key), writer.codec, len(data) + 1).read()
+
+@pytest.mark.parametrize("size", [0, 100, 10_000])
+def test_incompressible_content_is_stored_as_is(size):
+    from app.utils.content_codec import open_decoded
+
+    key = os.urandom(32)
+    data = os.urandom(size)
+    writer, stored = _write_compressed(key, data)
+    assert writer.codec is None
+    assert writer.plaintext_size == size
+    reader = open_decoded(EncryptedFileReader(io.BytesIO(stored), key), writer.codec, size)
+    assert reader.size == size
+    assert reader.read() == data
+
+@pytest.mark.asyncio
+async def test_crypto_executor_runs_off_loop_and_iterates():
+    import threading
+    from app.utils.executor import CryptoExecutor
+
+    executor = CryptoExecutor(kind="thread", max_workers=2, max_concurrency=2)
+    try:
+        worker = await executor.run(lambda: threading.current_thread().name)
+        assert worker.startswith("crypto")
+
+        chunks = [chunk async for chunk in executor.iterate(iter([b"a", b"b", b"c"]))]
+        assert chunks == [b"a", b"b", b"c"]
+        assert executor.stats()["pending"] == 0
+    finally:
+        executor.shutdown()
+
+@pytest.mark.asyncio
+async def test_crypto_executor_process_pool_password_hash():
+    from app.utils.auth import get_password_hash, verify_password
+    from app.utils.executor import CryptoExecutor
+
+    executor = CryptoExecutor(kind="process", max_workers=1)
+    try:
+        hashed = await executor.run_stateless(get_password_hash, "secret")
+        assert await executor.run_stateless(verify_password, "secret", hashed)
+    finally:
+        executor.shutdown()
+
+@pytest.mark.parametrize("backend", ["pycryptodome", "cryptography"])
+def test_crypto_engine_backends_interoperate(backend):
+    from app.utils.crypto_engine import AuthenticationError, CryptoEngine
+
+    engine = CryptoEngine(backend)
+    reference = CryptoEngine("pycryptodome")
+    key, nonce, data = os.urandom(32), os.urandom(12), os.urandom(5000)
+
+    sealed = engine.key(key).seal(nonce, data, b"aad")
+    assert reference.key(key).open(nonce, sealed, b"aad") == data
+    assert engine.open(key, reference.seal(key, data)) == data
+    with pytest.raises(AuthenticationError):
+        engine.key(key).open(nonce, sealed, b"other aad")
+
+    # Streaming in pieces produces the same ``ciphertext | tag`` as a one-shot seal
+    encryptor = engine.encryptor(key, nonce)
+    streamed = encryptor.update(data[:1000]) + encryptor.update(data[1000:]) + encryptor.finalize()
+    assert streamed == reference.key(key).seal(nonce, data)
+
+    decryptor = engine.decryptor(key, nonce)
+    assert decryptor.update(streamed[:-16]) == data
+    decryptor.verify(streamed[-16:])
+    decryptor = engine.decryptor(key, nonce)
+    decryptor.update(streamed[:-16])
+    with pytest.raises(AuthenticationError):
+        decryptor.verify(bytes(16))
+
+def test_crypto_engine_selects_fastest_backend_and_caches_keys(monkeypatch):
+    from app.utils import crypto_engine as module
+
+    monkeypatch.setattr(module, "calibrate", lambda backends: {"pycryptodome": 100.0, "cryptography": 900.0})
+    engine = module.CryptoEngine("auto", key_cache_size=2)
+    assert engine.select_backend() == "cryptography"
+    assert engine.calibration["cryptography"] == 900.0
+
+    first, second, third = os.urandom(32), os.urandom(32), os.urandom(32)
+    cipher = engine.key(first)
+    assert engine.key(first) is cipher
+    engine.key(second)
+    engine.key(third)
+    # The least recently used key was evicted
+    assert engine.key(first) is not cipher
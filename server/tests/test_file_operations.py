@@ -1,9 +1,14 @@
 import pytest
 from fastapi import status
 import io
-from app.models.file import SharePermission
+from app.models.file import SharePermission, File as FileModel
+from datetime import datetime, timedelta
+from app.models.user import User, UserRole
 import base64
+import os
 import time
+from Crypto.Cipher import AES
+from tests.conftest import client_encrypt
 
 @pytest.fixture
 def mock_encryption_params():
@@ -12,9 +17,14 @@ def mock_encryption_params():
         "user_key": base64.b64encode(b"B" * 32).decode()
     }
 
+@pytest.fixture
+def stored_content():
+    # What the server stores for the upload fixture
+    return b"Test file content"
+
 @pytest.fixture
 def test_file_upload_response(auth_client, mock_encryption_params):
-    file_content = b"Test file content"
+    file_content = client_encrypt(b"Test file content")
     file = io.BytesIO(file_content)
     
     files = {"file": ("test.txt", file, "text/plain")}
@@ -30,7 +40,7 @@ def test_file_upload_response(auth_client, mock_encryption_params):
     return response.json()
 
 def test_upload_file_success(auth_client, mock_encryption_params):
-    file_content = b"Test file content"
+    file_content = client_encrypt(b"Test file content")
     file = io.BytesIO(file_content)
     
     response = auth_client.post(
@@ -41,6 +51,17 @@ def test_upload_file_success(auth_client, mock_encryption_params):
     print(f"Upload response: {response.status_code}, {response.json() if response.status_code != 204 else ''}")
     assert response.status_code == status.HTTP_200_OK
 
+def test_upload_file_rejects_tampered_tag(auth_client, mock_encryption_params, test_db):
+    body = bytearray(client_encrypt(b"Test file content"))
+    body[-1] ^= 1
+    response = auth_client.post(
+        "/api/user/upload",
+        files={"file": ("test.txt", io.BytesIO(bytes(body)), "text/plain")},
+        data=mock_encryption_params
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert test_db.query(FileModel).count() == 0
+
 def test_upload_file_no_auth(client):
     file = io.BytesIO(b"Test content")
     response = client.post(
@@ -50,7 +71,7 @@ def test_upload_file_no_auth(client):
     assert response.status_code == status.HTTP_401_UNAUTHORIZED
 
 def test_upload_large_file(auth_client, mock_encryption_params):
-    large_content = b"0" * (6 * 1024 * 1024)
+    large_content = client_encrypt(os.urandom(6 * 1024 * 1024))
     file = io.BytesIO(large_content)
     
     response = auth_client.post(
@@ -61,6 +82,41 @@ def test_upload_large_file(auth_client, mock_encryption_params):
     print(f"Large file upload response: {response.status_code}, {response.json() if response.status_code != 204 else ''}")
     assert response.status_code == status.HTTP_200_OK
 
+def test_upload_deduplicates_identical_content(auth_client, mock_encryption_params, test_db):
+    from app.models.file import File as FileModel
+    ids = []
+    for name in ("first.txt", "second.txt"):
+        response = auth_client.post(
+            "/api/user/upload",
+            files={"file": (name, io.BytesIO(client_encrypt(b"Same content")), "text/plain")},
+            data=mock_encryption_params
+        )
+        assert response.status_code == status.HTTP_200_OK
+        ids.append(response.json()["id"])
+
+    first, second = (test_db.query(FileModel).get(file_id) for file_id in ids)
+    assert first.blob_id == second.blob_id
+    assert first.blob.ref_count == 2
+
+def test_admin_delete_releases_blob(admin_client, mock_encryption_params, test_db):
+    import os
+    from app.models.blob import Blob
+    response = admin_client.post(
+        "/api/user/upload",
+        files={"file": ("only.txt", io.BytesIO(client_encrypt(b"Unique content")), "text/plain")},
+        data=mock_encryption_params
+    )
+    file_id = response.json()["id"]
+    blob = test_db.query(Blob).one()
+    blob_path = blob.file_path
+    assert os.path.exists(blob_path)
+
+    response = admin_client.delete(f"/api/admin/file/{file_id}")
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    test_db.expire_all()
+    assert test_db.query(Blob).count() == 0
+    assert not os.path.exists(blob_path)
+
 # File Download Tests
 def test_download_file_success(auth_client, test_file_upload_response):
     response = auth_client.get(
@@ -69,11 +125,229 @@ def test_download_file_success(auth_client, test_file_upload_response):
     print(f"Download response: {response.status_code}, {response.json() if response.status_code != 204 else ''}")
     assert response.status_code == status.HTTP_200_OK
 
+def test_download_file_range(auth_client, test_file_upload_response, stored_content):
+    response = auth_client.get(
+        f"/api/user/download/{test_file_upload_response['id']}",
+        headers={"Range": "bytes=5-8"}
+    )
+    assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert response.headers["content-range"] == "bytes 5-8/17"
+    assert response.content == stored_content[5:9]
+
+def test_download_file_multi_range(auth_client, test_file_upload_response, stored_content):
+    response = auth_client.get(
+        f"/api/user/download/{test_file_upload_response['id']}",
+        headers={"Range": "bytes=0-3,-7"}
+    )
+    assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert response.headers["content-type"].startswith("multipart/byteranges")
+    assert b"Content-Range: bytes 0-3/17" in response.content
+    assert b"Content-Range: bytes 10-16/17" in response.content
+    assert stored_content[:4] in response.content
+    assert stored_content[10:] in response.content
+
+def test_download_file_range_not_satisfiable(auth_client, test_file_upload_response):
+    response = auth_client.get(
+        f"/api/user/download/{test_file_upload_response['id']}",
+        headers={"Range": "bytes=100-200"}
+    )
+    assert response.status_code == status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+    assert response.headers["content-range"] == "bytes */17"
+
+def test_download_file_if_range_mismatch(auth_client, test_file_upload_response):
+    response = auth_client.get(
+        f"/api/user/download/{test_file_upload_response['id']}",
+        headers={"Range": "bytes=0-3", "If-Range": '"stale-etag"'}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert "encrypted_data" in response.json()
+
+def test_download_file_binary(auth_client, test_file_upload_response, stored_content):
+    response = auth_client.get(
+        f"/api/user/download/{test_file_upload_response['id']}?format=binary"
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/octet-stream"
+    key = base64.b64decode(response.headers["x-encryption-key"])
+    iv = base64.b64decode(response.headers["x-encryption-iv"])
+    body = response.content
+    decrypted = AES.new(key, AES.MODE_GCM, nonce=iv).decrypt_and_verify(body[:-16], body[-16:])
+    assert decrypted == stored_content
+
+def test_download_file_sealed(auth_client, test_file_upload_response, stored_content, test_user_token, transport_secret):
+    from jose import jwt
+    from app.utils.file_format import EncryptedFileReader, MAGIC
+    from app.utils.keyring import keyring
+
+    file_id = test_file_upload_response["id"]
+    response = auth_client.get(f"/api/user/download/{file_id}?format=sealed")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["x-encryption-mode"] == "sealed"
+    assert response.content.startswith(MAGIC)
+
+    # The client knows its transport key from verify-login; here it is derived from the token id
+    transport_key = keyring.session_key(jwt.get_unverified_claims(test_user_token)["jti"])
+    wrapped = base64.b64decode(response.headers["x-wrapped-key"])
+    cipher = AES.new(transport_key, AES.MODE_GCM, nonce=wrapped[:12])
+    cipher.update(f"file:{file_id}".encode())
+    data_key = cipher.decrypt_and_verify(wrapped[12:-16], wrapped[-16:])
+
+    reader = EncryptedFileReader(io.BytesIO(response.content), data_key)
+    assert reader.read() == stored_content
+
+    # Ranges address the stored ciphertext, so a client can fetch whole segments
+    partial = auth_client.get(
+        f"/api/user/download/{file_id}?format=sealed", headers={"Range": "bytes=0-3"}
+    )
+    assert partial.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert partial.content == MAGIC
+
+def test_sealed_download_refuses_adopted_legacy_keys(
+    auth_client, test_file_upload_response, stored_content, test_db, transport_secret, monkeypatch
+):
+    from app.utils.keyring import keyring
+
+    file_id = test_file_upload_response["id"]
+    # A blob whose key was adopted from SERVER_AES_KEY looks wrapped but must never be sent
+    blob = test_db.query(FileModel).filter(FileModel.id == file_id).one().blob
+    assert blob.own_data_key
+    blob.own_data_key = None
+    test_db.commit()
+
+    response = auth_client.get(f"/api/user/download/{file_id}?format=sealed")
+    assert response.status_code == status.HTTP_200_OK
+    assert "x-wrapped-key" not in response.headers
+    key = base64.b64decode(response.headers["x-encryption-key"])
+    iv = base64.b64decode(response.headers["x-encryption-iv"])
+    body = response.content
+    assert AES.new(key, AES.MODE_GCM, nonce=iv).decrypt_and_verify(body[:-16], body[-16:]) == stored_content
+
+    # Without TRANSPORT_KEY_SECRET no file is sealed at all
+    blob.own_data_key = True
+    test_db.commit()
+    monkeypatch.setattr(keyring, "transport_secret", None)
+    response = auth_client.get(f"/api/user/download/{file_id}?format=sealed")
+    assert response.status_code == status.HTTP_200_OK
+    assert "x-wrapped-key" not in response.headers
+
+def test_upload_compresses_compressible_content(auth_client, mock_encryption_params, test_db, monkeypatch):
+    pytest.importorskip("zstandard")
+    from app.config import settings
+    from app.models.blob import Blob
+    from app.storage import storage
+
+    monkeypatch.setattr(settings, "FILE_COMPRESSION_ENABLED", True)
+
+    plaintext = b"".join(b"row %d,compressible,csv,content\n" % i for i in range(50000))
+    body = client_encrypt(plaintext)
+    response = auth_client.post(
+        "/api/user/upload",
+        files={"file": ("table.csv", io.BytesIO(body), "text/csv")},
+        data=mock_encryption_params
+    )
+    assert response.status_code == status.HTTP_200_OK
+    file_id = response.json()["id"]
+    assert response.json()["size"] == len(plaintext)
+
+    db_file = test_db.query(FileModel).filter(FileModel.id == file_id).first()
+    blob = test_db.query(Blob).filter(Blob.id == db_file.blob_id).first()
+    assert blob.codec == "zstd"
+    assert db_file.size == blob.size == len(plaintext)
+    assert os.path.getsize(storage.local_path(blob.storage_key)) < len(plaintext) // 4
+
+    # Downloads carry the original bytes; sealed falls back since clients can't decode zstd
+    response = auth_client.get(f"/api/user/download/{file_id}?format=sealed")
+    assert response.headers["x-encryption-mode"] == "transport"
+    key = base64.b64decode(response.headers["x-encryption-key"])
+    iv = base64.b64decode(response.headers["x-encryption-iv"])
+    body = response.content
+    assert AES.new(key, AES.MODE_GCM, nonce=iv).decrypt_and_verify(body[:-16], body[-16:]) == plaintext
+
+    partial = auth_client.get(f"/api/user/download/{file_id}", headers={"Range": "bytes=1000000-1000099"})
+    assert partial.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert partial.content == plaintext[1000000:1000100]
+
+    # Several ranges are answered in ascending order from a single decode pass
+    from app.utils.content_codec import DecompressingReader
+    decodes = []
+    restart = DecompressingReader._restart
+    monkeypatch.setattr(DecompressingReader, "_restart", lambda self: (decodes.append(1), restart(self)))
+    partial = auth_client.get(
+        f"/api/user/download/{file_id}", headers={"Range": "bytes=1000000-1000099,10-19,15-29"}
+    )
+    assert partial.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert len(decodes) == 1
+    body = partial.content
+    assert b"Content-Range: bytes 10-29/%d" % len(plaintext) in body
+    assert body.index(plaintext[10:30]) < body.index(plaintext[1000000:1000100])
+
+def test_upload_keeps_incompressible_content_uncompressed(auth_client, test_file_upload_response, test_db):
+    db_file = test_db.query(FileModel).filter(FileModel.id == test_file_upload_response["id"]).first()
+    assert db_file.blob.codec is None
+
 def test_download_nonexistent_file(auth_client):
     response = auth_client.get("/api/user/download/99999")
     assert response.status_code == status.HTTP_404_NOT_FOUND
 
+def test_download_missing_blob(auth_client, test_file_upload_response, test_db):
+    from app.storage import storage
+
+    file_id = test_file_upload_response["id"]
+    blob = test_db.query(FileModel).filter(FileModel.id == file_id).one().blob
+    os.remove(storage.local_path(blob.storage_key))
+    for response_format in ("json", "binary"):
+        response = auth_client.get(f"/api/user/download/{file_id}?format={response_format}")
+        assert response.status_code == status.HTTP_404_NOT_FOUND, response_format
+        assert response.json()["detail"] == "File not found"
+
 # File Sharing Tests
+def test_blob_store_gives_each_row_its_own_object(test_db):
+    import asyncio
+    from app.models.blob import Blob
+    from app.services.blob_service import BlobService
+    from tests.conftest import TestingAsyncSessionLocal
+
+    def staged(data):
+        path = BlobService.temp_path()
+        path.write_bytes(data)
+        return path
+
+    async def scenario():
+        async with TestingAsyncSessionLocal() as db:
+            blobs = BlobService(db)
+            old = await blobs.store(staged(b"old"), digest="e" * 64, size=3, wrapped_key=None, kek_id=None)
+            await db.commit()
+            stale_key = await blobs.release(old)
+            await db.commit()
+
+            # The same content is uploaded again before the old object is deleted
+            new = await blobs.store(staged(b"new"), digest="e" * 64, size=3, wrapped_key=None, kek_id=None)
+            await db.commit()
+            assert new.storage_key != stale_key
+            await blobs.remove(stale_key)
+            assert await blobs.storage.exists(new.storage_key)
+
+            # A concurrent insert of the same digest only rolls back its savepoint
+            pending = await blobs.store(staged(b"mine"), digest="f" * 64, size=4, wrapped_key=None, kek_id=None)
+            async with TestingAsyncSessionLocal() as other:
+                winner = await BlobService(other).store(staged(b"theirs"), digest="a" * 64, size=6, wrapped_key=None, kek_id=None)
+                await other.commit()
+            lookups = []
+            acquire = blobs._acquire_existing
+
+            async def racing_acquire(digest):
+                lookups.append(digest)
+                return None if len(lookups) == 1 else await acquire(digest)
+
+            blobs._acquire_existing = racing_acquire
+            shared = await blobs.store(staged(b"theirs"), digest="a" * 64, size=6, wrapped_key=None, kek_id=None)
+            await db.commit()
+            assert shared.id == winner.id and shared.ref_count == 2
+            return pending.id
+
+    pending_id = asyncio.run(scenario())
+    assert test_db.query(Blob).filter(Blob.id == pending_id).one().digest == "f" * 64
+
 @pytest.fixture
 def test_file_share(auth_client, test_file_upload_response, test_user, test_db):
     test_user = test_db.merge(test_user)
@@ -113,6 +387,19 @@ def test_access_shared_file(client, test_file_share):
     print(f"Access response body: {response.json() if response.status_code != 204 else ''}")
     assert response.status_code == status.HTTP_200_OK
 
+def test_access_shared_file_range(client, test_file_share, stored_content):
+    share_id = test_file_share['share_link'].split('/')[-2]
+    response = client.get(f"/api/user/shared/{share_id}", headers={"Range": "bytes=0-3"})
+    assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert response.content == stored_content[:4]
+
+def test_access_shared_file_binary(client, test_file_share, stored_content):
+    share_id = test_file_share['share_link'].split('/')[-2]
+    response = client.get(f"/api/user/shared/{share_id}?format=binary")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["x-share-permission"] == "view"
+    assert response.content == stored_content
+
 @pytest.fixture
 def test_expired_share(auth_client, test_file_upload_response, test_user, test_db):
     # Refresh test_user from the database to ensure it's attached to a session
@@ -135,4 +422,60 @@ def test_access_expired_share(client, test_expired_share):
     share_id = share_link.split('/')[-2]  # Get the ID from the URL
     
     response = client.get(f"/api/user/shared/{share_id}")
-    assert response.status_code == status.HTTP_410_GONE 
\ No newline at end of file
+    assert response.status_code == status.HTTP_410_GONE
+
+
+def test_list_files_keyset_pagination(auth_client, test_user, test_db):
+    base = datetime(2024, 1, 1)
+    for i in range(7):
+        test_db.add(FileModel(
+            filename=f"{'report' if i % 2 else 'photo'}_{i}.dat",
+            size=i * 100,
+            owner_id=test_user.id,
+            file_type="image/png" if i % 2 == 0 else "application/pdf",
+            # Two files share a timestamp; the id breaks the tie
+            created_at=base + timedelta(minutes=min(i, 5))
+        ))
+    test_db.commit()
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 3, "include_total": True}
+        if cursor:
+            params["cursor"] = cursor
+        response = auth_client.get("/api/user/files", params=params)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["X-Total-Count"] == "7"
+        seen.extend(f["filename"] for f in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert seen == [f"{'report' if i % 2 else 'photo'}_{i}.dat" for i in (6, 5, 4, 3, 2, 1, 0)]
+
+    response = auth_client.get("/api/user/files", params={"order": "asc", "name_prefix": "report", "min_size": 200})
+    assert [f["filename"] for f in response.json()] == ["report_3.dat", "report_5.dat"]
+    assert "X-Next-Cursor" not in response.headers
+
+    response = auth_client.get("/api/user/files", params={"file_type": "image/png", "max_size": 250})
+    assert [f["filename"] for f in response.json()] == ["photo_2.dat", "photo_0.dat"]
+
+    assert auth_client.get("/api/user/files", params={"cursor": "garbage"}).status_code == status.HTTP_400_BAD_REQUEST
+
+def test_share_picker_search_and_pagination(auth_client, test_user, test_db):
+    for name, email in [("Carol", "carol@example.com"), ("Alice", "alice@example.com"),
+                        ("Bob", "bob@example.com"), ("Alan", "zed@example.com")]:
+        test_db.add(User(email=email, full_name=name, hashed_password="x", role=UserRole.USER))
+    test_db.commit()
+
+    response = auth_client.get("/api/user/users", params={"limit": 2})
+    assert [u["name"] for u in response.json()] == ["Alan", "Alice"]
+    response = auth_client.get("/api/user/users", params={"limit": 2, "cursor": response.headers["X-Next-Cursor"]})
+    assert [u["name"] for u in response.json()] == ["Bob", "Carol"]
+    # The current user is never offered
+    assert "X-Next-Cursor" not in response.headers
+
+    # Prefix of either the name or the email
+    response = auth_client.get("/api/user/users", params={"q": "Al"})
+    assert [u["name"] for u in response.json()] == ["Alan", "Alice"]
+    response = auth_client.get("/api/user/users", params={"q": "zed"})
+    assert [u["name"] for u in response.json()] == ["Alan"]
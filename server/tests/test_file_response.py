@@ -0,0 +1,90 @@
+import asyncio
+import os
+from app.utils.file_response import StoredFileResponse
+
+ETAG = '"1-2-3"'
+LAST_MODIFIED = "Sat, 17 Oct 2026 10:00:00 GMT"
+
+def _call(path, headers=(), extensions=None, method="GET", chunk_size=None):
+    scope = {
+        "type": "http",
+        "method": method,
+        "headers": [(name.encode(), value.encode()) for name, value in headers],
+        "extensions": extensions or {},
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.zerocopy":
+            # What a server would sendfile(), read back for the assertions
+            fileobj = message["file"]
+            message = {**message, "data": os.pread(fileobj.fileno(), message["count"], message["offset"])}
+        messages.append(message)
+
+    response = StoredFileResponse(path, os.path.getsize(path), ETAG, LAST_MODIFIED, chunk_size=chunk_size)
+    asyncio.run(response(scope, receive, send))
+    start = messages[0]
+    body = b"".join(m.get("body", b"") or m.get("data", b"") for m in messages[1:])
+    return start["status"], dict((k.decode(), v.decode()) for k, v in start["headers"]), body, messages
+
+def _file(tmp_path, data):
+    path = tmp_path / "blob"
+    path.write_bytes(data)
+    return str(path)
+
+def test_mapped_fallback_full_and_ranges(tmp_path):
+    data = os.urandom(10_000)
+    path = _file(tmp_path, data)
+
+    status, headers, body, messages = _call(path, chunk_size=4096)
+    assert status == 200
+    assert headers["content-length"] == "10000"
+    assert body == data
+    assert len([m for m in messages if m.get("body")]) == 3
+
+    status, headers, body, _ = _call(path, headers=[("range", "bytes=100-199")])
+    assert status == 206
+    assert headers["content-range"] == "bytes 100-199/10000"
+    assert body == data[100:200]
+
+    status, headers, body, _ = _call(path, headers=[("range", "bytes=0-9,-10")])
+    assert status == 206
+    assert headers["content-type"].startswith("multipart/byteranges")
+    assert int(headers["content-length"]) == len(body)
+    assert data[:10] in body and data[-10:] in body
+
+def test_zerocopy_extension_sends_file_spans(tmp_path):
+    data = os.urandom(5000)
+    path = _file(tmp_path, data)
+    status, headers, body, messages = _call(
+        path, headers=[("range", "bytes=1000-")], extensions={"http.response.zerocopy": {}}
+    )
+    assert status == 206
+    assert body == data[1000:]
+    zerocopy = [m for m in messages if m["type"] == "http.response.zerocopy"]
+    assert [(m["offset"], m["count"]) for m in zerocopy] == [(1000, 4000)]
+
+def test_pathsend_extension_for_full_responses(tmp_path):
+    path = _file(tmp_path, b"sealed")
+    status, _, _, messages = _call(path, extensions={"http.response.pathsend": {}})
+    assert status == 200
+    assert messages[-1] == {"type": "http.response.pathsend", "path": path}
+
+    # Ranges can't be expressed with pathsend
+    status, _, body, _ = _call(path, headers=[("range", "bytes=0-1")], extensions={"http.response.pathsend": {}})
+    assert (status, body) == (206, b"se")
+
+def test_unsatisfiable_range_stale_if_range_and_head(tmp_path):
+    path = _file(tmp_path, b"0123456789")
+    status, headers, _, _ = _call(path, headers=[("range", "bytes=50-60")])
+    assert status == 416
+    assert headers["content-range"] == "bytes */10"
+
+    status, _, body, _ = _call(path, headers=[("range", "bytes=0-1"), ("if-range", '"stale"')])
+    assert (status, body) == (200, b"0123456789")
+
+    status, headers, body, _ = _call(path, method="HEAD")
+    assert (status, headers["content-length"], body) == (200, "10", b"")
@@ -0,0 +1,90 @@
+import os
+import pytest
+from app.models.blob import Blob
+from app.models.file import File
+from app.services.key_service import KeyRotationService
+from app.utils.keyring import KeyRing, KeyRingError
+from tests.conftest import client_encrypt
+
+@pytest.fixture
+def legacy_key():
+    return os.urandom(32)
+
+@pytest.fixture
+def old_ring(legacy_key):
+    return KeyRing({1: os.urandom(32)}, active_id=1, legacy_key=legacy_key)
+
+def test_wrap_unwrap_roundtrip(old_ring):
+    data_key, wrapped_key, kek_id = old_ring.generate_data_key()
+    assert kek_id == 1
+    assert old_ring.unwrap(wrapped_key, kek_id) == data_key
+
+def test_unwrap_with_wrong_kek_fails(old_ring):
+    _, wrapped_key, _ = old_ring.generate_data_key()
+    other = KeyRing({1: os.urandom(32)}, active_id=1, legacy_key=old_ring.legacy_key)
+    with pytest.raises(KeyRingError):
+        other.unwrap(wrapped_key, 1)
+    with pytest.raises(KeyRingError):
+        old_ring.unwrap(wrapped_key, 2)
+
+def test_rotation_rewraps_data_keys(test_db, test_user, old_ring, legacy_key):
+    blob_key, blob_wrapped, blob_kek = old_ring.generate_data_key()
+    blob = Blob(digest="d" * 64, file_path="/tmp/blob.enc", size=1, ref_count=1,
+                wrapped_key=blob_wrapped, kek_id=blob_kek)
+    test_db.add(blob)
+    data_keys = []
+    for i in range(5):
+        data_key, wrapped_key, kek_id = old_ring.generate_data_key()
+        data_keys.append(data_key)
+        test_db.add(File(
+            filename=f"f{i}.txt",
+            file_path=f"/tmp/f{i}.enc",
+            size=1,
+            owner_id=test_user.id,
+            wrapped_key=wrapped_key,
+            kek_id=kek_id
+        ))
+    test_db.add(File(filename="legacy.txt", file_path="/tmp/legacy.enc", size=1, owner_id=test_user.id))
+    legacy_blob = Blob(digest="l" * 64, file_path="/tmp/legacy-blob.enc", size=1, ref_count=1)
+    test_db.add(legacy_blob)
+    test_db.commit()
+
+    new_ring = KeyRing({1: old_ring.keks[1], 2: os.urandom(32)}, active_id=2, legacy_key=legacy_key)
+    service = KeyRotationService(test_db, new_ring)
+    assert service.pending_count() == 6
+    assert service.rotate(batch_size=2) == 6
+    assert service.pending_count() == 0
+
+    files = test_db.query(File).filter(File.kek_id.isnot(None)).order_by(File.id).all()
+    assert [f.kek_id for f in files] == [2] * 5
+    assert [new_ring.data_key_for(f) for f in files] == data_keys
+    test_db.refresh(blob)
+    assert blob.kek_id == 2
+    assert new_ring.data_key_for(blob) == blob_key
+
+    # Legacy rows are only adopted on request and keep SERVER_AES_KEY as data key
+    assert service.rotate(adopt_legacy=True) == 2
+    legacy = test_db.query(File).filter(File.filename == "legacy.txt").one()
+    assert legacy.kek_id == 2
+    assert new_ring.data_key_for(legacy) == legacy_key
+    # ...and are never offered for sealed downloads, which would hand out that key
+    test_db.refresh(legacy_blob)
+    assert new_ring.data_key_for(legacy_blob) == legacy_key
+    assert not legacy_blob.own_data_key
+    sealing_ring = KeyRing(new_ring.keks, 2, legacy_key, transport_secret=os.urandom(32))
+    assert not sealing_ring.can_seal(legacy)
+    with pytest.raises(KeyRingError):
+        sealing_ring.wrap_for_session(legacy, "session", "file:1")
+
+def test_upload_stores_wrapped_data_key(auth_client, test_db):
+    import base64, io
+    response = auth_client.post(
+        "/api/user/upload",
+        files={"file": ("wrapped.txt", io.BytesIO(client_encrypt(b"content")), "text/plain")},
+        data={"iv": base64.b64encode(b"A" * 16).decode(), "user_key": base64.b64encode(b"B" * 32).decode()}
+    )
+    assert response.status_code == 200
+    stored = test_db.query(File).filter(File.id == response.json()["id"]).one()
+    assert stored.blob.wrapped_key is not None
+    assert stored.blob.kek_id == 1
+    assert stored.blob.own_data_key
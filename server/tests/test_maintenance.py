@@ -0,0 +1,76 @@
+import asyncio
+from datetime import datetime, timedelta
+from fastapi import status
+from app.models.share import FileShare
+from app.models.verification import LoginVerification
+from app.models.outbox import OutboxMessage
+from app.models.file import SharePermission
+from app.services.maintenance import MaintenanceScheduler, sweep_expired, sweep_shares, sweep_sent_mail
+from tests.conftest import TestingAsyncSessionLocal
+
+def add_shares(test_db, expired, live):
+    now = datetime.utcnow()
+    for i in range(expired + live):
+        test_db.add(FileShare(
+            file_id=1,
+            shared_with_user_id=1,
+            share_link=f"link-{i}",
+            permission=SharePermission.VIEW,
+            expires_at=now - timedelta(hours=1) if i < expired else now + timedelta(hours=1)
+        ))
+    test_db.commit()
+
+def test_sweep_expired_in_batches(test_db):
+    add_shares(test_db, expired=7, live=2)
+    test_db.add(LoginVerification(id="old", user_id=1, code="1", expires_at=datetime.utcnow() - timedelta(minutes=1)))
+    test_db.add(LoginVerification(id="new", user_id=1, code="2", expires_at=datetime.utcnow() + timedelta(minutes=9)))
+    test_db.commit()
+
+    async def sweep():
+        async with TestingAsyncSessionLocal() as db:
+            shares = await sweep_expired(db, FileShare.expires_at, datetime.utcnow(), batch_size=3)
+            verifications = await sweep_expired(db, LoginVerification.expires_at, datetime.utcnow())
+            return shares, verifications
+
+    assert asyncio.run(sweep()) == (7, 1)
+    assert test_db.query(FileShare).count() == 2
+    assert [v.id for v in test_db.query(LoginVerification).all()] == ["new"]
+
+def test_sweep_sent_mail_keeps_recent_and_unsent(test_db):
+    old = datetime.utcnow() - timedelta(days=30)
+    test_db.add(OutboxMessage(recipient="a@example.com", subject="s", body="b", status=OutboxMessage.SENT, sent_at=old))
+    test_db.add(OutboxMessage(recipient="b@example.com", subject="s", body="b", status=OutboxMessage.SENT, sent_at=datetime.utcnow()))
+    test_db.add(OutboxMessage(recipient="c@example.com", subject="s", body="b", status=OutboxMessage.FAILED))
+    test_db.add(OutboxMessage(recipient="d@example.com", subject="s", body="", status=OutboxMessage.EXPIRED, expires_at=old))
+    test_db.commit()
+
+    async def sweep():
+        async with TestingAsyncSessionLocal() as db:
+            return await sweep_sent_mail(db)
+
+    assert asyncio.run(sweep()) == 2
+    assert sorted(m.recipient for m in test_db.query(OutboxMessage).all()) == ["b@example.com", "c@example.com"]
+
+def test_scheduler_records_metrics(test_db):
+    add_shares(test_db, expired=3, live=0)
+    scheduler = MaintenanceScheduler(session_factory=TestingAsyncSessionLocal)
+    scheduler.add_job("expired_shares", 60, sweep_shares)
+
+    async def failing(db):
+        raise RuntimeError("boom")
+    scheduler.add_job("broken", 60, failing)
+
+    assert asyncio.run(scheduler.run_job("expired_shares")) == 3
+    assert asyncio.run(scheduler.run_job("broken")) == 0
+
+    stats = scheduler.stats()
+    assert stats["expired_shares"]["runs"] == 1
+    assert stats["expired_shares"]["rows"] == 3
+    assert stats["expired_shares"]["seconds"] > 0
+    assert stats["broken"]["failures"] == 1
+    assert stats["broken"]["last_error"] == "boom"
+
+def test_admin_maintenance_stats(admin_client):
+    response = admin_client.get("/api/admin/maintenance")
+    assert response.status_code == status.HTTP_200_OK
+    assert {"expired_shares", "expired_verifications", "stale_uploads", "revoked_tokens"} <= set(response.json())
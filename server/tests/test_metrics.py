@@ -0,0 +1,107 @@
+import io
+import base64
+from fastapi import status
+from app.config import settings
+from app.models.outbox import OutboxMessage
+from app.utils.metrics import MetricsRegistry, FILE_STAGE_SECONDS, FILE_BYTES
+from tests.conftest import client_encrypt
+
+def test_registry_renders_prometheus_text():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests", ("route",))
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    requests.inc(route='/a"b')
+    requests.inc(2, route='/a"b')
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(5)
+
+    text = registry.render()
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{route="/a\\"b"} 3.0' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1.0"} 2' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+    assert "latency_seconds_count 3" in text
+    assert registry.counter("requests_total", "Requests", ("route",)) is requests
+
+def test_upload_and_download_record_stages(auth_client):
+    uploads_before = FILE_STAGE_SECONDS.count(operation="upload", stage="client_decrypt")
+    downloads_before = FILE_STAGE_SECONDS.count(operation="download", stage="transport_encrypt")
+    bytes_in = FILE_BYTES.value(direction="in")
+
+    response = auth_client.post(
+        "/api/user/upload",
+        files={"file": ("metrics.txt", io.BytesIO(client_encrypt(b"metered content")), "text/plain")},
+        data={"iv": base64.b64encode(b"A" * 16).decode(), "user_key": base64.b64encode(b"B" * 32).decode()}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    file_id = response.json()["id"]
+    for stage in ("read", "client_decrypt", "server_encrypt", "disk_write", "store", "db_commit"):
+        assert FILE_STAGE_SECONDS.count(operation="upload", stage=stage) >= 1, stage
+    assert FILE_STAGE_SECONDS.count(operation="upload", stage="client_decrypt") == uploads_before + 1
+    assert FILE_BYTES.value(direction="in") == bytes_in + len(b"metered content")
+
+    assert auth_client.get(f"/api/user/download/{file_id}?format=binary").status_code == status.HTTP_200_OK
+    assert FILE_STAGE_SECONDS.count(operation="download", stage="transport_encrypt") == downloads_before + 1
+
+def test_metrics_endpoint_requires_admin(client, test_user_token, admin_client):
+    response = admin_client.get("/metrics")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/plain")
+    for outbox_status in OutboxMessage.STATUSES:
+        assert f'email_outbox_messages{{status="{outbox_status}"}}' in response.text
+    assert "crypto_executor_queue_depth" in response.text
+    # The admin request itself was timed under its route template
+    assert 'http_request_duration_seconds_count{method="GET",route="/metrics",status="200"}' in admin_client.get("/metrics").text
+
+    client.cookies.set("access_token", test_user_token)
+    assert client.get("/metrics").status_code == status.HTTP_403_FORBIDDEN
+
+def test_metrics_endpoint_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "scrape-secret")
+    assert client.get("/metrics").status_code == status.HTTP_401_UNAUTHORIZED
+    response = client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"})
+    assert response.status_code == status.HTTP_200_OK
+
+def test_range_download_records_stages_and_bytes(auth_client):
+    content = b"ranged metered content"
+    response = auth_client.post(
+        "/api/user/upload",
+        files={"file": ("ranged.txt", io.BytesIO(client_encrypt(content)), "text/plain")},
+        data={"iv": base64.b64encode(b"A" * 16).decode(), "user_key": base64.b64encode(b"B" * 32).decode()}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    file_id = response.json()["id"]
+    stages_before = {
+        stage: FILE_STAGE_SECONDS.count(operation="download", stage=stage)
+        for stage in ("db_lookup", "open", "read_decrypt")
+    }
+    bytes_out = FILE_BYTES.value(direction="out")
+
+    response = auth_client.get(f"/api/user/download/{file_id}", headers={"Range": "bytes=0-5,10-12"})
+    assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+    for stage, before in stages_before.items():
+        assert FILE_STAGE_SECONDS.count(operation="download", stage=stage) == before + 1, stage
+    assert FILE_BYTES.value(direction="out") == bytes_out + 9
+
+def test_sealed_download_counts_ciphertext_sent(auth_client, transport_secret):
+    response = auth_client.post(
+        "/api/user/upload",
+        files={"file": ("sealed.txt", io.BytesIO(client_encrypt(b"sealed metered content")), "text/plain")},
+        data={"iv": base64.b64encode(b"A" * 16).decode(), "user_key": base64.b64encode(b"B" * 32).decode()}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    file_id = response.json()["id"]
+
+    bytes_out = FILE_BYTES.value(direction="out")
+    response = auth_client.get(f"/api/user/download/{file_id}?format=sealed")
+    assert response.headers["x-encryption-mode"] == "sealed"
+    # The stored ciphertext is larger than the plaintext, and that is what went out
+    assert len(response.content) > len(b"sealed metered content")
+    assert FILE_BYTES.value(direction="out") == bytes_out + len(response.content)
+
+    bytes_out = FILE_BYTES.value(direction="out")
+    response = auth_client.get(f"/api/user/download/{file_id}?format=sealed", headers={"Range": "bytes=0-3,8-9"})
+    assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert FILE_BYTES.value(direction="out") == bytes_out + 6
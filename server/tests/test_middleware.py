@@ -0,0 +1,119 @@
+import gzip
+from fastapi import FastAPI, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+from app.middleware import SecurityMiddleware, CompressionMiddleware, SECURITY_HEADERS
+from app.utils.compression import negotiate_encoding
+
+def make_app():
+    app = FastAPI()
+    app.add_middleware(SecurityMiddleware)
+
+    @app.get("/plain")
+    async def plain():
+        return PlainTextResponse("ok", headers={"X-Frame-Options": "SAMEORIGIN"})
+
+    @app.get("/stream")
+    async def stream():
+        async def body():
+            for i in range(3):
+                yield f"chunk{i}".encode()
+        return StreamingResponse(body())
+
+    return app
+
+def test_security_headers_added_once():
+    response = TestClient(make_app(), base_url="https://testserver").get("/plain")
+    assert response.text == "ok"
+    for name, value in SECURITY_HEADERS.items():
+        assert response.headers.get_list(name) == [value]
+
+def test_streaming_body_passes_through():
+    response = TestClient(make_app(), base_url="https://testserver").get("/stream")
+    assert response.content == b"chunk0chunk1chunk2"
+    assert response.headers["X-Content-Type-Options"] == "nosniff"
+
+def test_http_redirected_to_https():
+    client = TestClient(make_app(), base_url="http://testserver")
+    response = client.get("/plain?x=1", follow_redirects=False)
+    assert response.status_code == 301
+    assert response.headers["location"] == "https://testserver/plain?x=1"
+    assert response.headers["Strict-Transport-Security"] == SECURITY_HEADERS["Strict-Transport-Security"]
+
+def make_compressed_app():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+
+    @app.get("/big")
+    async def big():
+        return [{"id": i, "filename": f"file_{i}.txt"} for i in range(200)]
+
+    @app.get("/small")
+    async def small():
+        return {"ok": True}
+
+    @app.get("/binary")
+    async def binary():
+        return Response(b"\0" * 10000, media_type="application/octet-stream")
+
+    @app.get("/stream")
+    async def stream():
+        async def body():
+            for i in range(50):
+                yield f"line {i}\n" * 10
+        return StreamingResponse(body(), media_type="text/plain")
+
+    @app.get("/range")
+    async def text_range():
+        return Response(
+            "x" * 10000,
+            status_code=206,
+            media_type="text/plain",
+            headers={"Content-Range": "bytes 0-9999/60000"}
+        )
+
+    @app.get("/ranges")
+    async def text_ranges():
+        return Response("x" * 10000, status_code=206, media_type="multipart/byteranges; boundary=b")
+
+    return app
+
+def get_raw(client, path, accept="gzip"):
+    # Read the raw bytes so we can check the coding ourselves
+    with client.stream("GET", path, headers={"Accept-Encoding": accept}) as response:
+        return response, b"".join(response.iter_raw())
+
+def test_json_compressed_when_large():
+    client = TestClient(make_compressed_app())
+    response, raw = get_raw(client, "/big")
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) == len(raw)
+    assert gzip.decompress(raw).startswith(b'[{"id":0,')
+
+def test_small_binary_and_refused_bodies_not_compressed():
+    client = TestClient(make_compressed_app())
+    for path, accept in [("/small", "gzip"), ("/binary", "gzip"), ("/big", "gzip;q=0, identity")]:
+        response, _ = get_raw(client, path, accept)
+        assert "content-encoding" not in response.headers, path
+
+def test_streamed_text_compressed():
+    response, raw = get_raw(TestClient(make_compressed_app()), "/stream")
+    assert response.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(raw) == b"".join(f"line {i}\n".encode() * 10 for i in range(50))
+
+def test_partial_content_not_compressed():
+    response, raw = get_raw(TestClient(make_compressed_app()), "/range")
+    assert response.status_code == 206
+    assert "content-encoding" not in response.headers
+    assert response.headers["content-range"] == "bytes 0-9999/60000"
+    assert raw == b"x" * 10000
+    response, _ = get_raw(TestClient(make_compressed_app()), "/ranges")
+    assert "content-encoding" not in response.headers
+
+def test_negotiate_encoding():
+    supported = ["zstd", "br", "gzip"]
+    assert negotiate_encoding("gzip, deflate, br", supported) == "br"
+    assert negotiate_encoding("gzip;q=1.0, br;q=0.5", supported) == "gzip"
+    assert negotiate_encoding("*;q=0.1, zstd;q=0", supported) == "br"
+    assert negotiate_encoding("identity", supported) is None
@@ -4,6 +4,7 @@ from app.models.user import User, UserRole
 from app.models.file import File
 from app.models.share import FileShare
 from app.models.verification import LoginVerification
+from app.database import async_database_url
 
 def test_user_model(test_db):
     user = User(
@@ -73,4 +74,11 @@ def test_verification_model(test_db, test_user):
     # Test expiration
     verification.expires_at = datetime.utcnow() - timedelta(minutes=1)
     test_db.commit()
-    assert verification.is_expired() == True 
\ No newline at end of file
+    assert verification.is_expired() == True
+
+
+def test_async_database_url():
+    assert async_database_url("sqlite:///./sql_app.db") == "sqlite+aiosqlite:///./sql_app.db"
+    assert async_database_url("postgresql://u:p@db/app") == "postgresql+asyncpg://u:p@db/app"
+    # URLs that already name a driver are left alone
+    assert async_database_url("postgresql+asyncpg://u:p@db/app") == "postgresql+asyncpg://u:p@db/app"
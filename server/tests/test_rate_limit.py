@@ -0,0 +1,107 @@
+import pytest
+from fastapi import status
+from app.utils import rate_limit
+from app.utils.rate_limit import (
+    MemoryBackend,
+    RateLimiter,
+    RedisBackend,
+    SQLiteBackend,
+    WindowState,
+    sliding_window_hit
+)
+
+class FakeRedis:
+    """Just enough of redis.asyncio for the rate limiter"""
+
+    def __init__(self):
+        self.data = {}
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    async def decr(self, key):
+        self.data[key] -= 1
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.ops = []
+
+    def incr(self, key):
+        self.ops.append(("incr", key))
+
+    def expire(self, key, seconds):
+        self.ops.append(("expire", key))
+
+    def get(self, key):
+        self.ops.append(("get", key))
+
+    async def execute(self):
+        results = []
+        for op, key in self.ops:
+            if op == "incr":
+                self.client.data[key] = self.client.data.get(key, 0) + 1
+                results.append(self.client.data[key])
+            elif op == "expire":
+                results.append(True)
+            else:
+                value = self.client.data.get(key)
+                results.append(None if value is None else str(value).encode())
+        return results
+
+def test_sliding_window_weights_previous_window():
+    # Halfway through a window, half of the previous window's 10 hits still count
+    state = WindowState(index=0, current=10, previous=0)
+    state, result = sliding_window_hit(state, now=150, limit=16, window=100)
+    assert state == WindowState(index=1, current=1, previous=10)
+    assert result.allowed and result.remaining == 10
+
+    state = WindowState(index=1, current=11, previous=10)
+    _, result = sliding_window_hit(state, now=150, limit=16, window=100)
+    assert not result.allowed
+    # 10 more seconds slides one more of the previous hits out
+    assert result.retry_after == 10
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend_factory", ["memory", "sqlite", "redis"])
+async def test_rate_limiter_backends(backend_factory, tmp_path):
+    if backend_factory == "memory":
+        backend = MemoryBackend()
+    elif backend_factory == "sqlite":
+        backend = SQLiteBackend(str(tmp_path / "limits.db"))
+    else:
+        backend = RedisBackend(client=FakeRedis())
+    limiter = RateLimiter(backend, limit=3, window=3600, name="test")
+
+    results = [await limiter.hit("10.0.0.1") for _ in range(4)]
+    assert [r.allowed for r in results] == [True, True, True, False]
+    assert results[-1].retry_after > 0
+    assert (await limiter.hit("10.0.0.2")).allowed
+
+@pytest.mark.asyncio
+async def test_sqlite_backend_shared_between_workers(tmp_path):
+    path = str(tmp_path / "limits.db")
+    first = RateLimiter(SQLiteBackend(path), limit=2, window=3600)
+    second = RateLimiter(SQLiteBackend(path), limit=2, window=3600)
+    assert (await first.hit("ip")).allowed
+    assert (await second.hit("ip")).allowed
+    assert not (await first.hit("ip")).allowed
+
+@pytest.mark.asyncio
+async def test_memory_backend_is_bounded():
+    backend = MemoryBackend(max_keys=100)
+    limiter = RateLimiter(backend, limit=5, window=60)
+    for i in range(1000):
+        await limiter.hit(f"ip-{i}")
+    assert len(backend) == 100
+
+def test_login_rate_limited(client, monkeypatch):
+    monkeypatch.setattr(
+        "app.services.auth_service.login_limiter",
+        RateLimiter(MemoryBackend(), limit=2, window=60, name="login")
+    )
+    payload = {"email": "nobody@example.com", "password": "wrongpassword"}
+    statuses = [client.post("/api/login", json=payload).status_code for _ in range(3)]
+    assert statuses[-1] == status.HTTP_429_TOO_MANY_REQUESTS
+    assert status.HTTP_429_TOO_MANY_REQUESTS not in statuses[:2]
+    assert int(client.post("/api/login", json=payload).headers["Retry-After"]) > 0
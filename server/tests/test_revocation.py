@@ -0,0 +1,62 @@
+import asyncio
+import secrets
+from datetime import datetime, timedelta
+from app.utils.revocation import BloomFilter, RevocationList
+from tests.conftest import TestingAsyncSessionLocal
+
+def test_bloom_filter_membership():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    items = [secrets.token_hex(16) for _ in range(1000)]
+    for item in items:
+        bloom.add(item)
+    assert all(item in bloom for item in items)
+    false_positives = sum(secrets.token_hex(16) in bloom for _ in range(10000))
+    assert false_positives < 300
+
+def test_revocation_seen_by_other_workers(test_db):
+    jti = secrets.token_hex(16)
+    expires_at = datetime.utcnow() + timedelta(minutes=30)
+
+    async def scenario():
+        first = RevocationList(capacity=100, refresh_interval=0)
+        second = RevocationList(capacity=100, refresh_interval=0)
+        async with TestingAsyncSessionLocal() as db:
+            assert not await second.is_revoked(db, jti)
+            await first.revoke(db, jti, expires_at)
+            # The first worker knows immediately; the second after its next refresh
+            assert await first.is_revoked(db, jti)
+            assert await second.is_revoked(db, jti)
+            assert not await second.is_revoked(db, secrets.token_hex(16))
+
+    asyncio.run(scenario())
+
+def test_prune_drops_expired_revocations(test_db):
+    jti = secrets.token_hex(16)
+
+    async def scenario():
+        revocations = RevocationList(capacity=100, refresh_interval=60)
+        async with TestingAsyncSessionLocal() as db:
+            await revocations.revoke(db, jti, datetime.utcnow() - timedelta(seconds=1))
+            assert not await revocations.is_revoked(db, jti)
+            assert await revocations.prune(db) == 1
+            assert revocations.stats()["filter_entries"] == 0
+
+    asyncio.run(scenario())
+
+def test_failed_refresh_keeps_previous_filter(test_db):
+    jti = secrets.token_hex(16)
+
+    async def scenario():
+        revocations = RevocationList(capacity=100, refresh_interval=0)
+        async with TestingAsyncSessionLocal() as db:
+            await revocations.revoke(db, jti, datetime.utcnow() + timedelta(minutes=30))
+            assert await revocations.is_revoked(db, jti)
+
+            async def broken_refresh(db):
+                raise RuntimeError("database is locked")
+
+            revocations.refresh = broken_refresh
+            assert await revocations.is_revoked(db, jti)
+            assert not await revocations.is_revoked(db, secrets.token_hex(16))
+
+    asyncio.run(scenario())
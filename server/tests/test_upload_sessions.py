@@ -0,0 +1,141 @@
+import pytest
+import os
+import base64
+import asyncio
+from datetime import datetime, timedelta
+from fastapi import status
+from Crypto.Cipher import AES
+from app.models.upload import UploadSession, UploadPart
+from app.services.upload_service import UploadSessionService
+from app.storage import storage
+from tests.conftest import TestingAsyncSessionLocal
+
+USER_KEY = b"K" * 32
+
+def encrypt_part(data):
+    iv = os.urandom(12)
+    cipher = AES.new(USER_KEY, AES.MODE_GCM, nonce=iv)
+    ciphertext, tag = cipher.encrypt_and_digest(data)
+    return ciphertext + tag, base64.b64encode(iv).decode()
+
+def start_upload(client, filename="big.bin"):
+    response = client.post(
+        "/api/user/uploads",
+        json={
+            "filename": filename,
+            "content_type": "application/octet-stream",
+            "user_key": base64.b64encode(USER_KEY).decode()
+        }
+    )
+    assert response.status_code == status.HTTP_200_OK
+    return response.json()["upload_id"]
+
+def put_part(client, upload_id, number, data):
+    body, iv = encrypt_part(data)
+    return client.put(
+        f"/api/user/uploads/{upload_id}/parts/{number}",
+        content=body,
+        headers={"X-Encryption-IV": iv}
+    )
+
+def test_multipart_upload_roundtrip(auth_client):
+    parts = [os.urandom(100 * 1024), os.urandom(70 * 1024), b"tail"]
+    upload_id = start_upload(auth_client)
+
+    # Parts may arrive in any order, and a retried part replaces the first attempt
+    for number in (3, 1, 2, 2):
+        response = put_part(auth_client, upload_id, number, parts[number - 1])
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["size"] == len(parts[number - 1])
+
+    state = auth_client.get(f"/api/user/uploads/{upload_id}").json()
+    assert [p["part_number"] for p in state["parts"]] == [1, 2, 3]
+
+    response = auth_client.post(f"/api/user/uploads/{upload_id}/complete", json={"part_count": 3})
+    assert response.status_code == status.HTTP_200_OK
+    file_id = response.json()["id"]
+    assert response.json()["size"] == sum(len(p) for p in parts)
+
+    download = auth_client.get(f"/api/user/download/{file_id}?format=binary")
+    key = base64.b64decode(download.headers["X-Encryption-Key"])
+    iv = base64.b64decode(download.headers["X-Encryption-IV"])
+    body = download.content
+    plaintext = AES.new(key, AES.MODE_GCM, nonce=iv).decrypt_and_verify(body[:-16], body[-16:])
+    assert plaintext == b"".join(parts)
+
+    # The session is gone once completed
+    assert auth_client.get(f"/api/user/uploads/{upload_id}").status_code == status.HTTP_404_NOT_FOUND
+
+def test_tampered_part_rejected(auth_client):
+    upload_id = start_upload(auth_client)
+    body, iv = encrypt_part(b"some data")
+    response = auth_client.put(
+        f"/api/user/uploads/{upload_id}/parts/1",
+        content=body[:-1] + bytes([body[-1] ^ 1]),
+        headers={"X-Encryption-IV": iv}
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert auth_client.get(f"/api/user/uploads/{upload_id}").json()["parts"] == []
+
+def test_part_errors_are_reported_as_such(auth_client, monkeypatch):
+    from app.config import settings
+
+    upload_id = start_upload(auth_client)
+    response = auth_client.put(
+        f"/api/user/uploads/{upload_id}/parts/1",
+        content=b"x" * 32,
+        headers={"X-Encryption-IV": base64.b64encode(b"short").decode()}
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"] == "Invalid IV"
+
+    # The session total is bounded, not just each part
+    monkeypatch.setattr(settings, "UPLOAD_MAX_SIZE", 1500)
+    assert put_part(auth_client, upload_id, 1, os.urandom(1000)).status_code == status.HTTP_200_OK
+    response = put_part(auth_client, upload_id, 2, os.urandom(1000))
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    # Replacing a part only counts the new upload
+    assert put_part(auth_client, upload_id, 1, os.urandom(1200)).status_code == status.HTTP_200_OK
+
+def test_complete_requires_contiguous_parts(auth_client):
+    upload_id = start_upload(auth_client)
+    assert put_part(auth_client, upload_id, 1, b"one").status_code == status.HTTP_200_OK
+    assert put_part(auth_client, upload_id, 3, b"three").status_code == status.HTTP_200_OK
+
+    response = auth_client.post(f"/api/user/uploads/{upload_id}/complete")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    response = auth_client.post(f"/api/user/uploads/{upload_id}/complete", json={"part_count": 4})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+def test_abort_upload(auth_client, test_db):
+    upload_id = start_upload(auth_client)
+    put_part(auth_client, upload_id, 1, b"data")
+
+    response = auth_client.delete(f"/api/user/uploads/{upload_id}")
+    assert response.status_code == status.HTTP_200_OK
+    assert test_db.query(UploadPart).count() == 0
+    assert auth_client.get(f"/api/user/uploads/{upload_id}").status_code == status.HTTP_404_NOT_FOUND
+
+def test_stale_sessions_collected(auth_client, test_db):
+    upload_id = start_upload(auth_client)
+    put_part(auth_client, upload_id, 1, b"data")
+    part = test_db.query(UploadPart).one()
+
+    async def collect(now=None, batch_size=None):
+        async with TestingAsyncSessionLocal() as db:
+            service = UploadSessionService(db)
+            return await service.gc_stale(now, batch_size)
+
+    assert asyncio.run(storage.exists(part.storage_key))
+
+    # Nothing has expired yet
+    assert asyncio.run(collect()) == 0
+
+    # Two sessions, collected one per batch
+    second = start_upload(auth_client, "second.bin")
+    put_part(auth_client, second, 1, b"more data")
+    removed = asyncio.run(collect(now=datetime.utcnow() + timedelta(days=2), batch_size=1))
+    assert removed == 2
+    assert test_db.query(UploadSession).count() == 0
+    assert not asyncio.run(storage.exists(part.storage_key))
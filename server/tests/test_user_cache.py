@@ -0,0 +1,35 @@
+import time
+from app.models.user import UserRole
+from app.utils.user_cache import UserCache, UserSnapshot
+
+def snapshot(user_id, email):
+    return UserSnapshot(user_id, email, "Name", UserRole.USER, True)
+
+def test_user_cache_hit_and_miss():
+    cache = UserCache(maxsize=10, ttl=60)
+    assert cache.get("a@example.com") is None
+    cache.set("a@example.com", snapshot(1, "a@example.com"))
+    assert cache.get("a@example.com").id == 1
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+def test_user_cache_evicts_least_recently_used():
+    cache = UserCache(maxsize=2, ttl=60)
+    cache.set("a", snapshot(1, "a"))
+    cache.set("b", snapshot(2, "b"))
+    cache.get("a")
+    cache.set("c", snapshot(3, "c"))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.stats()["evictions"] == 1
+
+def test_user_cache_expiry_and_invalidation():
+    cache = UserCache(maxsize=10, ttl=0.01)
+    cache.set("a", snapshot(1, "a"))
+    time.sleep(0.02)
+    assert cache.get("a") is None
+
+    cache = UserCache(maxsize=10, ttl=60)
+    cache.set("a", snapshot(1, "a"))
+    cache.invalidate(user_id=1)
+    assert cache.get("a") is None